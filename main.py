@@ -1,18 +1,25 @@
+import importlib
 import os
 import sys
-import tempfile
 import threading
+import time
 import tkinter as tk
-from tkinter import filedialog, messagebox, Canvas, Frame, Label, Button, Scrollbar, Toplevel, ttk, StringVar, Scale
+from tkinter import filedialog, messagebox, Label, Button, Toplevel, ttk, Scale
 from pathlib import Path
-from io import BytesIO
-from PIL import Image as PILImage, ImageTk
-import fitz  # PyMuPDF
-from openpyxl import load_workbook
-from docx2pdf import convert as docx2pdf_convert
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas as rl_canvas
-import PyPDF2
+from pdftools import jobs
+from pdftools.job_view import poll_jobs, show_job_list
+
+# Only Tk and the job scheduler load before the window shows; the tools' modules
+# (and PyMuPDF, PIL, openpyxl... behind them) are imported when first used, and
+# in the background once the window is up
+launched = time.perf_counter()
+PREWARM_MODULES = ("pdftools.engine", "pdftools.page_grid", "pdftools.estimate", "pdftools.recipe")
+ICON_SIZE = 50
+# Set by the startup benchmark: close as soon as the window has been shown
+EXIT_AFTER_START_ENV = "PDFTOOLS_EXIT_AFTER_START"
+
+scheduler = jobs.Scheduler()
+main_window = None
 
 def resource_path(relative_path):
     try:
@@ -21,52 +28,41 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def convert_image_to_pdf(image_path):
-    pdf_path = f"{os.path.splitext(image_path)[0]}.pdf"
-    with PILImage.open(image_path) as img:
-        img = img.convert("RGB")
-        img.save(pdf_path, "PDF", resolution=100.0)
-    return pdf_path
-
-def convert_xlsx_to_pdf(xlsx_path):
-    pdf_path = f"{os.path.splitext(xlsx_path)[0]}.pdf"
-    workbook = load_workbook(xlsx_path)
-    sheet = workbook.active
-
-    c = rl_canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
-
-    y = height - 40
-    for row in sheet.iter_rows(values_only=True):
-        text = ", ".join([str(cell) for cell in row])
-        c.drawString(40, y, text)
-        y -= 20
-        if y < 40:
-            c.showPage()
-            y = height - 40
-
-    c.save()
-    return pdf_path
-
-def convert_docx_to_pdf(docx_path):
-    pdf_path = f"{os.path.splitext(docx_path)[0]}.pdf"
-    docx2pdf_convert(docx_path, pdf_path)
-    return pdf_path
-
-def convert_to_pdf(file_path):
-    ext = file_path.lower().split('.')[-1]
-    if ext in ['jpg', 'jpeg', 'png']:
-        return convert_image_to_pdf(file_path)
-    elif ext == 'xlsx':
-        return convert_xlsx_to_pdf(file_path)
-    elif ext == 'docx':
-        return convert_docx_to_pdf(file_path)
-    else:
-        return file_path
+def load_icon(name):
+    # icons/50 holds copies already scaled to ICON_SIZE; any icon without one is
+    # scaled once with PIL and kept in the cache folder
+    icon_path = resource_path(os.path.join("icons", str(ICON_SIZE), name))
+    if not os.path.exists(icon_path):
+        from pdftools import cache
+        source_path = resource_path(os.path.join("icons", name))
+        icon_path = os.path.join(cache.cache_dir("icons", str(ICON_SIZE)), name)
+        if not os.path.exists(icon_path) or os.path.getmtime(icon_path) < os.path.getmtime(source_path):
+            from PIL import Image as PILImage
+            partial_path = f"{icon_path}.{os.getpid()}.part"
+            PILImage.open(source_path).resize((ICON_SIZE, ICON_SIZE), PILImage.Resampling.LANCZOS).save(partial_path, "PNG")
+            os.replace(partial_path, icon_path)
+    return tk.PhotoImage(file=icon_path)
+
+def prewarm(first_window):
+    started = time.perf_counter()
+    for name in PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # The tool reports it properly when it is used
+            pass
+    from pdftools import metrics
+    metrics.write_record({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "operation": "startup",
+                          "seconds": round(first_window, 4), "prewarm_seconds": round(time.perf_counter() - started, 4),
+                          "frozen": hasattr(sys, "_MEIPASS")})
+
+def run_job(title, work, on_done, error_message, priority=jobs.NORMAL):
+    scheduler.submit(title, work, priority, on_done=on_done,
+                     on_error=lambda e: messagebox.showerror("Error", f"{error_message}: {e}"))
+    show_job_list(main_window, scheduler)
 
 def combine_files():
-    root = tk.Tk()
-    root.withdraw()
+    from pdftools import engine
 
     file_paths = filedialog.askopenfilenames(
         title='Select files to combine',
@@ -78,370 +74,237 @@ def combine_files():
         messagebox.showerror("No File Selected", "Please select at least one file to combine.")
         return
 
-    pdf_paths = []
-    for file_path in file_paths:
-        pdf_path = convert_to_pdf(file_path)
-        if pdf_path:
-            pdf_paths.append(pdf_path)
+    default_output_path = Path.cwd() / "combined_output.pdf"
+    output_pdf_path = filedialog.asksaveasfilename(
+        defaultextension=".pdf",
+        initialdir=os.getcwd(),
+        initialfile=default_output_path.name,
+        title="Save Combined PDF"
+    )
 
-    def process_pdf_paths(pdf_paths):
-        try:
-            output_pdf = fitz.open()
-            for pdf_path in pdf_paths:
-                try:
-                    input_pdf = fitz.open(pdf_path)
-                    output_pdf.insert_pdf(input_pdf)
-                    input_pdf.close()
-                except Exception as e:
-                    messagebox.showerror("PDF Processing Error", f"Failed to process {pdf_path}: {str(e)}")
-                    continue
-
-            default_output_path = Path.cwd() / "combined_output.pdf"
-            output_pdf_path = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                initialdir=os.getcwd(),
-                initialfile=default_output_path.name,
-                title="Save Combined PDF"
-            )
-
-            if output_pdf_path:
-                output_pdf.save(output_pdf_path)
-                messagebox.showinfo("Success", "The files have been combined successfully.")
-            else:
-                messagebox.showerror("Save Error", "Failed to save the PDF. No file was chosen.")
-        except Exception as e:
-            messagebox.showerror("PDF Creation Error", f"Failed to create combined PDF: {str(e)}")
-        finally:
-            if 'output_pdf' in locals():
-                output_pdf.close()
+    if not output_pdf_path:
+        messagebox.showerror("Save Error", "Failed to save the PDF. No file was chosen.")
+        return
+
+    drop_duplicates = "exact" if messagebox.askyesno(
+        "Duplicate Pages", "Leave out pages that are exact copies of an earlier page?") else None
+    stats = {}
+
+    def combined(failed):
+        for pdf_path, e in failed:
+            messagebox.showerror("PDF Processing Error", f"Failed to process {pdf_path}: {str(e)}")
+        message = "The files have been combined successfully."
+        if drop_duplicates:
+            message += f" {stats.get('duplicate_pages', 0)} duplicate pages were left out."
+        messagebox.showinfo("Success", message)
 
-    threading.Thread(target=process_pdf_paths, args=(pdf_paths,)).start()
+    run_job(f"Combine {len(file_paths)} files",
+            lambda job: engine.combine_files(file_paths, output_pdf_path, stats=stats, drop_duplicates=drop_duplicates,
+                                             progress=job.progress),
+            combined, "Failed to create combined PDF")
 
 def rotate_pages():
+    from pdftools import engine
+    from pdftools.page_grid import PageGrid
+
     file_path = filedialog.askopenfilename(title="Select PDF", filetypes=[('PDF files', '*.pdf')])
     if not file_path:
         return
 
-    pdf = fitz.open(file_path)
-    rotation_states = [0] * len(pdf)
-
     rotate_input_window = Toplevel()
     rotate_input_window.title("Rotate and Sort Pages")
     rotate_input_window.geometry("800x600")
 
-    canvas = Canvas(rotate_input_window, bg='white', borderwidth=0, highlightthickness=0)
-    scrollbar = Scrollbar(rotate_input_window, orient="vertical", command=canvas.yview)
-    canvas.configure(yscrollcommand=scrollbar.set)
-    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-    canvas_frame = Frame(canvas, bg='white')
-    canvas_window = canvas.create_window((0, 0), window=canvas_frame, anchor='nw', width=canvas.cget('width'))
-
-    image_labels = []
-    page_frames = []
-
-    def rotate_page(page_num):
-        rotation_states[page_num] = (rotation_states[page_num] + 90) % 360
-        render_thumbnail(page_num)
-
-    def render_thumbnail(page_num):
-        page = pdf.load_page(page_num)
-        rotation_degree = rotation_states[page_num]
-        matrix = fitz.Matrix(0.25, 0.25).prerotate(rotation_degree)
-        pix = page.get_pixmap(matrix=matrix)
-        img = PILImage.open(BytesIO(pix.tobytes()))
-        photo = ImageTk.PhotoImage(img)
-        img_label, text_var = image_labels[page_num]
-        img_label.config(image=photo)
-        img_label.image = photo
-        text_var.set(f"Page {page_num + 1} - {rotation_states[page_num]}°")
-
-    def on_drag_start(event, frame, page_num):
-        frame.drag_start_y = event.y_root
-        frame.start_y = frame.winfo_y()
-
-    def on_drag_motion(event, frame, page_num):
-        dy = event.y_root - frame.drag_start_y
-        frame.place(y=frame.start_y + dy)
-
-    def on_drag_end(event, frame, page_num):
-        new_y = canvas_frame.winfo_y() + frame.winfo_y() + event.y
-        new_index = new_y // frame.winfo_height()
-        old_index = page_frames.index(frame)
-
-        frame_moved = page_frames.pop(old_index)
-        page_frames.insert(new_index, frame_moved)
-
-        for i, frame in enumerate(page_frames):
-            frame.grid_forget()
-            frame.grid(row=i, column=0, padx=10, pady=10, sticky='nsew')
-
-        canvas_frame.update_idletasks()
-        canvas.config(scrollregion=canvas.bbox("all"))
-
-    for i in range(len(pdf)):
-        frame = Frame(canvas_frame, relief=tk.SUNKEN, borderwidth=1, pady=5, bg='gray')
-        frame.grid(row=i, column=0, padx=10, pady=10, sticky='nsew')
-        page_frames.append(frame)
-
-        text_var = StringVar(value=f"Page {i + 1} - 0°")
-        label = Label(frame, textvariable=text_var)
-        label.pack(side='top', pady=2)
-
-        img_label = Label(frame)
-        img_label.pack(side='top', fill=tk.BOTH, expand=True)
-        image_labels.append((img_label, text_var))
-
-        rotate_btn = Button(frame, text="Rotate", command=lambda i=i: rotate_page(i))
-        rotate_btn.pack(side='bottom')
-
-        frame.bind("<Button-1>", lambda e, frame=frame, page_num=i: on_drag_start(e, frame, page_num))
-        frame.bind("<B1-Motion>", lambda e, frame=frame, page_num=i: on_drag_motion(e, frame, page_num))
-        frame.bind("<ButtonRelease-1>", lambda e, frame=frame, page_num=i: on_drag_end(e, frame, page_num))
+    def add_rotate_button(cell):
+        cell.rotate_btn = Button(cell.frame, text="Rotate")
+        cell.rotate_btn.pack(side='bottom')
 
-    def apply_rotation_and_save():
-        sorted_pdf = fitz.open()
-
-        for frame, (img_label, text_var) in zip(page_frames, image_labels):
-            page_text = text_var.get()
-            page_num = int(page_text.split()[1]) - 1
-            rotation_degree = rotation_states[page_num]
-
-            page = pdf.load_page(page_num)
-            page.set_rotation(rotation_degree)
+    def bind_rotate_button(cell, page_num):
+        cell.rotate_btn.config(command=lambda: page_grid.rotate(page_num))
 
-            # Create a new page with the rotated content
-            new_page = sorted_pdf.new_page(width=page.rect.width, height=page.rect.height)
-            new_page.show_pdf_page(new_page.rect, pdf, page_num, rotate=rotation_degree)
+    page_grid = PageGrid(rotate_input_window, file_path, engine.page_count(file_path), bg='white',
+                         title=lambda page_num: f"Page {page_num + 1} - {page_grid.rotations[page_num]}°",
+                         build_cell=add_rotate_button, bind_cell=bind_rotate_button, reorderable=True)
 
+    def apply_rotation_and_save():
         save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
         if save_path:
-            sorted_pdf.save(save_path)
-            messagebox.showinfo("Success", "PDF saved successfully with rotations and new order applied.")
+            order, rotations = list(page_grid.order), list(page_grid.rotations)
+            run_job(f"Rotate {os.path.basename(file_path)}",
+                    lambda job: engine.rotate_pages(file_path, order, rotations, save_path, progress=job.progress),
+                    lambda result: messagebox.showinfo("Success", "PDF saved successfully with rotations and new order applied."),
+                    "Failed to save the PDF", jobs.HIGH)
             rotate_input_window.destroy()
 
     save_button = Button(rotate_input_window, text="Save Rotated PDF", command=apply_rotation_and_save)
     save_button.pack(side='bottom', pady=10)
-
-    for i in range(len(pdf)):
-        render_thumbnail(i)
-
-    canvas_frame.update_idletasks()
-    canvas.config(scrollregion=canvas.bbox("all"))
+    page_grid.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
 def split_pdf():
-    root = tk.Tk()
-    root.withdraw()
+    from pdftools import engine
 
     input_pdf_path = filedialog.askopenfilename(title="Select PDF to Split", filetypes=[('PDF files', '*.pdf')])
     if not input_pdf_path:
         messagebox.showinfo("Info", "No file selected.")
         return
 
-    try:
-        pdf_reader = fitz.open(input_pdf_path)
-        output_folder = filedialog.askdirectory(title="Select Folder to Save Split Pages")
-        if not output_folder:
-            return
-
-        for page_num in range(len(pdf_reader)):
-            pdf_writer = fitz.open()
-            pdf_writer.insert_pdf(pdf_reader, from_page=page_num, to_page=page_num)
-
-            output_path = os.path.join(output_folder, f"page_{page_num + 1}.pdf")
-            pdf_writer.save(output_path)
+    output_folder = filedialog.askdirectory(title="Select Folder to Save Split Pages")
+    if not output_folder:
+        return
 
-        messagebox.showinfo("Success", "PDF split successfully!")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while splitting the PDF: {e}")
-    finally:
-        root.destroy()
+    run_job(f"Split {os.path.basename(input_pdf_path)}",
+            lambda job: engine.split_pdf(input_pdf_path, output_folder, progress=job.progress),
+            lambda output_paths: messagebox.showinfo("Success", "PDF split successfully!"),
+            "An error occurred while splitting the PDF")
 
 def delete_pages():
+    from pdftools import engine
+    from pdftools.page_grid import PageGrid
+
     file_path = filedialog.askopenfilename(title="Select PDF", filetypes=[('PDF files', '*.pdf')])
     if not file_path:
         return
 
-    pdf = fitz.open(file_path)
-    num_pages = pdf.page_count
+    num_pages = engine.page_count(file_path)
 
     delete_window = Toplevel()
     delete_window.title("Delete Pages")
     delete_window.geometry("800x600")
 
-    canvas = Canvas(delete_window)
-    scrollbar = Scrollbar(delete_window, orient="vertical", command=canvas.yview)
-    canvas.configure(yscrollcommand=scrollbar.set)
-    canvas.pack(side="left", fill="both", expand=True)
-    scrollbar.pack(side="right", fill="y")
+    page_selections = set()
+    duplicate_of = {}
 
-    pages_frame = Frame(canvas)
-    canvas.create_window((0, 0), window=pages_frame, anchor="nw")
+    def add_checkbox(cell):
+        cell.chk_state = tk.BooleanVar(cell.frame)
+        cell.chk = tk.Checkbutton(cell.frame, text="Delete", var=cell.chk_state)
+        cell.chk.pack(side='bottom')
 
-    def on_configure(event):
-        canvas.configure(scrollregion=canvas.bbox("all"))
+    def bind_checkbox(cell, page_num):
+        def toggle():
+            if cell.chk_state.get():
+                page_selections.add(page_num)
+            else:
+                page_selections.discard(page_num)
 
-    pages_frame.bind("<Configure>", on_configure)
+        cell.chk_state.set(page_num in page_selections)
+        cell.chk.config(command=toggle)
 
-    page_selections = []
+    def page_title(page_num):
+        if page_num not in duplicate_of:
+            return f"Page {page_num + 1}"
+        original, exact = duplicate_of[page_num]
+        return f"Page {page_num + 1} - {'copy' if exact else 'near copy'} of {original + 1}"
 
-    for i in range(num_pages):
-        page_frame = Frame(pages_frame)
-        page_frame.pack(fill="x", expand=True)
+    page_grid = PageGrid(delete_window, file_path, num_pages, title=page_title,
+                         build_cell=add_checkbox, bind_cell=bind_checkbox)
 
-        chk_state = tk.BooleanVar()
-        chk = tk.Checkbutton(page_frame, text=f"Page {i+1}", var=chk_state)
-        chk.pack(side="left")
-        page_selections.append(chk_state)
+    def duplicates_found(found):
+        if not delete_window.winfo_exists():
+            return
+        if not found:
+            messagebox.showinfo("Info", "No duplicate pages found.", parent=delete_window)
+            return
+        duplicate_of.update(found)
+        page_selections.update(found)
+        page_grid.refresh()
+        messagebox.showinfo("Duplicates", f"{len(found)} duplicate pages selected for deletion.", parent=delete_window)
 
-        page = pdf.load_page(i)
-        pix = page.get_pixmap(dpi=72) 
-        img_data = BytesIO(pix.tobytes("png"))
-        img = PILImage.open(img_data)
-        img.thumbnail((100, 100))
-        photo = ImageTk.PhotoImage(img)
-        
-        img_label = Label(page_frame, image=photo)
-        img_label.image = photo
-        img_label.pack(side="left")
+    def select_duplicates():
+        from pdftools import duplicates
+        run_job(f"Find duplicate pages in {os.path.basename(file_path)}",
+                lambda job: duplicates.duplicate_pages(file_path, progress=job.progress),
+                duplicates_found, "Failed to find duplicate pages", jobs.HIGH)
 
     def delete_selected_pages():
-        pages_to_delete = [i for i, selected in enumerate(page_selections) if selected.get()]
+        pages_to_delete = sorted(page_selections)
         if not pages_to_delete:
             messagebox.showinfo("Info", "No pages selected for deletion.")
             return
 
-        for page_num in sorted(pages_to_delete, reverse=True):
-            pdf.delete_page(page_num)
-
-        if len(pdf) == 0:
+        if len(pages_to_delete) == num_pages:
             messagebox.showerror("Error", "Cannot save a PDF with zero pages. Please ensure at least one page remains.")
             return
 
         save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
         if save_path:
-            pdf.save(save_path)
-            messagebox.showinfo("Success", "Selected pages deleted successfully.")
+            run_job(f"Delete pages from {os.path.basename(file_path)}",
+                    lambda job: engine.delete_pages(file_path, pages_to_delete, save_path, progress=job.progress),
+                    lambda result: messagebox.showinfo("Success", "Selected pages deleted successfully."),
+                    "Failed to delete pages", jobs.HIGH)
 
         delete_window.destroy()
 
     delete_btn = Button(delete_window, text="Delete Selected Pages", command=delete_selected_pages)
-    delete_btn.pack(pady=20)
-
-    canvas.configure(scrollregion=canvas.bbox("all"))
+    delete_btn.pack(side='bottom', pady=(5, 20))
+    duplicates_btn = Button(delete_window, text="Select Duplicate Pages", command=select_duplicates)
+    duplicates_btn.pack(side='bottom', pady=(20, 0))
+    page_grid.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
     delete_window.mainloop()
 
 def extract_images():
-    root = tk.Tk()
-    root.withdraw()
+    from pdftools import engine
 
     file_path = filedialog.askopenfilename(title="Select PDF", filetypes=[('PDF files', '*.pdf')])
     if not file_path:
         messagebox.showinfo("Info", "No PDF file selected.")
-        root.destroy()
         return
 
-    base_name = os.path.splitext(os.path.basename(file_path))[0]
-
     img_folder_path = filedialog.askdirectory(title="Select Folder to Save Images")
     if not img_folder_path:
-        root.destroy()
         return
 
-    def extract_images_from_pdf():
-        try:
-            pdf_file = fitz.open(file_path)
-            for page_num, page in enumerate(pdf_file, start=1):
-                image = page.get_pixmap(dpi=300)
-
-                img_name = f"{base_name}_p{page_num:03}.png"
-                img_path = os.path.join(img_folder_path, img_name)
-
-                image.save(img_path)
-
-            success_message = f"PDF extracted to {len(pdf_file)} images"
-            messagebox.showinfo("Success", success_message)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to extract images from PDF: {e}")
-        finally:
-            pdf_file.close()
-            root.destroy()
-
-    threading.Thread(target=extract_images_from_pdf).start()
+    run_job(f"Images from {os.path.basename(file_path)}",
+            lambda job: engine.extract_images(file_path, img_folder_path, dpi=300, progress=job.progress),
+            lambda image_paths: messagebox.showinfo("Success", f"PDF extracted to {len(image_paths)} images"),
+            "Failed to extract images from PDF")
 
 def convert_pdf_to_word():
-    import pdf2docx
-
-    root = tk.Tk()
-    root.withdraw()
+    from pdftools import engine
 
     pdf_file_path = filedialog.askopenfilename(title="Select a PDF file", filetypes=[("PDF files", "*.pdf")])
     if not pdf_file_path:
         messagebox.showerror("Error", "No PDF file selected.")
-        root.destroy()
         return
 
     base_name = os.path.splitext(os.path.basename(pdf_file_path))[0]
 
     save_folder = filedialog.askdirectory(title="Select a folder to save the DOCX file")
     if not save_folder:
-        root.destroy()
         return
 
     docx_file_path = os.path.join(save_folder, f"{base_name}_p.docx")
 
-    def convert_pdf_to_docx():
-        try:
-            docx_converter = pdf2docx.Converter(pdf_file_path)
-            docx_converter.convert(docx_file_path)
-            docx_converter.close()
-            messagebox.showinfo("Success", "PDF to DOCX conversion and saving completed successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to convert PDF file: {e}")
-        finally:
-            root.destroy()
+    def convert_pdf_to_docx(job):
+        def progress(done, total):
+            job.progress(done, total, message="Writing document..." if done == total else None)
 
-    threading.Thread(target=convert_pdf_to_docx).start()
+        return engine.convert_pdf_to_word(pdf_file_path, docx_file_path, progress=progress, cancel=job.cancel_event)
 
-def convert_pdf_to_excel():
-    import pdfplumber
-    from openpyxl import Workbook
+    run_job(f"Word from {os.path.basename(pdf_file_path)}", convert_pdf_to_docx,
+            lambda result: messagebox.showinfo("Success", "PDF to DOCX conversion and saving completed successfully."),
+            "Failed to convert PDF file")
 
-    root = tk.Tk()
-    root.withdraw()
+def convert_pdf_to_excel():
+    from pdftools import engine
 
     file_path = filedialog.askopenfilename(title="Select PDF", filetypes=[('PDF files', '*.pdf')])
     if not file_path:
         messagebox.showinfo("Info", "No file selected.")
         return
 
-    def convert_to_excel():
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                wb = Workbook()
-                ws = wb.active
-
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        for line in text.split('\n'):
-                            ws.append([line])
-
-                output_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], title="Save Excel File As")
-                if output_path:
-                    wb.save(output_path)
-                    messagebox.showinfo("Success", "PDF converted to Excel successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
-        finally:
-            root.destroy()
-
-    threading.Thread(target=convert_to_excel).start()
+    output_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], title="Save Excel File As")
+    if not output_path:
+        return
+
+    run_job(f"Excel from {os.path.basename(file_path)}",
+            lambda job: engine.convert_pdf_to_excel(file_path, output_path, progress=job.progress),
+            lambda rows: messagebox.showinfo("Success", "PDF converted to Excel successfully!"),
+            "An error occurred")
 
 def show_slider_and_optimize(pdf_file_path):
+    from pdftools import estimate
+
     optimization_window = Toplevel()
     optimization_window.title("Optimization Level")
     optimization_window.configure(bg='#F0F0F0')
@@ -450,23 +313,50 @@ def show_slider_and_optimize(pdf_file_path):
     title_label = Label(optimization_window, text="PDF Optimization", font=("Helvetica", 16, "bold"), bg='#F0F0F0', fg='#0000FF')
     title_label.pack(pady=10)
 
-    optimization_slider = Scale(optimization_window, from_=0, to=100, orient=tk.HORIZONTAL, label="Optimization Level (%)", bg='#F0F0F0', troughcolor='#0000FF')
-    optimization_slider.pack(pady=20, padx=20)
-
     size_label = Label(optimization_window, text="Estimated File Size: ", font=("Helvetica", 10), bg='#F0F0F0', fg='#222222')
-    size_label.pack()
+
+    estimator = estimate.SizeEstimator(pdf_file_path)
+    pending_update = None
 
     def update_size_label(value):
-        estimated_size = calculate_estimated_size(pdf_file_path, int(value))
-        size_label.config(text=f"Estimated File Size: {estimated_size:.2f} KB")
+        nonlocal pending_update
+        if pending_update is not None:
+            optimization_window.after_cancel(pending_update)
+            pending_update = None
+
+        result = estimator.request(int(value))
+        if result is not None:
+            estimated_size, error = result
+            size_label.config(text=f"Estimated File Size: {estimated_size / 1024:.2f} KB (± {error / 1024:.2f} KB)")
+        elif estimator.error is not None:
+            size_label.config(text="Estimated File Size: unavailable")
+        else:
+            size_label.config(text="Estimated File Size: calculating...")
+            pending_update = optimization_window.after(200, lambda: update_size_label(optimization_slider.get()))
+
+    def on_close(event):
+        nonlocal pending_update
+        if event.widget is optimization_window:
+            # A re-check still queued would read the slider of a destroyed window
+            if pending_update is not None:
+                optimization_window.after_cancel(pending_update)
+                pending_update = None
+            estimator.close()
+
+    optimization_slider = Scale(optimization_window, from_=0, to=100, orient=tk.HORIZONTAL, label="Optimization Level (%)", bg='#F0F0F0', troughcolor='#0000FF', command=update_size_label)
+    optimization_slider.pack(pady=20, padx=20)
+    size_label.pack()
+    optimization_window.bind("<Destroy>", on_close)
 
-    optimization_slider.bind("<Motion>", lambda event: update_size_label(optimization_slider.get()))
-    optimization_slider.bind("<ButtonRelease-1>", lambda event: update_size_label(optimization_slider.get()))
+    grayscale_var = tk.BooleanVar()
+    grayscale_chk = tk.Checkbutton(optimization_window, text="Convert images to grayscale", var=grayscale_var, bg='#F0F0F0')
+    grayscale_chk.pack(pady=5)
 
-    optimize_now_btn = Button(optimization_window, text="Optimize Now", command=lambda: optimize_pdf(pdf_file_path, optimization_slider.get(), optimization_window), bg="#4CAF50", fg="white", relief=tk.FLAT)
+    optimize_now_btn = Button(optimization_window, text="Optimize Now", command=lambda: optimize_pdf(pdf_file_path, optimization_slider.get(), optimization_window, grayscale_var.get()), bg="#4CAF50", fg="white", relief=tk.FLAT)
     optimize_now_btn.pack(pady=10)
 
     center_window_on_screen(optimization_window)
+    update_size_label(optimization_slider.get())
 
 
 def center_window_on_screen(window):
@@ -477,37 +367,20 @@ def center_window_on_screen(window):
     y = (window.winfo_screenheight() // 2) - (height // 2)
     window.geometry(f'{width}x{height}+{x}+{y}')
 
-def calculate_estimated_size(pdf_file_path, optimization_level):
-    original_size = os.path.getsize(pdf_file_path) / 1024
-    estimated_size = original_size * (1 - optimization_level / 100)
-    return estimated_size
-
-def optimize_pdf(pdf_file_path, optimization_level, optimization_window):
-    pdf_writer = PyPDF2.PdfWriter()
-    pdf_file = fitz.open(pdf_file_path)
-
-    for page_num in range(len(pdf_file)):
-        page = pdf_file[page_num]
-        pixmap = page.get_pixmap()
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".png") as temp_file:
-            pixmap.save(temp_file.name, "png")
-            image = PILImage.open(temp_file.name)
-
-            img_pdf_stream = tempfile.NamedTemporaryFile(delete=True, suffix=".pdf")
-            image.save(img_pdf_stream, "PDF", resolution=optimization_level)
-            img_pdf_stream.seek(0)
-
-            img_pdf = PyPDF2.PdfReader(img_pdf_stream)
-            pdf_writer.add_page(img_pdf.pages[0])
+def optimize_pdf(pdf_file_path, optimization_level, optimization_window, grayscale=False):
+    from pdftools import engine
 
     output_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
     if not output_path:
         return
 
-    with open(output_path, "wb") as out:
-        pdf_writer.write(out)
-    
-    messagebox.showinfo("Success", "PDF optimized")
+    def optimized(stats):
+        messagebox.showinfo("Success", f"PDF optimized: {stats['size_before'] / 1024:.2f} KB -> {stats['size_after'] / 1024:.2f} KB")
+
+    run_job(f"Optimize {os.path.basename(pdf_file_path)}",
+            lambda job: engine.optimize_pdf(pdf_file_path, optimization_level, output_path, grayscale=grayscale,
+                                           progress=job.progress),
+            optimized, "Failed to optimize the PDF")
     optimization_window.destroy()
 
 
@@ -517,50 +390,170 @@ def on_optimize_button_click():
         show_slider_and_optimize(file_path)
 
 def perform_ocr_and_convert_to_word():
-    import pdf2docx
+    from pdftools import engine
 
     pdf_file_path = filedialog.askopenfilename(title="Select PDF for OCR", filetypes=[('PDF files', '*.pdf')])
     if not pdf_file_path:
         return
 
-    encodings = ['utf-8', 'latin-1', 'cp1252']
+    save_directory = filedialog.askdirectory(title="Select a folder to save the searchable PDF and Word document")
+    if not save_directory:
+        return
 
-    def ocr_and_convert():
+    pdf_file_name = os.path.splitext(os.path.basename(pdf_file_path))[0]
+    ocr_pdf_path = os.path.join(save_directory, f"{pdf_file_name}_ocr.pdf")
+    docx_file_path = os.path.join(save_directory, f"{pdf_file_name}_ocr.docx")
+
+    def recognized(stats):
+        messagebox.showinfo("Success", f"OCR completed: {stats['image_pages']} of {stats['pages']} pages recognized "
+                                       f"({stats['cached_pages']} from cache), {stats['text_pages']} already had text.")
+
+    run_job(f"OCR {os.path.basename(pdf_file_path)}",
+            lambda job: engine.ocr_pdf(pdf_file_path, ocr_pdf_path, docx_file_path, progress=job.progress),
+            recognized, "Failed to perform OCR and convert to Word")
+
+def recipe_step(op, pages, value):
+    from pdftools import recipe
+
+    if op == "delete":
+        if not pages:
+            raise ValueError("Enter the pages to delete, e.g. 2,5-7.")
+        return {"op": "delete", "pages": pages}
+    if op == "rotate":
+        return {"op": "rotate", "pages": pages or recipe.ALL_PAGES, "degrees": int(value or 90)}
+    if op == "reorder":
+        if not pages:
+            raise ValueError("Enter the new page order, e.g. 3,1-2,4-.")
+        return {"op": "reorder", "order": pages}
+    if op == "optimize":
+        return {"op": "optimize", "level": int(value or 50)}
+    if pages:
+        return {"op": "split", "ranges": pages}
+    return {"op": "split", "every": int(value or 1)}
+
+def recipe_builder():
+    from pdftools import recipe
+
+    recipe_window = Toplevel()
+    recipe_window.title("Recipes")
+    recipe_window.geometry("520x460")
+
+    hints = {
+        "delete": "Pages: pages to delete, e.g. 2,5-7",
+        "rotate": "Pages: pages to turn (blank for all); Value: degrees (default 90)",
+        "reorder": "Pages: the new order, e.g. 3,1-2,4-",
+        "optimize": "Value: optimization level 0-100 (default 50)",
+        "split": "Pages: a file per range, e.g. 1-3,4-; or Value: pages per file",
+    }
+    steps = []
+
+    step_list = tk.Listbox(recipe_window, height=10)
+    step_list.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    def refresh(selected=None):
+        step_list.delete(0, tk.END)
+        for step in steps:
+            step_list.insert(tk.END, recipe.describe(step))
+        if selected is not None:
+            step_list.selection_set(selected)
+
+    form = ttk.Frame(recipe_window)
+    form.pack(side=tk.TOP, fill=tk.X, padx=10)
+    op_var = tk.StringVar(value=recipe.OPERATIONS[0])
+    pages_var = tk.StringVar()
+    value_var = tk.StringVar()
+    op_box = ttk.Combobox(form, textvariable=op_var, values=recipe.OPERATIONS, state="readonly", width=10)
+    op_box.grid(row=0, column=0, padx=5)
+    Label(form, text="Pages").grid(row=0, column=1)
+    tk.Entry(form, textvariable=pages_var, width=14).grid(row=0, column=2, padx=5)
+    Label(form, text="Value").grid(row=0, column=3)
+    tk.Entry(form, textvariable=value_var, width=6).grid(row=0, column=4, padx=5)
+    hint_label = Label(recipe_window, text=hints[op_var.get()], fg='#555555')
+    hint_label.pack(side=tk.TOP, pady=(5, 0))
+    op_box.bind("<<ComboboxSelected>>", lambda event: hint_label.config(text=hints[op_var.get()]))
+
+    def add_step():
         try:
-            with fitz.open(pdf_file_path) as pdf_document:
-                ocr_text = ""
-                for page_num in range(len(pdf_document)):
-                    page = pdf_document[page_num]
-                    for encoding in encodings:
-                        try:
-                            ocr_text += page.get_text("text")
-                            break
-                        except UnicodeDecodeError:
-                            pass
-
-            save_directory = filedialog.askdirectory(title="Select a folder to save the Word document")
-            if not save_directory:
-                return
+            step = recipe_step(op_var.get(), pages_var.get().strip(), value_var.get().strip())
+            recipe.Recipe(steps + [step])
+        except ValueError as e:
+            messagebox.showerror("Recipe", str(e), parent=recipe_window)
+            return
+        steps.append(step)
+        pages_var.set("")
+        value_var.set("")
+        refresh()
 
-            pdf_file_name = os.path.splitext(os.path.basename(pdf_file_path))[0]
-            html_file_path = os.path.join(save_directory, f"{pdf_file_name}.html")
+    Button(form, text="Add Step", command=add_step).grid(row=0, column=5, padx=5)
 
-            with open(html_file_path, 'w', encoding='utf-8') as html_file:
-                html_file.write(ocr_text)
+    def move_step(offset):
+        selection = step_list.curselection()
+        if not selection:
+            return
+        index = selection[0]
+        target = index + offset
+        if offset and 0 <= target < len(steps):
+            steps[index], steps[target] = steps[target], steps[index]
+            try:
+                recipe.Recipe(steps)
+            except ValueError as e:
+                steps[index], steps[target] = steps[target], steps[index]
+                messagebox.showerror("Recipe", str(e), parent=recipe_window)
+                return
+            refresh(target)
+        elif not offset:
+            del steps[index]
+            refresh()
+
+    def load_recipe():
+        path = filedialog.askopenfilename(title="Open Recipe", filetypes=[("Recipes", "*.json")], parent=recipe_window)
+        if not path:
+            return
+        try:
+            steps[:] = recipe.Recipe.load(path).steps
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Recipe", f"Failed to open the recipe: {e}", parent=recipe_window)
+        refresh()
+
+    def save_recipe():
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Recipes", "*.json")], parent=recipe_window)
+        if path:
+            recipe.Recipe(steps).save(path)
+
+    def run_recipe():
+        if not steps:
+            messagebox.showinfo("Info", "Add at least one step to the recipe.", parent=recipe_window)
+            return
+        file_paths = filedialog.askopenfilenames(title="Select PDFs", filetypes=[('PDF files', '*.pdf')], parent=recipe_window)
+        if not file_paths:
+            return
+        output_folder = filedialog.askdirectory(title="Select Folder to Save the Results", parent=recipe_window)
+        if not output_folder:
+            return
 
-            docx_file_path = os.path.join(save_directory, f"{pdf_file_name}.docx")
-            pdf2docx.convert_file(html_file_path, 'docx', outputfile=docx_file_path)
+        job_recipe = recipe.Recipe(steps)
 
-            os.remove(html_file_path)
+        def applied(results):
+            failed = [(path, result) for path, result in results if isinstance(result, Exception)]
+            for path, e in failed:
+                messagebox.showerror("Recipe Error", f"Failed to process {path}: {e}")
+            if len(failed) < len(results):
+                messagebox.showinfo("Success", f"Recipe applied to {len(results) - len(failed)} of {len(results)} files.")
 
-            messagebox.showinfo("Success", "OCR and Word conversion completed successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to perform OCR and convert to Word: {e}")
+        run_job(f"Recipe on {len(file_paths)} files",
+                lambda job: recipe.run_many(job_recipe, file_paths, output_folder, progress=job.progress),
+                applied, "Failed to apply the recipe")
 
-    threading.Thread(target=ocr_and_convert).start()
+    buttons = ttk.Frame(recipe_window)
+    buttons.pack(side=tk.BOTTOM, pady=10)
+    for column, (text, command) in enumerate([("Up", lambda: move_step(-1)), ("Down", lambda: move_step(1)),
+                                              ("Remove", lambda: move_step(0)), ("Open...", load_recipe),
+                                              ("Save...", save_recipe), ("Run on Files...", run_recipe)]):
+        Button(buttons, text=text, command=command).grid(row=0, column=column, padx=3)
 
 def start_app():
-    root = tk.Tk()
+    global main_window
+    root = main_window = tk.Tk()
     style = ttk.Style()
     root.title("PDF Tools")
     root.geometry("600x600")
@@ -577,6 +570,7 @@ def start_app():
     subtitle_label.pack()
 
     def open_paypal(event):
+        import webbrowser
         webbrowser.open_new("https://paypal.me/WAlzayer")
         
     paypal_link = ttk.Label(root, text="Donate", font=("Roboto", 10, "underline"), cursor="hand2")
@@ -595,16 +589,14 @@ def start_app():
         ("Delete Pages", delete_pages),
         ("Optimize PDF", on_optimize_button_click),
         ("Rotate Pages", rotate_pages),
-        ("OCR (TBA)", perform_ocr_and_convert_to_word)
+        ("OCR", perform_ocr_and_convert_to_word)
     ]
 
     icons = ["combine.png", "split.png", "toimages.png", "toword.png", "toexcel.png", "delete.png", "optimize.png", "rotate.png", "ocr.png"]
 
     for index, (label, command) in enumerate(function_mappings):
         row, col = divmod(index, 3)
-        icon_path = resource_path(os.path.join("icons", icons[index]))
-        icon_image = PILImage.open(icon_path).resize((50, 50), PILImage.Resampling.LANCZOS)
-        photo = ImageTk.PhotoImage(icon_image)
+        photo = load_icon(icons[index])
         btn = ttk.Button(frame, text=label, image=photo, compound="top", command=command)
         btn.image = photo
         btn.grid(row=row, column=col, padx=10, pady=10, sticky='ewns')
@@ -614,7 +606,41 @@ def start_app():
     for i in range((len(function_mappings) + 2) // 3):
         frame.rowconfigure(i, weight=1)
 
+    recipes_btn = ttk.Button(root, text="Recipes", command=recipe_builder)
+    recipes_btn.pack(pady=(0, 10))
+
+    jobs_label = ttk.Label(root, text="No jobs running", font=("Roboto", 10, "underline"), cursor="hand2")
+    jobs_label.bind("<Button-1>", lambda event: show_job_list(root, scheduler))
+    jobs_label.pack(pady=(0, 10))
+
+    def update_jobs_label(changed):
+        active = scheduler.active()
+        running = sum(job.status == jobs.RUNNING for job in active)
+        queued = len(active) - running
+        jobs_label.config(text=f"Jobs: {running} running, {queued} queued" if active else "No jobs running")
+
+    def on_close():
+        if scheduler.active() and not messagebox.askyesno("Quit", "Jobs are still running. Cancel them and quit?"):
+            return
+        scheduler.shutdown()
+        root.destroy()
+
+    def on_map(event):
+        if event.widget is not root:
+            return
+        root.unbind("<Map>")
+        if os.environ.get(EXIT_AFTER_START_ENV):
+            root.after_idle(root.destroy)
+            return
+        threading.Thread(target=prewarm, args=(time.perf_counter() - launched,), name="prewarm", daemon=True).start()
+
+    scheduler.listeners.append(update_jobs_label)
+    poll_jobs(root, scheduler)
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.bind("<Map>", on_map)
     root.mainloop()
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     start_app()
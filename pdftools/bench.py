@@ -0,0 +1,447 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdftools import cache, conversion, engine, memory, thumbnails
+
+# Sizes of the generated inputs
+SCALES = {
+    "small": dict(text_pages=40, scan_pages=10, many_pages=500, table_pages=8, word_pages=2, xlsx_rows=5000,
+                  docx_paragraphs=300, images=20),
+    "large": dict(text_pages=400, scan_pages=100, many_pages=5000, table_pages=80, word_pages=10, xlsx_rows=100000,
+                  docx_paragraphs=3000, images=200),
+}
+REPEAT = 3
+# Cold starts of the GUI per timed run, and the variable that makes it quit once its window is shown
+STARTUP_RUNS = 5
+EXIT_AFTER_START_ENV = "PDFTOOLS_EXIT_AFTER_START"
+RESULTS_VERSION = 1
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et "
+         "dolore magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex "
+         "ea commodo consequat invoice total amount balance account quarterly report").split()
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng, sentences=6):
+    return " ".join(_sentence(rng, rng.randint(6, 16)) for _ in range(sentences))
+
+
+def make_text_pdf(path, pages, seed=1):
+    # Dense body text, as in reports and contracts
+    rng = random.Random(seed)
+    with fitz.open() as pdf:
+        for page_num in range(pages):
+            page = pdf.new_page()
+            page.insert_text((72, 60), f"Section {page_num + 1}", fontsize=16, fontname="hebo")
+            page.insert_textbox(fitz.Rect(72, 80, 523, 780), "\n\n".join(_paragraph(rng) for _ in range(5)),
+                                fontsize=10, fontname="helv")
+        pdf.save(path, garbage=3, deflate=True)
+    return path
+
+
+def make_scan_pdf(path, pages, dpi=150, seed=2):
+    # Every page a greyscale JPEG of a text page, like the output of a scanner
+    with fitz.open() as source, fitz.open() as pdf:
+        # A few distinct scans, repeated; each page still gets its own copy of the image
+        rng = random.Random(seed)
+        for _ in range(max(1, min(pages, 5))):
+            page = source.new_page()
+            page.insert_textbox(fitz.Rect(72, 72, 523, 780), "\n\n".join(_paragraph(rng) for _ in range(6)),
+                                fontsize=11, fontname="tiro")
+        scans = [page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("jpg", jpg_quality=85) for page in source]
+        for page_num in range(pages):
+            page = pdf.new_page()
+            page.insert_image(page.rect, stream=scans[page_num % len(scans)])
+        pdf.save(path, garbage=3, deflate=True)
+    return path
+
+
+def make_many_page_pdf(path, pages):
+    # Short pages in large numbers, where per-page overhead dominates
+    with fitz.open() as pdf:
+        for page_num in range(pages):
+            page = pdf.new_page(width=420, height=595)
+            page.insert_text((50, 80), f"Page {page_num + 1} of {pages}", fontsize=14)
+        pdf.save(path, garbage=3, deflate=True)
+    return path
+
+
+def make_table_pdf(path, pages, rows=30, columns=6, seed=3):
+    # Ruled tables of codes, names and amounts
+    rng = random.Random(seed)
+    with fitz.open() as pdf:
+        for page_num in range(pages):
+            page = pdf.new_page()
+            left, top, width, height = 50, 60, 495 / columns, 22
+            for row in range(rows + 1):
+                y = top + row * height
+                page.draw_line((left, y), (left + columns * width, y), width=0.5)
+            for column in range(columns + 1):
+                x = left + column * width
+                page.draw_line((x, top), (x, top + rows * height), width=0.5)
+            for row in range(rows):
+                cells = [f"A{page_num:03}{row:03}", rng.choice(WORDS).title()]
+                cells += [f"{rng.uniform(0, 10000):.2f}" for _ in range(columns - 2)]
+                for column, text in enumerate(cells):
+                    page.insert_text((left + column * width + 3, top + row * height + 15), text, fontsize=9)
+        pdf.save(path, garbage=3, deflate=True)
+    return path
+
+
+def make_images(folder, count, size=(1600, 1200), seed=4):
+    # Photo-sized JPEGs with smooth gradients and noise, so they compress like photos
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(count):
+        noise = Image.effect_noise((size[0] // 8, size[1] // 8), rng.uniform(20, 80))
+        image = Image.merge("RGB", [noise.point(lambda v, shift=shift: (v + shift) % 256) for shift in (0, 80, 160)])
+        image = image.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+        path = os.path.join(folder, f"photo_{index:04}.jpg")
+        image.save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def make_xlsx(path, rows, columns=8, seed=5):
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append(["Code", "Name"] + [f"Value {column}" for column in range(1, columns - 1)])
+    for row in range(rows):
+        sheet.append([f"R{row:06}", rng.choice(WORDS).title()] + [round(rng.uniform(0, 1e6), 2)
+                                                                  for _ in range(columns - 2)])
+    workbook.save(path)
+    return path
+
+
+def make_docx(path, paragraphs, seed=6):
+    from docx import Document
+
+    rng = random.Random(seed)
+    document = Document()
+    for index in range(paragraphs):
+        if index % 20 == 0:
+            document.add_heading(f"Chapter {index // 20 + 1}", level=1)
+        document.add_paragraph(_paragraph(rng))
+    document.save(path)
+    return path
+
+
+def generate(folder, scale="small"):
+    # Writes the synthetic inputs for a scale into folder; returns their paths by name
+    sizes = SCALES[scale]
+    os.makedirs(folder, exist_ok=True)
+    return {
+        "text": make_text_pdf(os.path.join(folder, "text.pdf"), sizes["text_pages"]),
+        "scan": make_scan_pdf(os.path.join(folder, "scan.pdf"), sizes["scan_pages"]),
+        "many": make_many_page_pdf(os.path.join(folder, "many.pdf"), sizes["many_pages"]),
+        "tables": make_table_pdf(os.path.join(folder, "tables.pdf"), sizes["table_pages"]),
+        "word": make_text_pdf(os.path.join(folder, "word.pdf"), sizes["word_pages"], seed=7),
+        "images": make_images(os.path.join(folder, "images"), sizes["images"]),
+        "xlsx": make_xlsx(os.path.join(folder, "sheet.xlsx"), sizes["xlsx_rows"]),
+        "docx": make_docx(os.path.join(folder, "document.docx"), sizes["docx_paragraphs"]),
+    }
+
+
+def _pages(path):
+    return engine.page_count(path)
+
+
+class _Latencies:
+    # Progress callback that records the time between consecutive items
+    def __init__(self):
+        self.samples = []
+        self.last = time.perf_counter()
+
+    def __call__(self, *args):
+        now = time.perf_counter()
+        self.samples.append(now - self.last)
+        self.last = now
+
+
+# Each benchmark: (inputs, output folder, workers) -> (units done, per-item latencies or None)
+def bench_combine(inputs, out, workers):
+    sources = [inputs["text"], inputs["scan"], inputs["many"], inputs["tables"]]
+    failed = engine.combine_files(sources, os.path.join(out, "combined.pdf"), workers=workers)
+    if failed:
+        raise failed[0][1]
+    return sum(_pages(path) for path in sources), None
+
+
+def bench_combine_converted(inputs, out, workers):
+    sources = inputs["images"] + [inputs["xlsx"]]
+    failed = engine.combine_files(sources, os.path.join(out, "combined.pdf"), workers=workers)
+    if failed:
+        raise failed[0][1]
+    return len(sources), None
+
+
+def bench_photos(inputs, out, workers):
+    latencies = _Latencies()
+    pages, failed = conversion.images_to_pdf(inputs["images"], os.path.join(out, "album.pdf"), progress=latencies)
+    return pages, latencies.samples
+
+
+def bench_xlsx(inputs, out, workers):
+    conversion.convert_xlsx_to_pdf(inputs["xlsx"], out)
+    return SCALES[inputs["scale"]]["xlsx_rows"], None
+
+
+def bench_docx(inputs, out, workers):
+    conversion.convert_docx_to_pdf(inputs["docx"], out)
+    return 1, None
+
+
+def bench_split(inputs, out, workers):
+    return len(engine.split_pdf(inputs["many"], out, workers=workers)), None
+
+
+def bench_render(inputs, out, workers):
+    latencies = _Latencies()
+    image_paths = engine.extract_images(inputs["text"], out, dpi=150, workers=workers, progress=latencies)
+    return len(image_paths), latencies.samples
+
+
+def bench_optimize(inputs, out, workers):
+    engine.optimize_pdf(inputs["scan"], 50, os.path.join(out, "optimized.pdf"))
+    return _pages(inputs["scan"]), None
+
+
+def bench_excel(inputs, out, workers):
+    latencies = _Latencies()
+    engine.convert_pdf_to_excel(inputs["tables"], os.path.join(out, "tables.xlsx"), workers=workers, progress=latencies)
+    return _pages(inputs["tables"]), latencies.samples
+
+
+def bench_word(inputs, out, workers):
+    engine.convert_pdf_to_word(inputs["word"], os.path.join(out, "word.docx"), workers=workers)
+    return _pages(inputs["word"]), None
+
+
+def bench_thumbnails(inputs, out, workers):
+    # Cold: every thumbnail rendered by the worker pool, as when a document is first opened
+    renderer = thumbnails.ThumbnailRenderer(inputs["many"], workers)
+    try:
+        page_total = _pages(inputs["many"])
+        samples = []
+        started = time.perf_counter()
+        futures = [renderer.submit(page_num) for page_num in range(page_total)]
+        for future in futures:
+            future.result()
+            samples.append(time.perf_counter() - started)
+        # Latency of each thumbnail as the time since the previous one arrived
+        samples = [b - a for a, b in zip([0.0] + samples, samples)]
+        return page_total, samples
+    finally:
+        renderer.close()
+
+
+def bench_thumbnails_cached(inputs, out, workers):
+    # Warm: the thumbnails the untimed cold pass left in the disk cache, read back
+    renderer = thumbnails.ThumbnailRenderer(inputs["many"], workers)
+    try:
+        samples = []
+        for page_num in range(_pages(inputs["many"])):
+            started = time.perf_counter()
+            if renderer.load(page_num) is None:
+                raise RuntimeError("Thumbnail cache is unavailable.")
+            samples.append(time.perf_counter() - started)
+        return len(samples), samples
+    finally:
+        renderer.close()
+
+
+def bench_startup(inputs, out, workers):
+    # Time to first window of main.py in a fresh interpreter, imports and icons
+    # included; needs a display
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, **{EXIT_AFTER_START_ENV: "1"})
+    samples = []
+    for _ in range(STARTUP_RUNS):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "main.py"], cwd=app_dir, env=env, capture_output=True, text=True)
+        if result.returncode:
+            lines = result.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"main.py exited with status {result.returncode}")
+        samples.append(time.perf_counter() - started)
+    return len(samples), samples
+
+
+# name -> (function, unit, untimed setup run before each timed run)
+BENCHMARKS = {
+    "combine": (bench_combine, "pages", None),
+    "combine_converted": (bench_combine_converted, "files", None),
+    "photos": (bench_photos, "images", None),
+    "xlsx_to_pdf": (bench_xlsx, "rows", None),
+    "docx_to_pdf": (bench_docx, "files", None),
+    "split": (bench_split, "files", None),
+    "render": (bench_render, "pages", None),
+    "optimize": (bench_optimize, "pages", None),
+    "excel": (bench_excel, "pages", None),
+    "word": (bench_word, "pages", None),
+    "thumbnails": (bench_thumbnails, "pages", None),
+    "thumbnails_cached": (bench_thumbnails_cached, "pages", bench_thumbnails),
+    "startup": (bench_startup, "starts", None),
+}
+
+
+def percentile(samples, fraction):
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def summarize(durations, units, unit, latencies):
+    median = percentile(durations, 0.5)
+    samples = latencies or durations
+    return {
+        "unit": unit,
+        "units": units,
+        "runs": [round(duration, 4) for duration in durations],
+        "seconds": round(median, 4),
+        "throughput": round(units / median, 2) if median else None,
+        "latency_ms": {name: round(percentile(samples, fraction) * 1000, 3)
+                       for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        "latency_of": "item" if latencies else "run",
+    }
+
+
+def _run_benchmark(name, inputs, work_dir, repeat, workers):
+    # In its own process, so peak memory is this benchmark's alone. Every run
+    # starts with an empty cache folder and output folder.
+    function, unit, setup = BENCHMARKS[name]
+    # Library progress logging (pdf2docx logs every page) is not part of the work
+    logging.disable(logging.INFO)
+    durations = []
+    latencies = []
+    units = 0
+    for run in range(repeat):
+        run_dir = os.path.join(work_dir, f"{name}-{run}")
+        out = os.path.join(run_dir, "out")
+        os.makedirs(out)
+        os.environ[cache.CACHE_DIR_ENV] = os.path.join(run_dir, "cache")
+        if setup is not None:
+            setup(inputs, out, workers)
+        started = time.perf_counter()
+        units, samples = function(inputs, out, workers)
+        durations.append(time.perf_counter() - started)
+        latencies += samples or []
+        shutil.rmtree(run_dir, ignore_errors=True)
+    result = summarize(durations, units, unit, latencies)
+    result["peak_rss"] = memory.peak_rss()
+    result["peak_worker_rss"] = memory.peak_child_rss()
+    return result
+
+
+def run(names=None, scale="small", repeat=REPEAT, workers=None, work_dir=None, log=None):
+    # Generates the inputs, runs each benchmark in a fresh process and returns
+    # the results as a JSON-ready dict. A benchmark that can't run here (Word
+    # conversion without Microsoft Word, say) is reported with its error.
+    names = list(names or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pdftools-bench-")
+    try:
+        started = time.perf_counter()
+        inputs = generate(os.path.join(work_dir, "inputs"), scale)
+        inputs["scale"] = scale
+        if log:
+            log(f"Generated {scale} inputs in {time.perf_counter() - started:.1f}s")
+        results = {}
+        context = multiprocessing.get_context("spawn")
+        for name in names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                try:
+                    results[name] = pool.submit(_run_benchmark, name, inputs, work_dir, repeat, workers).result()
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}"}
+            if log:
+                result = results[name]
+                if "error" in result:
+                    log(f"{name:18} error: {result['error']}")
+                else:
+                    log(f"{name:18} {result['seconds']:8.3f}s  {result['throughput']:10.1f} {result['unit']}/s  "
+                        f"p90 {result['latency_ms']['p90']:.1f} ms")
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": scale,
+        "repeat": repeat,
+        "workers": workers,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pymupdf": fitz.VersionBind,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(previous, current):
+    # Lines of "name: before -> after (speedup)" for benchmarks present in both runs
+    lines = []
+    for name, result in current["benchmarks"].items():
+        before = previous.get("benchmarks", {}).get(name, {})
+        if "seconds" in result and "seconds" in before:
+            lines.append(f"{name:18} {before['seconds']:8.3f}s -> {result['seconds']:8.3f}s  "
+                         f"x{before['seconds'] / result['seconds']:.2f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pdftools.bench",
+                                     description="Time the PDF tools on generated documents.")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="size of the generated inputs")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs of each benchmark")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes for tools that use them")
+    parser.add_argument("--only", nargs="+", metavar="NAME", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--keep", metavar="FOLDER", help="generate the inputs in this folder and keep them")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    results = run(args.only, args.scale, args.repeat, args.workers, args.keep, log)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            for line in compare(json.load(f), results):
+                log(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from pdftools import pdfsyntax
+
+CACHE_DIR_ENV = "PDFTOOLS_CACHE_DIR"
+FINGERPRINT_STORE_BYTES = 4 * 1024 * 1024
+# Evict down to this fraction of the limit so every put doesn't trigger another sweep
+EVICT_TO = 0.9
+
+_fingerprints = {}
+_stores = {}
+_lock = threading.Lock()
+
+
+def cache_dir(*parts):
+    base = os.environ.get(CACHE_DIR_ENV)
+    if not base:
+        root = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                or os.path.join(os.path.expanduser("~"), ".cache"))
+        base = os.path.join(root, "pdftools")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class BlobStore:
+    # Key -> bytes in a single SQLite file, evicting the least recently used
+    # entries once the total size passes max_bytes. Failures only cost a cache miss.
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS blobs "
+                           "(key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_used ON blobs (used)")
+
+    def get(self, key):
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM blobs WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("UPDATE blobs SET used = ? WHERE key = ?", (time.time(), key))
+                return row[0]
+        except sqlite3.Error:
+            return None
+
+    def put(self, key, data):
+        try:
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO blobs (key, data, size, used) VALUES (?, ?, ?, ?)",
+                                   (key, data, len(data), time.time()))
+                self._evict()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self):
+        # Recount each time: other processes write to the same file
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM blobs ORDER BY used"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM blobs WHERE key = ?", doomed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def file_key(file_path):
+    # Identifies the file as it is now: path, size and mtime, from a stat only
+    stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def lazy_store(name, max_bytes):
+    # The BlobStore cache_dir()/<name>.sqlite3, opened on first use and shared by
+    # every caller in the process. None when the cache folder isn't writable:
+    # every on-disk cache is optional and callers just recompute.
+    with _lock:
+        if name not in _stores:
+            try:
+                _stores[name] = BlobStore(os.path.join(cache_dir(), f"{name}.sqlite3"), max_bytes)
+            except (OSError, sqlite3.Error):
+                _stores[name] = None
+        return _stores[name]
+
+
+def known_fingerprint(file_path):
+    # The fingerprint if the file, unchanged, was hashed before; None rather than reading it
+    stat_key = file_key(file_path)
+    with _lock:
+        fingerprint = _fingerprints.get(stat_key)
+    if fingerprint is not None:
+        return fingerprint
+
+    store = lazy_store("fingerprints", FINGERPRINT_STORE_BYTES)
+    stored = store.get(stat_key) if store else None
+    if stored is None:
+        return None
+    fingerprint = stored.decode("ascii")
+    with _lock:
+        _fingerprints[stat_key] = fingerprint
+    return fingerprint
+
+
+def file_fingerprint(file_path):
+    # Content hash, remembered per (path, size, mtime) so unchanged files are read only once
+    stat_key = file_key(file_path)
+    fingerprint = known_fingerprint(file_path)
+    if fingerprint is not None:
+        return fingerprint
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    fingerprint = digest.hexdigest()
+    store = lazy_store("fingerprints", FINGERPRINT_STORE_BYTES)
+    if store:
+        store.put(stat_key, fingerprint.encode("ascii"))
+    with _lock:
+        _fingerprints[stat_key] = fingerprint
+    return fingerprint
+
+
+def page_hash(page, memo=None):
+    # Hash of everything a page draws: its size and rotation, its content
+    # streams, its annotations (stamps, notes, form fields and their
+    # appearances) and, recursively, every object these use (Form XObjects and
+    # their own resources, images, fonts...). Object numbers are left out, so a copy
+    # of the page in another file hashes the same. memo maps object numbers to
+    # their hashes; share one across the pages of a document so its fonts and
+    # images are read once.
+    doc = page.parent
+    memo = {} if memo is None else memo
+
+    def object_hash(xref):
+        if xref not in memo:
+            memo[xref] = "cycle"
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(value_hash(doc.xref_object(xref, compressed=True)).encode())
+            if doc.xref_is_stream(xref):
+                digest.update(doc.xref_stream_raw(xref) or b"")
+            memo[xref] = digest.hexdigest()
+        return memo[xref]
+
+    def value_hash(text):
+        # Links back up the tree (to the page, its parent...) aren't part of what a page draws
+        text = pdfsyntax.strip_back_references(text)
+        return pdfsyntax.REFERENCE.sub(lambda match: object_hash(int(match.group(1))), text)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{tuple(page.rect)}|{page.rotation}".encode())
+    for key in ("Contents", "Resources", "Annots"):
+        kind, value = doc.xref_get_key(page.xref, key)
+        node = page.xref
+        # Resources can be inherited from the page tree
+        while kind == "null" and key == "Resources":
+            kind, parent = doc.xref_get_key(node, "Parent")
+            if kind != "xref":
+                break
+            node = int(parent.split()[0])
+            kind, value = doc.xref_get_key(node, key)
+        digest.update(f"|{key}:{value_hash(value) if kind != 'null' else ''}".encode())
+    return digest.hexdigest()
@@ -0,0 +1,357 @@
+import argparse
+import glob
+import os
+import sys
+
+from pdftools import conversion, duplicates, engine, metrics, ocr, optimize, recipe, watch
+
+
+def expand_inputs(patterns, extensions, recursive=False):
+    paths = []
+    seen = set()
+
+    def add(path):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            paths.append(path)
+
+    def walk(folder):
+        with os.scandir(folder) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir():
+                    if recursive:
+                        walk(entry.path)
+                elif conversion.file_extension(entry.name) in extensions:
+                    add(entry.path)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walk(pattern)
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise FileNotFoundError(f"No files match {pattern!r}")
+        for match in matches:
+            if os.path.isdir(match):
+                walk(match)
+            else:
+                add(match)
+    return paths
+
+
+def run_batch(paths, operation, quiet=False):
+    failures = 0
+    for path in paths:
+        try:
+            result = operation(path)
+        except Exception as e:
+            failures += 1
+            print(f"{path}: error: {e}", file=sys.stderr)
+            continue
+        if not quiet:
+            print(f"{path}: {result}")
+    if failures:
+        print(f"{failures} of {len(paths)} files failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def cmd_combine(args, paths):
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    stats = {}
+    try:
+        failed = engine.combine_files(paths, args.output, streaming=args.stream, stats=stats, workers=args.workers,
+                                      drop_duplicates=args.drop_duplicates)
+    except Exception as e:
+        print(f"{args.output}: error: {e}", file=sys.stderr)
+        return 1
+    for path, error in failed:
+        print(f"{path}: error: {error}", file=sys.stderr)
+    if not args.quiet:
+        print(f"Combined {len(paths) - len(failed)} files into {args.output}")
+        if args.drop_duplicates:
+            print(f"{stats.get('duplicate_pages', 0)} duplicate pages left out")
+        if "pages_per_second" in stats:
+            peak = f"{stats['peak_rss'] / 1024 / 1024:.0f} MB" if stats["peak_rss"] else "unknown"
+            print(f"{stats['pages']} pages in {stats['seconds']:.1f}s ({stats['pages_per_second']:.0f} pages/s, "
+                  f"{stats['mb_per_second']:.1f} MB/s), {stats['objects_deduplicated']} shared objects merged, "
+                  f"peak memory {peak}")
+    return 1 if failed else 0
+
+
+def cmd_duplicates(args, paths):
+    # Reports the pages that repeat an earlier page, in these files or across them
+    max_distance = duplicates.NEAR_DISTANCE if args.near else -1
+    try:
+        found = duplicates.find_duplicates(paths, max_distance, workers=args.workers)
+    except Exception as e:
+        print(f"pdftools: error: {e}", file=sys.stderr)
+        return 1
+    for (path, page_num), ((original_path, original_page), exact) in found.items():
+        original = f"page {original_page + 1}" + ("" if original_path == path else f" of {original_path}")
+        print(f"{path}: page {page_num + 1} is {'a copy' if exact else 'a near copy'} of {original}")
+    if not args.quiet:
+        print(f"{len(found)} duplicate pages found", file=sys.stderr)
+    return 0
+
+
+def cmd_photos(args, paths):
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    try:
+        pages, failed = conversion.images_to_pdf(paths, args.output, page_size=args.page_size, margin=args.margin)
+    except Exception as e:
+        print(f"{args.output}: error: {e}", file=sys.stderr)
+        return 1
+    for path, error in failed:
+        print(f"{path}: error: {error}", file=sys.stderr)
+    if not args.quiet:
+        print(f"Added {pages} images to {args.output}")
+    return 1 if failed else 0
+
+
+def cmd_convert(args, paths):
+    return run_batch(paths, lambda path: conversion.convert_to_pdf(path, args.output_dir), args.quiet)
+
+
+def file_size(text):
+    # "800k", "5MB", "1.5g" -> bytes
+    number = text.strip().upper().rstrip("B")
+    scale = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(number[-1:], 1)
+    try:
+        return int(float(number.rstrip("KMG")) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a file size: {text!r}") from None
+
+
+def cmd_split(args, paths):
+    name_format = args.name_format
+    if name_format is None and not (args.ranges or args.every or args.bookmarks or args.max_size):
+        name_format = "{stem}_page_{page}.pdf"
+
+    def split(path):
+        output_paths = engine.split_pdf(path, args.output_dir, name_format, ranges=args.ranges, every=args.every,
+                                        bookmarks=args.bookmarks, max_bytes=args.max_size, compact=args.compact,
+                                        workers=args.workers)
+        return f"{len(output_paths)} files written"
+    return run_batch(paths, split, args.quiet)
+
+
+def cmd_images(args, paths):
+    def images(path):
+        return f"{len(engine.extract_images(path, args.output_dir, dpi=args.dpi, workers=args.workers))} images written"
+    return run_batch(paths, images, args.quiet)
+
+
+def cmd_word(args, paths):
+    def word(path):
+        output_path = conversion.output_path_for(path, "docx", args.output_dir, "_p")
+        return engine.convert_pdf_to_word(path, output_path, workers=args.workers)
+    return run_batch(paths, word, args.quiet)
+
+
+def cmd_excel(args, paths):
+    def excel(path):
+        output_path = conversion.output_path_for(path, "xlsx", args.output_dir)
+        rows = engine.convert_pdf_to_excel(path, output_path, sheet_per=args.sheet_per, workers=args.workers)
+        return f"{output_path} ({rows} rows)"
+    return run_batch(paths, excel, args.quiet)
+
+
+def cmd_ocr(args, paths):
+    def recognize(path):
+        pdf_output = conversion.output_path_for(path, "pdf", args.output_dir, "_ocr")
+        docx_output = None if args.no_docx else conversion.output_path_for(path, "docx", args.output_dir, "_ocr")
+        stats = ocr.ocr_pdf(path, pdf_output, docx_output, language=args.lang, dpi=args.dpi, workers=args.workers)
+        return (f"{pdf_output} ({stats['image_pages']} of {stats['pages']} pages recognized, "
+                f"{stats['cached_pages']} from cache)")
+    return run_batch(paths, recognize, args.quiet)
+
+
+def cmd_delete(args, paths):
+    def delete(path):
+        pages = engine.parse_page_ranges(args.pages, engine.page_count(path))
+        output_path = conversion.output_path_for(path, "pdf", args.output_dir, args.suffix)
+        engine.delete_pages(path, pages, output_path)
+        return output_path
+    return run_batch(paths, delete, args.quiet)
+
+
+def cmd_rotate(args, paths):
+    def rotate(path):
+        page_count = engine.page_count(path)
+        pages = engine.parse_page_ranges(args.pages, page_count)
+        rotations = {page_num: args.angle % 360 for page_num in pages}
+        output_path = conversion.output_path_for(path, "pdf", args.output_dir, args.suffix)
+        engine.rotate_pages(path, range(page_count), rotations, output_path)
+        return output_path
+    return run_batch(paths, rotate, args.quiet)
+
+
+def cmd_optimize(args, paths):
+    def optimize_file(path):
+        output_path = conversion.output_path_for(path, "pdf", args.output_dir, args.suffix)
+        stats = optimize.optimize_pdf(path, output_path, args.level, grayscale=args.grayscale,
+                                      quality=args.quality, target_dpi=args.dpi)
+        return (f"{output_path} ({stats['size_before'] // 1024} KB -> {stats['size_after'] // 1024} KB, "
+                f"{stats['images_rewritten']} of {stats['images']} images recompressed)")
+    return run_batch(paths, optimize_file, args.quiet)
+
+
+def cmd_recipe(args, paths):
+    try:
+        steps = recipe.Recipe.load(args.recipe)
+    except (OSError, ValueError) as e:
+        print(f"pdftools: {args.recipe}: {e}", file=sys.stderr)
+        return 2
+    results = recipe.run_many(steps, paths, args.output_dir, workers=args.workers)
+    failures = 0
+    for path, result in results:
+        if isinstance(result, Exception):
+            failures += 1
+            print(f"{path}: error: {result}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"{path}: {len(result)} files written")
+    if failures:
+        print(f"{failures} of {len(paths)} files failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def cmd_watch(args, paths):
+    if len(paths) > 1:
+        print("pdftools: watch takes a single config file", file=sys.stderr)
+        return 2
+    try:
+        config = watch.load_config(paths[0])
+    except (OSError, ValueError) as e:
+        print(f"pdftools: {paths[0]}: {e}", file=sys.stderr)
+        return 2
+    if args.workers:
+        config["workers"] = args.workers
+    try:
+        watch.Watcher(**config).run(once=args.once)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pdftools", description="Batch PDF tools without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, handler, help_text, extensions=('pdf',), output_dir=True):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("inputs", nargs="+", help="files, glob patterns or directories")
+        sub.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+        sub.add_argument("-q", "--quiet", action="store_true", help="only report errors")
+        sub.add_argument("--profile", action="store_true",
+                         help="profile this run with cProfile and tracemalloc; worker processes are not "
+                              "profiled, so use -j 1 to see everything")
+        if output_dir:
+            sub.add_argument("-o", "--output-dir", default=".", help="folder for the results (default: current folder)")
+        sub.set_defaults(handler=handler, extensions=extensions)
+        return sub
+
+    sub = add_command("combine", cmd_combine, "combine files into a single PDF", conversion.SUPPORTED_EXTENSIONS,
+                      output_dir=False)
+    sub.add_argument("-o", "--output", required=True, help="combined PDF to write")
+    sub.add_argument("-j", "--workers", type=int, help="parallel conversions (default: up to 4)")
+    sub.add_argument("--stream", action="store_true", default=None,
+                     help="merge in batches with bounded memory (default: only for very large merges)")
+    sub.add_argument("--drop-duplicates", nargs="?", const="exact", choices=engine.DROP_DUPLICATES,
+                     help="leave out pages that repeat an earlier page; 'near' also drops rescans of it "
+                          "(default: exact)")
+
+    sub = add_command("duplicates", cmd_duplicates, "list pages that repeat an earlier page, within or across PDFs",
+                      output_dir=False)
+    sub.add_argument("--near", action="store_true", help="also report near-identical pages, such as rescans")
+    sub.add_argument("-j", "--workers", type=int, help="fingerprinting processes per file (default: one per CPU)")
+
+    sub = add_command("photos", cmd_photos, "put images into one PDF, one per page", conversion.IMAGE_EXTENSIONS,
+                      output_dir=False)
+    sub.add_argument("-o", "--output", required=True, help="PDF to write")
+    sub.add_argument("--page-size", help="paper size such as a4 or letter (default: each page the size of its image)")
+    sub.add_argument("--margin", type=float, default=0, help="margin around each image in points")
+
+    add_command("convert", cmd_convert, "convert images, Excel and Word files to PDF",
+                conversion.SUPPORTED_EXTENSIONS[1:])
+
+    sub = add_command("split", cmd_split, "split PDFs into single pages, page ranges or sections")
+    mode = sub.add_mutually_exclusive_group()
+    mode.add_argument("--ranges", help="a file per comma-separated range, e.g. 1-3,4-10,11-")
+    mode.add_argument("--every", type=int, help="a file every N pages")
+    mode.add_argument("--bookmarks", type=int, nargs="?", const=1,
+                      help="a file per bookmark, down to the given outline level (default: 1)")
+    mode.add_argument("--max-size", type=file_size, help="files of about this size at most, e.g. 10MB")
+    sub.add_argument("--name-format",
+                     help="output file name, with {stem}, {page}, {first}, {last}, {part} and {title}")
+    sub.add_argument("--compact", action="store_true",
+                     help="deduplicate and compress each file (slower, smaller files)")
+    sub.add_argument("-j", "--workers", type=int, help="writer processes per file (default: one per CPU)")
+
+    sub = add_command("images", cmd_images, "render PDF pages to PNG images")
+    sub.add_argument("--dpi", type=int, default=300)
+    sub.add_argument("-j", "--workers", type=int, help="render processes per file (default: one per CPU)")
+
+    sub = add_command("word", cmd_word, "convert PDFs to Word documents")
+    sub.add_argument("-j", "--workers", type=int, help="conversion processes per file (default: one per CPU)")
+    sub = add_command("excel", cmd_excel, "convert PDFs to Excel workbooks")
+    sub.add_argument("--sheet-per", choices=("table", "page"), default="table",
+                     help="a sheet for every table, or for every page (default: table)")
+    sub.add_argument("-j", "--workers", type=int, help="extraction processes per file (default: one per CPU)")
+
+    sub = add_command("ocr", cmd_ocr, "make scanned PDFs searchable and export their text to Word")
+    sub.add_argument("--lang", default=ocr.LANGUAGE, help="Tesseract language(s), e.g. eng or eng+deu")
+    sub.add_argument("--dpi", type=int, default=ocr.OCR_DPI, help="resolution pages are recognized at")
+    sub.add_argument("-j", "--workers", type=int, help="OCR processes per file (default: one per CPU)")
+    sub.add_argument("--no-docx", action="store_true", help="only write the searchable PDF")
+
+    sub = add_command("delete", cmd_delete, "delete pages from PDFs")
+    sub.add_argument("--pages", required=True, help="pages to delete, e.g. 1,3-5,10-")
+    sub.add_argument("--suffix", default="_deleted", help="appended to output file names")
+
+    sub = add_command("rotate", cmd_rotate, "rotate pages of PDFs")
+    sub.add_argument("--pages", default="1-", help="pages to rotate (default: all)")
+    sub.add_argument("--angle", type=int, choices=(90, 180, 270, -90), default=90)
+    sub.add_argument("--suffix", default="_rotated", help="appended to output file names")
+
+    sub = add_command("optimize", cmd_optimize, "reduce PDF file size")
+    sub.add_argument("--level", type=int, default=50, help="optimization level 0-100")
+    sub.add_argument("--quality", type=int, help="JPEG quality for recompressed images (overrides --level)")
+    sub.add_argument("--dpi", type=int, help="downsample images above this resolution (overrides --level)")
+    sub.add_argument("--grayscale", action="store_true", help="convert images to grayscale")
+    sub.add_argument("--suffix", default="_optimized", help="appended to output file names")
+
+    sub = add_command("recipe", cmd_recipe, "apply a saved recipe of page operations to PDFs")
+    sub.add_argument("--recipe", required=True, help="recipe file saved from the Recipes window")
+    sub.add_argument("-j", "--workers", type=int, help="files processed at once (default: one per CPU)")
+
+    sub = add_command("watch", cmd_watch, "process files dropped into folders, as set out in a JSON config",
+                      ('json',), output_dir=False)
+    sub.add_argument("--once", action="store_true", help="process what is waiting now, then exit")
+    sub.add_argument("-j", "--workers", type=int, help="files processed at once (default: one per CPU)")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        paths = expand_inputs(args.inputs, args.extensions, args.recursive)
+    except (FileNotFoundError, NotADirectoryError) as e:
+        print(f"pdftools: {e}", file=sys.stderr)
+        return 2
+    if not paths:
+        print("pdftools: no input files found", file=sys.stderr)
+        return 2
+
+    output_dir = getattr(args, "output_dir", None)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if not args.profile:
+        return args.handler(args, paths)
+    with metrics.profiling(args.command) as profile_paths:
+        status = args.handler(args, paths)
+    print(f"Profile written to {profile_paths['profile']}, summary in {profile_paths['report']}", file=sys.stderr)
+    return status
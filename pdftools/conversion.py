@@ -0,0 +1,267 @@
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdftools import cache, docio, metrics, parallel, spreadsheet
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png')
+SUPPORTED_EXTENSIONS = ('pdf',) + IMAGE_EXTENSIONS + ('xlsx', 'docx')
+CONVERTED_EXTENSIONS = IMAGE_EXTENSIONS + ('xlsx', 'docx')
+# Bump when a converter's output changes so stale cached PDFs are not reused
+CONVERTER_VERSION = 3
+CACHE_BYTES = 2 * 1024 * 1024 * 1024
+MAX_WORKERS = 4
+# Pixels per inch for image pages sized to the image
+IMAGE_DPI = 100
+FLUSH_BYTES = 256 * 1024 * 1024
+# Leftovers of conversions interrupted by a crash
+STALE_TEMP_SECONDS = 24 * 60 * 60
+
+
+def file_extension(file_path):
+    return os.path.splitext(file_path)[1].lower().lstrip('.')
+
+
+def output_path_for(source_path, extension, output_dir=None, suffix=""):
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    folder = output_dir if output_dir is not None else os.path.dirname(source_path)
+    return os.path.join(folder, f"{base_name}{suffix}.{extension}")
+
+
+def image_page_rect(width, height, page_size=None):
+    # page_size: None for a page the size of the image, a paper name such as
+    # "a4" or "letter", or (width, height) in points
+    if page_size is None:
+        return fitz.Rect(0, 0, width * 72 / IMAGE_DPI, height * 72 / IMAGE_DPI)
+    if isinstance(page_size, str):
+        rect = fitz.paper_rect(page_size)
+        if rect.width <= 0:
+            raise ValueError(f"Unknown page size: {page_size!r}")
+    else:
+        rect = fitz.Rect(0, 0, *page_size)
+    # Turn the paper to match the photo
+    if (width > height) != (rect.width > rect.height):
+        rect = fitz.Rect(0, 0, rect.height, rect.width)
+    return rect
+
+
+def insert_image_page(doc, image_path, page_size=None, margin=0):
+    # JPEGs are embedded byte for byte, other formats are compressed losslessly
+    # by MuPDF; PIL only reads the header for the pixel size. Returns the bytes read.
+    from PIL import Image as PILImage
+
+    with open(image_path, "rb") as f:
+        data = f.read()
+    try:
+        with PILImage.open(io.BytesIO(data)) as img:
+            width, height = img.size
+    except PILImage.UnidentifiedImageError:
+        raise ValueError("Not a readable image") from None
+    rect = image_page_rect(width, height, page_size)
+    page = doc.new_page(width=rect.width, height=rect.height)
+    try:
+        page.insert_image(page.rect + (margin, margin, -margin, -margin), stream=data)
+    except Exception:
+        doc.delete_page(-1)
+        raise
+    return len(data)
+
+
+@metrics.timed("photos", outputs=["output_path"])
+def images_to_pdf(image_paths, output_path, page_size=None, margin=0, flush_bytes=FLUSH_BYTES, progress=None):
+    # One page per image. The document is written out with incremental saves every
+    # flush_bytes of image data, so thousands of photos don't have to fit in memory,
+    # to a work file that replaces output_path once complete. Returns (pages, failed).
+    failed = []
+    pages = pending_bytes = 0
+    work_path = docio.temp_path_for(output_path)
+    doc = fitz.open()
+    saved = complete = False
+    try:
+        for number, image_path in enumerate(metrics.read_inputs(image_paths), 1):
+            try:
+                with metrics.stage("insert image"):
+                    pending_bytes += insert_image_page(doc, image_path, page_size, margin)
+                pages += 1
+            except Exception as e:
+                failed.append((image_path, e))
+            if pending_bytes >= flush_bytes:
+                saved = _save_batch(doc, work_path, saved)
+                doc.close()
+                doc = fitz.open(work_path)
+                pending_bytes = 0
+            if progress:
+                progress(number, image_path)
+        if pages == 0:
+            raise ValueError("None of the selected images could be added.")
+        if pending_bytes or not saved:
+            _save_batch(doc, work_path, saved)
+        complete = True
+    finally:
+        doc.close()
+        if not complete and os.path.exists(work_path):
+            os.remove(work_path)
+    os.replace(work_path, output_path)
+    metrics.count("pages", pages)
+    return pages, failed
+
+
+def _save_batch(doc, output_path, saved):
+    with metrics.stage("save"):
+        if saved:
+            doc.saveIncr()
+        else:
+            doc.save(output_path, garbage=1)
+    return True
+
+
+def convert_image_to_pdf(image_path, output_dir=None, page_size=None, margin=0):
+    pdf_path = output_path_for(image_path, "pdf", output_dir)
+    with fitz.open() as doc:
+        insert_image_page(doc, image_path, page_size, margin)
+        doc.save(pdf_path)
+    return pdf_path
+
+
+def convert_xlsx_to_pdf(xlsx_path, output_dir=None):
+    pdf_path = output_path_for(xlsx_path, "pdf", output_dir)
+    spreadsheet.render_workbook(xlsx_path, pdf_path)
+    return pdf_path
+
+
+def convert_docx_to_pdf(docx_path, output_dir=None):
+    from docx2pdf import convert as docx2pdf_convert
+
+    pdf_path = output_path_for(docx_path, "pdf", output_dir)
+    docx2pdf_convert(docx_path, pdf_path)
+    return pdf_path
+
+
+def convert_to_pdf(file_path, output_dir=None):
+    ext = file_extension(file_path)
+    if ext in IMAGE_EXTENSIONS:
+        return convert_image_to_pdf(file_path, output_dir)
+    elif ext == 'xlsx':
+        return convert_xlsx_to_pdf(file_path, output_dir)
+    elif ext == 'docx':
+        return convert_docx_to_pdf(file_path, output_dir)
+    else:
+        return file_path
+
+
+def cached_pdf_path(file_path):
+    # Named by content hash, so renamed or copied sources still hit the cache
+    name = f"{cache.file_fingerprint(file_path)}-{file_extension(file_path)}-v{CONVERTER_VERSION}.pdf"
+    return os.path.join(cache.cache_dir("converted"), name)
+
+
+def convert_into_cache(file_path, cached_path):
+    # Convert in a private folder and move the result into place, so an interrupted
+    # or concurrent conversion never leaves a half-written PDF under the cached name
+    folder = tempfile.mkdtemp(prefix="tmp-", dir=os.path.dirname(cached_path))
+    try:
+        os.replace(convert_to_pdf(file_path, folder), cached_path)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return cached_path
+
+
+@parallel.worker_call
+def _convert_in_worker(file_path, cached_path):
+    return convert_into_cache(file_path, cached_path)
+
+
+def prune_cache(max_bytes=CACHE_BYTES):
+    # Drop the least recently used conversions once the folder outgrows max_bytes
+    folder = cache.cache_dir("converted")
+    entries = []
+    total = 0
+    now = time.time()
+    for entry in os.scandir(folder):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if entry.is_dir():
+            if entry.name.startswith("tmp-") and now - stat.st_mtime > STALE_TEMP_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.name.endswith(".pdf"):
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return
+    target = max_bytes * cache.EVICT_TO
+    for mtime, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def convert_all(file_paths, workers=None):
+    # Yields (file_path, pdf_path) in input order as each conversion finishes, with
+    # the exception in place of pdf_path when it failed. PDFs pass straight through;
+    # everything else is converted into the cache, images and workbooks in parallel
+    # and Word documents one at a time, since docx2pdf drives a single Word instance
+    # and quits it after every file.
+    prune_cache()
+    results = []
+    pending = {}
+    for file_path in file_paths:
+        if file_extension(file_path) not in CONVERTED_EXTENSIONS:
+            results.append(file_path)
+            continue
+        try:
+            cached_path = cached_pdf_path(file_path)
+        except OSError as e:
+            results.append(e)
+            continue
+        try:
+            # A hit; refresh the mtime so pruning sees it as recently used
+            os.utime(cached_path)
+        except OSError:
+            pending.setdefault(cached_path, file_path)
+        results.append(cached_path)
+
+    documents = [path for path in pending if file_extension(pending[path]) == 'docx']
+    others = [path for path in pending if file_extension(pending[path]) != 'docx']
+    futures = {}
+    pools = []
+    try:
+        if len(others) > 1:
+            workers = workers or min(MAX_WORKERS, os.cpu_count() or 1, len(others))
+            pools.append(ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")))
+            for cached_path in others:
+                futures[cached_path] = pools[-1].submit(_convert_in_worker, pending[cached_path], cached_path)
+        if documents:
+            # Its own process, so Word automation runs on a fresh main thread
+            pools.append(ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")))
+            for cached_path in documents:
+                futures[cached_path] = pools[-1].submit(_convert_in_worker, pending[cached_path], cached_path)
+
+        done = {}
+        for file_path, result in zip(file_paths, results):
+            if result in pending:
+                if result not in done:
+                    try:
+                        if result in futures:
+                            futures[result].result()
+                        else:
+                            convert_into_cache(file_path, result)
+                        done[result] = result
+                    except Exception as e:
+                        done[result] = e
+                result = done[result]
+            yield file_path, result
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,197 @@
+import io
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+
+from pdftools import metrics
+
+# Where documents are read from and written to. A source is a path, PDF data
+# (bytes, bytearray or memoryview) or a binary file object; a target is a path
+# or a writable binary file object. Tools take either, so callers holding data
+# rather than files (a service, a network share) don't need temporary files.
+FULL_SAVE_OPTIONS = dict(garbage=1)
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def source_size(source):
+    # Bytes in the source, or 0 when that can't be told without reading it
+    if is_path(source):
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return 0
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer().nbytes
+    return 0
+
+
+def source_stem(source, default="document"):
+    # The file name without extension, for naming outputs; file objects often have one
+    name = os.fspath(source) if is_path(source) else getattr(source, "name", None)
+    if not isinstance(name, str):
+        return default
+    return os.path.splitext(os.path.basename(name))[0] or default
+
+
+class MappedDocument(fitz.Document):
+    # A document read from a memory-mapped file. MuPDF reads the pages straight
+    # from the mapping; closing the document also unmaps it.
+    def __init__(self, mapped):
+        self._mapped = mapped
+        self._view = memoryview(mapped)
+        try:
+            super().__init__("pdf", self._view)
+        except Exception:
+            self._unmap()
+            raise
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._unmap()
+
+    def _unmap(self):
+        self.stream = None
+        self._view.release()
+        self._mapped.close()
+
+
+def _map(stream):
+    # A read-only mapping of an open file, or None for streams that aren't
+    # plain files read from the start (sockets, pipes, archives)
+    try:
+        if stream.tell() != 0:
+            return None
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def reusable(source):
+    # source in a form open_pdf() can open more than once: streams other than
+    # files (which are mapped afresh each time) are read into memory
+    if is_path(source) or isinstance(source, (bytes, bytearray, memoryview, io.BytesIO)):
+        return source
+    mapped = _map(source)
+    if mapped is not None:
+        mapped.close()
+        return source
+    return source.read()
+
+
+def open_pdf(source):
+    # Paths are opened by name: MuPDF reads them through its own buffered file
+    # access, and only a document opened from its file can be saved
+    # incrementally. Data is read in place without a copy, open files are
+    # memory-mapped, and other streams are read once.
+    if is_path(source):
+        return fitz.open(os.fspath(source))
+    if isinstance(source, (bytes, memoryview)):
+        return fitz.open("pdf", source)
+    if isinstance(source, bytearray):
+        return fitz.open("pdf", memoryview(source))
+    if isinstance(source, io.BytesIO):
+        return fitz.open("pdf", source.getbuffer())
+    mapped = _map(source)
+    if mapped is not None:
+        return MappedDocument(mapped)
+    return fitz.open("pdf", source.read())
+
+
+def temp_path_for(path):
+    # A new empty file next to path. Unlike mkstemp's private files, it gets the
+    # permissions a file created at path would, since it ends up there.
+    folder, name = os.path.split(os.path.abspath(path))
+    while True:
+        temp_path = os.path.join(folder, f".{name}.{os.urandom(4).hex()}.part")
+        try:
+            fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return temp_path
+
+
+@contextmanager
+def atomic_path(path):
+    # Yields a temporary path in the target's folder, renamed over path once the
+    # block completes. Readers never see half a file, and a failed or
+    # interrupted write leaves any existing file at path as it was.
+    temp_path = temp_path_for(path)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def save_pdf(pdf, target, **options):
+    # A full save to a path (atomically) or to a writable file object.
+    # Returns the number of bytes written, or None when a stream can't tell.
+    if not is_path(target):
+        start = target.tell() if target.seekable() else None
+        pdf.save(target, **options)
+        return target.tell() - start if start is not None else None
+    with atomic_path(target) as temp_path:
+        pdf.save(temp_path, **options)
+        return os.path.getsize(temp_path)
+
+
+@contextmanager
+def updating(source, target, incremental=True, **options):
+    # Opens source for changes that are saved to target when the block ends.
+    # With incremental, when both are files and every page is still there, only
+    # the changed objects (a new /Rotate, page tree or metadata) are appended to
+    # a copy of the source, or to the source itself when target is the same
+    # file, so unchanged page content is neither parsed nor rewritten.
+    # Otherwise, as when pages were dropped and their objects should go, it is
+    # a full save with options.
+    options = options or FULL_SAVE_OPTIONS
+    if not is_path(target):
+        with open_pdf(source) as pdf:
+            yield pdf
+            with metrics.stage("save"):
+                save_pdf(pdf, target, **options)
+        return
+
+    incremental = incremental and is_path(source)
+    in_place = incremental and os.path.abspath(target) == os.path.abspath(source)
+    work_path = None
+    full_path = None
+    try:
+        if incremental:
+            work_path = os.fspath(source) if in_place else temp_path_for(target)
+            if not in_place:
+                with metrics.stage("copy"):
+                    shutil.copyfile(source, work_path)
+        with fitz.open(work_path) if incremental else open_pdf(source) as pdf:
+            page_count = len(pdf)
+            yield pdf
+            with metrics.stage("save"):
+                if incremental and len(pdf) == page_count and pdf.can_save_incrementally():
+                    if pdf.is_dirty:
+                        pdf.saveIncr()
+                else:
+                    full_path = temp_path_for(target)
+                    pdf.save(full_path, **options)
+        # Renamed only once the document is closed: Windows won't replace an open file
+        if full_path is not None:
+            os.replace(full_path, target)
+        elif not in_place:
+            os.replace(work_path, target)
+    finally:
+        for path in (full_path, None if in_place else work_path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdftools import cache, metrics, parallel
+
+# Bump when the way pages are fingerprinted changes, so cached indexes are rebuilt
+INDEX_VERSION = 3
+STORE_BYTES = 32 * 1024 * 1024
+# Pages are rendered this big (longest side, in pixels) for the perceptual hash
+HASH_RENDER_SIZE = 64
+# dHash grid: HASH_SIZE x HASH_SIZE bits, each comparing a pixel with its right neighbour
+HASH_SIZE = 16
+# Differing bits (out of HASH_SIZE²) up to which two pages count as the same scan.
+# Rescans and recompressed copies stay well under it; different scanned pages
+# tend to be 25 or more apart.
+NEAR_DISTANCE = 12
+# A page whose low-resolution render varies less than this in gray level is blank
+BLANK_RANGE = 12
+
+
+class PageFingerprint:
+    # content: cache.page_hash, of everything the page draws (equal means an exact copy);
+    # text: hash of the page's words, or "" for pages without a text layer;
+    # size: the page size in points; phash: the perceptual hash as an int
+    def __init__(self, content, text, size, phash, blank):
+        self.content = content
+        self.text = text
+        self.size = size
+        self.phash = phash
+        self.blank = blank
+
+    def to_json(self):
+        return [self.content, self.text, self.size, format(self.phash, "x"), self.blank]
+
+    @classmethod
+    def from_json(cls, data):
+        content, text, size, phash, blank = data
+        return cls(content, text, tuple(size), int(phash, 16), blank)
+
+
+def text_hash(page):
+    words = page.get_text("text").split()
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest() if words else ""
+
+
+def perceptual_hash(page):
+    # dHash of a small grayscale render: survives rescanning, recompression and
+    # small shifts, unlike any hash of the bytes. Returns (hash, blank).
+    from PIL import Image as PILImage
+
+    scale = HASH_RENDER_SIZE / max(page.rect.width, page.rect.height, 1)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    image = PILImage.frombytes("L", (pix.width, pix.height), pix.samples)
+    low, high = image.getextrema()
+    pixels = image.resize((HASH_SIZE + 1, HASH_SIZE), PILImage.Resampling.BOX).tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            value = value << 1 | (pixels[offset + column] > pixels[offset + column + 1])
+    return value, high - low < BLANK_RANGE
+
+
+def fingerprint_page(page, memo=None):
+    # memo: shared by the pages of one document, see cache.page_hash
+    with metrics.stage("content hash"):
+        content = cache.page_hash(page, memo)
+        text = text_hash(page)
+    with metrics.stage("perceptual hash"):
+        phash, blank = perceptual_hash(page)
+    return PageFingerprint(content, text, (round(page.rect.width), round(page.rect.height)), phash, blank)
+
+
+def index_store():
+    return cache.lazy_store("duplicates", STORE_BYTES)
+
+
+@parallel.worker_call
+def _fingerprint_in_worker(page_nums):
+    with metrics.capture() as op:
+        memo = {}
+        fingerprints = [fingerprint_page(parallel.doc[page_num], memo).to_json() for page_num in page_nums]
+    return page_nums, fingerprints, op.summary()
+
+
+def page_fingerprints(pdf_path, workers=None, progress=None):
+    # A fingerprint per page, computed once per document (by content) and then
+    # read back from the cache. progress(done, total) follows the pages.
+    store = index_store()
+    key = f"{INDEX_VERSION}|{HASH_SIZE}|{cache.file_fingerprint(pdf_path)}"
+    data = store.get(key) if store else None
+    if data is not None:
+        return [PageFingerprint.from_json(item) for item in json.loads(zlib.decompress(data))]
+
+    with fitz.open(pdf_path) as pdf:
+        total = len(pdf)
+        workers = parallel.worker_count(total, workers)
+        if workers == 1:
+            fingerprints = []
+            memo = {}
+            for page in pdf:
+                fingerprints.append(fingerprint_page(page, memo))
+                if progress is not None:
+                    progress(len(fingerprints), total)
+
+    if workers > 1:
+        fingerprints = [None] * total
+        done = 0
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=parallel.open_doc, initargs=(pdf_path,)) as pool:
+            chunks = parallel.split_ranges(list(range(total)), workers * parallel.CHUNKS_PER_WORKER)
+            for future in [pool.submit(_fingerprint_in_worker, chunk) for chunk in chunks]:
+                page_nums, items, summary = future.result()
+                metrics.merge(summary)
+                for page_num, item in zip(page_nums, items):
+                    fingerprints[page_num] = PageFingerprint.from_json(item)
+                done += len(page_nums)
+                if progress is not None:
+                    progress(done, total)
+
+    if store:
+        store.put(key, zlib.compress(json.dumps([fp.to_json() for fp in fingerprints]).encode("ascii")))
+    return fingerprints
+
+
+class DuplicateIndex:
+    # Pages added one by one, within one document or across several; add()
+    # tells whether a page repeats one added before. Exact copies are found by
+    # content hash. Near duplicates need the same page size, the same words (or
+    # no text layer on either page) and perceptual hashes at most max_distance
+    # bits apart: at this resolution, different pages of text can look alike,
+    # so the hash alone only decides between scans. Blank pages are never
+    # reported: they are usually deliberate.
+    def __init__(self, max_distance=NEAR_DISTANCE):
+        self.max_distance = max_distance
+        self._exact = {}
+        self._near = {}
+
+    def add(self, key, fingerprint):
+        # Returns (original key, exact) for a duplicate, else None
+        if fingerprint.blank:
+            return None
+        original = self._exact.get(fingerprint.content)
+        if original is not None:
+            return original, True
+        match = self._near_match(fingerprint)
+        if match is not None:
+            return match, False
+        self._exact[fingerprint.content] = key
+        self._near.setdefault((fingerprint.size, fingerprint.text), []).append((fingerprint.phash, key))
+        return None
+
+    def _near_match(self, fingerprint):
+        best = None
+        for phash, key in self._near.get((fingerprint.size, fingerprint.text), ()):
+            distance = bin(phash ^ fingerprint.phash).count("1")
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, key)
+        return best[1] if best is not None else None
+
+
+def find_duplicates(pdf_paths, max_distance=NEAR_DISTANCE, workers=None, progress=None):
+    # {(pdf_path, page_num): ((pdf_path, page_num) of the first copy, exact)} for
+    # every page that repeats an earlier one, in the order the files are given.
+    # progress(done, total) follows the files.
+    pdf_paths = list(pdf_paths)
+    index = DuplicateIndex(max_distance)
+    duplicates = {}
+    for number, pdf_path in enumerate(pdf_paths, 1):
+        for page_num, fingerprint in enumerate(page_fingerprints(pdf_path, workers)):
+            match = index.add((pdf_path, page_num), fingerprint)
+            if match is not None:
+                duplicates[(pdf_path, page_num)] = match
+        if progress is not None:
+            progress(number, len(pdf_paths))
+    return duplicates
+
+
+@metrics.timed("duplicates", inputs=["pdf_path"])
+def duplicate_pages(pdf_path, max_distance=NEAR_DISTANCE, workers=None, progress=None):
+    # {page_num: (page_num of the first copy, exact)} within one document;
+    # progress(done, total) follows the pages
+    index = DuplicateIndex(max_distance)
+    duplicates = {}
+    for page_num, fingerprint in enumerate(page_fingerprints(pdf_path, workers, progress)):
+        match = index.add(page_num, fingerprint)
+        if match is not None:
+            duplicates[page_num] = match
+    return duplicates
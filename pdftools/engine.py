@@ -0,0 +1,238 @@
+import fitz  # PyMuPDF
+
+from pdftools import conversion, docio, duplicates, estimate, merge, metrics, ocr, optimize, render, split, tables, word
+
+STREAMING_THRESHOLD = 512 * 1024 * 1024
+# drop_duplicates when combining: pages identical to an earlier one, or near-identical scans too
+DROP_DUPLICATES = ("exact", "near")
+
+
+def parse_page_ranges(spec, page_count):
+    # "1,3-5,8-" -> zero-based page indices, in the order given
+    pages = []
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        start, sep, end = part.partition('-')
+        try:
+            first = int(start) if start else 1
+            last = (int(end) if end else page_count) if sep else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part!r}")
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Page range {part!r} is outside 1-{page_count}")
+        pages.extend(range(first - 1, last))
+    return pages
+
+
+def page_count(pdf_path):
+    with docio.open_pdf(pdf_path) as pdf:
+        return len(pdf)
+
+
+def total_size(paths):
+    return sum(docio.source_size(p) for p in paths)
+
+
+def duplicate_filter(mode, stats=None):
+    # select(pdf_path, pdf) for merging: the pages of each input that don't repeat
+    # a page of it or of an input before it. mode is one of DROP_DUPLICATES.
+    if mode not in DROP_DUPLICATES:
+        raise ValueError(f"drop_duplicates must be one of {', '.join(DROP_DUPLICATES)}, not {mode!r}")
+    # A negative distance leaves only exact copies
+    index = duplicates.DuplicateIndex(duplicates.NEAR_DISTANCE if mode == "near" else -1)
+
+    def select(pdf_path, pdf):
+        with metrics.stage("find duplicates"):
+            if docio.is_path(pdf_path):
+                fingerprints = duplicates.page_fingerprints(pdf_path)
+            else:
+                memo = {}
+                fingerprints = [duplicates.fingerprint_page(page, memo) for page in pdf]
+        pages = [page_num for page_num, fingerprint in enumerate(fingerprints)
+                 if index.add((pdf_path, page_num), fingerprint) is None]
+        dropped = len(fingerprints) - len(pages)
+        metrics.count("duplicate_pages", dropped)
+        if stats is not None:
+            stats["duplicate_pages"] = stats.get("duplicate_pages", 0) + dropped
+        return pages
+
+    return select
+
+
+@metrics.timed("merge", outputs=["output_path"], fields=["streaming", "drop_duplicates"])
+def combine_pdfs(pdf_paths, output_path, streaming=None, stats=None, drop_duplicates=None, progress=None):
+    # streaming=None picks the bounded-memory merge for large inputs; pass a dict
+    # as stats to receive throughput and peak-memory figures from it.
+    # drop_duplicates ("exact" or "near") leaves out pages that repeat earlier ones.
+    # Only a merge into a file can stream. progress(done, total) is called before
+    # each input, so raising from it (as a cancelled job does) stops the merge
+    # before anything is written.
+    total = len(pdf_paths) if hasattr(pdf_paths, "__len__") else 0
+    pdf_paths = metrics.read_inputs(pdf_paths)
+    select = duplicate_filter(drop_duplicates, stats) if drop_duplicates else None
+    if not docio.is_path(output_path):
+        streaming = False
+    elif streaming is None:
+        pdf_paths = list(pdf_paths)
+        streaming = total_size(pdf_paths) > STREAMING_THRESHOLD
+    if streaming:
+        failed, merge_stats = merge.stream_combine(pdf_paths, output_path, select=select, progress=progress)
+        if stats is not None:
+            stats.update(merge_stats)
+        return failed
+
+    failed = []
+    output_pdf = fitz.open()
+    try:
+        for done, pdf_path in enumerate(pdf_paths):
+            if progress is not None:
+                progress(done, total)
+            try:
+                with docio.open_pdf(pdf_path) as input_pdf:
+                    pages = select(pdf_path, input_pdf) if select is not None else None
+                    with metrics.stage("insert_pdf"):
+                        merge.insert_pages(output_pdf, input_pdf, pages)
+            except Exception as e:
+                failed.append((pdf_path, e))
+
+        if output_pdf.page_count == 0:
+            raise ValueError("None of the selected files could be combined.")
+        metrics.count("pages", output_pdf.page_count)
+        with metrics.stage("save"):
+            docio.save_pdf(output_pdf, output_path)
+    finally:
+        output_pdf.close()
+    return failed
+
+
+@metrics.timed("combine", inputs=["file_paths"], outputs=["output_path"], fields=["drop_duplicates"])
+def combine_files(file_paths, output_path, streaming=None, stats=None, workers=None, drop_duplicates=None,
+                  progress=None):
+    # Conversions run in the background and each PDF is merged as soon as it and
+    # everything before it is ready
+    if streaming is None:
+        streaming = total_size(file_paths) > STREAMING_THRESHOLD
+    failed = []
+    sources = {}
+
+    def converted():
+        for file_path, result in conversion.convert_all(file_paths, workers):
+            if isinstance(result, Exception):
+                failed.append((file_path, result))
+            else:
+                sources[result] = file_path
+                yield result
+
+    def report(done, total):
+        # Files that failed to convert never reach the merge
+        if progress is not None:
+            progress(done + len(failed), len(file_paths))
+
+    inputs = converted()
+    try:
+        merge_failed = combine_pdfs(inputs, output_path, streaming, stats, drop_duplicates, report)
+    finally:
+        # Stops the conversions still running when the merge stopped early
+        inputs.close()
+    return failed + [(sources.get(pdf_path, pdf_path), e) for pdf_path, e in merge_failed]
+
+
+@metrics.timed("split", inputs=["input_path"])
+def split_pdf(input_path, output_folder, name_format=None, ranges=None, every=None, bookmarks=None, max_bytes=None,
+              compact=False, workers=None, progress=None):
+    # One file per page by default, or per comma-separated range, every N pages,
+    # per bookmark at outline level `bookmarks`, or per run of pages that stays
+    # under max_bytes. name_format can use {stem}, {page}, {first}, {last},
+    # {part} and {title} (the bookmark).
+    input_path = docio.reusable(input_path)
+    with docio.open_pdf(input_path) as pdf, metrics.stage("plan"):
+        parts = split.plan_parts(pdf, ranges, every, bookmarks, max_bytes)
+    name_format = name_format or split.default_name_format(parts, bookmarks)
+    return split.split(input_path, output_folder, parts, name_format, compact, workers, progress)
+
+
+def extract_images(input_path, output_folder, dpi=300, workers=None, progress=None):
+    return render.render_pages(input_path, output_folder, dpi=dpi, workers=workers, progress=progress)
+
+
+def arrange_pages(pdf, order, rotations=None):
+    # In place on an open document: turns pages by rotations (source index ->
+    # degrees, added to the current rotation), then keeps order's pages in that order
+    order = list(order)
+    if not isinstance(rotations, dict):
+        rotations = dict(enumerate(rotations or ()))
+    kept = set(order)
+    for page_num, degrees in rotations.items():
+        if degrees % 360 and page_num in kept:
+            page = pdf[page_num]
+            page.set_rotation((page.rotation + degrees) % 360)
+    if order != list(range(len(pdf))):
+        pdf.select(order)
+
+
+@metrics.timed("rewrite pages", inputs=["input_path"], outputs=["output_path"])
+def rewrite_pages(input_path, output_path, order, rotations=None, progress=None):
+    # Reorders (or drops) pages by rewriting the page tree with select() and
+    # turns them by changing /Rotate, so page content is never copied. When every
+    # page of a file is kept, the result is a copy of it plus an incremental
+    # update; otherwise a full save drops the unused objects. progress(done, total)
+    # is called before the save; when it raises, nothing is written.
+    order = list(order)
+    incremental = docio.is_path(input_path)
+    if incremental:
+        with fitz.open(input_path) as pdf:
+            incremental = sorted(order) == list(range(len(pdf)))
+
+    with docio.updating(input_path, output_path, incremental) as pdf:
+        with metrics.stage("arrange"):
+            arrange_pages(pdf, order, rotations)
+        if progress is not None:
+            progress(1, 2)
+        metrics.count("pages", len(pdf))
+        return len(pdf)
+
+
+@metrics.timed("delete", inputs=["input_path"], outputs=["output_path"])
+def delete_pages(input_path, pages, output_path, progress=None):
+    pages_to_delete = set(pages)
+    input_path = docio.reusable(input_path)
+    total = page_count(input_path)
+    if len(pages_to_delete & set(range(total))) >= total:
+        raise ValueError("Cannot save a PDF with zero pages. Please ensure at least one page remains.")
+    kept = [page_num for page_num in range(total) if page_num not in pages_to_delete]
+    return rewrite_pages(input_path, output_path, kept, progress=progress)
+
+
+@metrics.timed("rotate", inputs=["input_path"], outputs=["output_path"])
+def rotate_pages(input_path, order, rotations, output_path, progress=None):
+    # order: source page indices in output order; rotations: source index -> degrees,
+    # added to each page's current rotation
+    return rewrite_pages(input_path, output_path, order, rotations, progress)
+
+
+def calculate_estimated_size(pdf_file_path, optimization_level):
+    # (estimated KB, error bound KB), from trial compression of sampled pages
+    estimated_size, error = estimate.SizeEstimator(pdf_file_path).estimate(optimization_level)
+    return estimated_size / 1024, error / 1024
+
+
+def optimize_pdf(pdf_file_path, optimization_level, output_path, grayscale=False, progress=None):
+    return optimize.optimize_pdf(pdf_file_path, output_path, optimization_level, grayscale=grayscale, progress=progress)
+
+
+def convert_pdf_to_word(pdf_file_path, docx_file_path, workers=None, progress=None, cancel=None):
+    return word.pdf_to_word(pdf_file_path, docx_file_path, workers=workers, progress=progress, cancel=cancel)
+
+
+def convert_pdf_to_excel(pdf_file_path, output_path, sheet_per="table", workers=None, progress=None):
+    return tables.pdf_to_excel(pdf_file_path, output_path, sheet_per, workers, progress)
+
+
+def extract_text(pdf_file_path):
+    with docio.open_pdf(pdf_file_path) as pdf_document:
+        return "".join(page.get_text("text") for page in pdf_document)
+
+
+def ocr_pdf(pdf_file_path, pdf_output=None, docx_output=None, language=ocr.LANGUAGE, workers=None, progress=None):
+    return ocr.ocr_pdf(pdf_file_path, pdf_output, docx_output, language=language, workers=workers, progress=progress)
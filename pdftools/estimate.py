@@ -0,0 +1,139 @@
+import math
+import os
+import statistics
+import threading
+
+import fitz  # PyMuPDF
+
+from pdftools import optimize
+
+SAMPLE_PAGES = 6
+LEVEL_STEP = 5
+# Per-page samples carry their own copy of shared fonts, so never claim better than this
+MODEL_ERROR = 0.05
+
+# (path, size, mtime) -> {level: (estimated bytes, error bytes)}
+_estimates = {}
+_estimates_lock = threading.Lock()
+
+
+def file_key(pdf_file_path):
+    stat = os.stat(pdf_file_path)
+    return (os.path.abspath(pdf_file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def quantize_level(optimization_level):
+    level = max(0, min(100, int(optimization_level)))
+    return int(round(level / LEVEL_STEP) * LEVEL_STEP)
+
+
+def sample_pages(page_count, sample_size):
+    # Evenly spaced pages; a fixed choice keeps estimates stable between runs
+    if page_count <= sample_size:
+        return list(range(page_count))
+    step = page_count / sample_size
+    return [int(step * i + step / 2) for i in range(sample_size)]
+
+
+class SizeEstimator:
+    def __init__(self, pdf_file_path, sample_size=SAMPLE_PAGES):
+        self.pdf_file_path = pdf_file_path
+        self.key = file_key(pdf_file_path)
+        self.file_size = self.key[1]
+        self.sample_size = sample_size
+        self.page_count = None
+        self.error = None
+        self._samples = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wanted = None
+        self._last_level = 0
+        self._closed = False
+
+    def _load_samples(self):
+        if self._samples is None:
+            samples = []
+            with fitz.open(self.pdf_file_path) as doc:
+                self.page_count = len(doc)
+                for page_num in sample_pages(self.page_count, self.sample_size):
+                    with fitz.open() as single:
+                        single.insert_pdf(doc, from_page=page_num, to_page=page_num)
+                        samples.append(single.tobytes(garbage=1))
+            self._samples = samples
+        return self._samples
+
+    def cached(self, optimization_level):
+        with _estimates_lock:
+            return _estimates.get(self.key, {}).get(quantize_level(optimization_level))
+
+    def estimate(self, optimization_level):
+        level = quantize_level(optimization_level)
+        result = self.cached(level)
+        if result is not None:
+            return result
+
+        settings = optimize.settings_for_level(level)
+        ratios = []
+        for data in self._load_samples():
+            with fitz.open("pdf", data) as doc:
+                optimize.optimize_document(doc, **settings)
+                ratios.append(len(doc.tobytes(**optimize.SAVE_OPTIONS)) / len(data))
+
+        sampled, total = len(ratios), self.page_count
+        ratio = statistics.fmean(ratios) if ratios else 1.0
+        if sampled == total or sampled < 2:
+            spread = 0.0 if sampled == total else ratio / 2
+        else:
+            # 95% interval of the mean ratio, with the finite population correction
+            spread = 1.96 * statistics.stdev(ratios) / math.sqrt(sampled) * math.sqrt((total - sampled) / (total - 1))
+
+        estimated = self.file_size * ratio
+        result = (estimated, self.file_size * spread + estimated * MODEL_ERROR)
+        with _estimates_lock:
+            _estimates.setdefault(self.key, {})[level] = result
+        return result
+
+    def request(self, optimization_level):
+        # Non-blocking: returns the cached estimate, or None while a worker computes it
+        level = quantize_level(optimization_level)
+        result = self.cached(level)
+        with self._lock:
+            self._last_level = level
+            if result is None:
+                self._wanted = level
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return result
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+
+    def _next_level(self):
+        with self._lock:
+            if self._closed:
+                level = None
+            elif self._wanted is not None:
+                level, self._wanted = self._wanted, None
+            else:
+                # Idle: warm the remaining levels, nearest to the slider first
+                missing = [lvl for lvl in range(0, 101, LEVEL_STEP) if self.cached(lvl) is None]
+                level = min(missing, key=lambda lvl: abs(lvl - self._last_level)) if missing else None
+            if level is None:
+                self._thread = None
+            return level
+
+    def _run(self):
+        while True:
+            level = self._next_level()
+            if level is None:
+                return
+            try:
+                self.estimate(level)
+            except Exception as e:
+                with self._lock:
+                    self.error = e
+                    self._closed = True
+                    self._thread = None
+                return
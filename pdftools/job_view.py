@@ -0,0 +1,112 @@
+import tkinter as tk
+from tkinter import Button, Checkbutton, Frame, Toplevel, ttk
+
+from pdftools import jobs
+
+POLL_MS = 100
+
+
+def poll_jobs(widget, scheduler, interval=POLL_MS):
+    # Drains the scheduler's events on the Tk main loop for as long as widget exists
+    def poll():
+        try:
+            scheduler.poll()
+        finally:
+            widget.after(interval, poll)
+
+    widget.after(interval, poll)
+
+
+def progress_text(job):
+    if job.status == jobs.FAILED:
+        return str(job.error)
+    if job.finished_status and job.profile_paths:
+        return f"Profile: {job.profile_paths['report']}"
+    if job.status != jobs.RUNNING:
+        return ""
+    parts = ["Profiling"] if job.profile else []
+    if job.message:
+        parts.append(job.message)
+    if job.total:
+        parts.append(f"{job.done} of {job.total} ({job.done * 100 // job.total}%)")
+    return " ".join(parts)
+
+
+class JobList(Frame):
+    # A row per job with its status and progress, and buttons to cancel the
+    # selected jobs or clear the finished ones
+    def __init__(self, master, scheduler, **kwargs):
+        super().__init__(master, **kwargs)
+        self.scheduler = scheduler
+
+        self.tree = ttk.Treeview(self, columns=("status", "progress"), selectmode="extended")
+        self.tree.heading("#0", text="Job")
+        self.tree.heading("status", text="Status")
+        self.tree.heading("progress", text="Progress")
+        self.tree.column("#0", width=260)
+        self.tree.column("status", width=80, stretch=False)
+        self.tree.column("progress", width=220)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        buttons = Frame(self)
+        Button(buttons, text="Cancel", command=self.cancel_selected).pack(side=tk.LEFT, padx=5)
+        Button(buttons, text="Clear Finished", command=self.clear_finished).pack(side=tk.LEFT, padx=5)
+        # Profiles the next job submitted, then switches itself off
+        self.profile_var = tk.BooleanVar(value=scheduler.profile_next)
+        Checkbutton(buttons, text="Profile next job", variable=self.profile_var,
+                    command=self.toggle_profile).pack(side=tk.LEFT, padx=5)
+        buttons.pack(side=tk.BOTTOM, pady=5)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.update_jobs(scheduler.jobs)
+        scheduler.listeners.append(self.update_jobs)
+        self.bind("<Destroy>", self._on_destroy)
+
+    def toggle_profile(self):
+        self.scheduler.profile_next = self.profile_var.get()
+
+    def update_jobs(self, changed):
+        self.profile_var.set(self.scheduler.profile_next)
+        for job in changed:
+            if job not in self.scheduler.jobs:
+                continue
+            values = (job.status, progress_text(job))
+            item = str(job.id)
+            if self.tree.exists(item):
+                self.tree.item(item, values=values)
+            else:
+                self.tree.insert("", tk.END, iid=item, text=job.title, values=values)
+
+    def cancel_selected(self):
+        selected = {int(item) for item in self.tree.selection()}
+        for job in self.scheduler.jobs:
+            if job.id in selected:
+                job.cancel()
+
+    def clear_finished(self):
+        self.scheduler.clear_finished()
+        remaining = {str(job.id) for job in self.scheduler.jobs}
+        for item in self.tree.get_children():
+            if item not in remaining:
+                self.tree.delete(item)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self.update_jobs in self.scheduler.listeners:
+            self.scheduler.listeners.remove(self.update_jobs)
+
+
+def show_job_list(master, scheduler):
+    # One job window per application; raised again if already open
+    window = getattr(master, "_job_window", None)
+    if window is not None and window.winfo_exists():
+        window.deiconify()
+        window.lift()
+        return window
+    window = Toplevel(master)
+    window.title("Jobs")
+    window.geometry("600x300")
+    JobList(window, scheduler).pack(fill=tk.BOTH, expand=True)
+    master._job_window = window
+    return window
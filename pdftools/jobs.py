@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+# Lower runs first
+HIGH, NORMAL, LOW = 0, 1, 2
+# Jobs running at once; heavy jobs start their own process pools, so keep this small
+MAX_RUNNING = 2
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "Queued", "Running", "Done", "Failed", "Cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    # A unit of work for the Scheduler. The work function is called as
+    # work(job) on a worker thread and reports through job.progress(), which
+    # also raises JobCancelled once the job is cancelled. Long steps without
+    # progress can pass job.cancel_event on or call job.check_cancelled().
+    def __init__(self, scheduler, job_id, title, work, priority, on_done, on_error, profile=False):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.title = title
+        self.work = work
+        self.priority = priority
+        self.on_done = on_done
+        self.on_error = on_error
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        # Set when the job runs under metrics.profiling(); then holds its report paths
+        self.profile = profile
+        self.profile_paths = {}
+
+    @property
+    def finished_status(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, done, total, *details, message=None):
+        self.check_cancelled()
+        self.scheduler._post(self, "progress", (done, total, message))
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+
+class Scheduler:
+    # Runs jobs on up to `workers` threads, highest priority first, then in
+    # submission order. Worker threads never touch the GUI: every change to a
+    # job is queued as an event and applied by poll(), which the GUI calls from
+    # its main loop (see job_view.poll_jobs), so callbacks and listeners always
+    # run on the main thread.
+    def __init__(self, workers=MAX_RUNNING):
+        self.workers = workers
+        self.jobs = []
+        self.listeners = []
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._events = queue.Queue()
+        self._lock = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._closed = False
+        # The next job submitted is profiled; see metrics.profiling()
+        self.profile_next = False
+
+    def submit(self, title, work, priority=NORMAL, on_done=None, on_error=None, profile=False):
+        # on_done(result) and on_error(exception) are called from poll() when the
+        # job finishes; a cancelled job calls neither
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The scheduler has been shut down.")
+            profile = profile or self.profile_next
+            self.profile_next = False
+            job = Job(self, next(self._ids), title, work, priority, on_done, on_error, profile)
+            self.jobs.append(job)
+            heapq.heappush(self._heap, (priority, job.id, job))
+            if not self._idle and len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"job-worker-{len(self._threads) + 1}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._lock.notify()
+        self._post(job, "queued", None)
+        return job
+
+    def cancel(self, job):
+        # A queued job is dropped straight away; a running one stops at its
+        # next progress report or cancellation check. Work that returns before
+        # reaching one has written its output, so the job still counts as done.
+        job.cancel_event.set()
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = CANCELLED
+            job.finished = time.monotonic()
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+        self._post(job, "finished", None)
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            if not job.finished_status:
+                self.cancel(job)
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if not job.finished_status]
+
+    def active(self):
+        return [job for job in self.jobs if not job.finished_status]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel_all()
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+
+    def _next_job(self):
+        with self._lock:
+            self._idle += 1
+            try:
+                while not self._heap and not self._closed:
+                    self._lock.wait()
+                if not self._heap:
+                    return None
+                job = heapq.heappop(self._heap)[2]
+                job.status = RUNNING
+                job.started = time.monotonic()
+                return job
+            finally:
+                self._idle -= 1
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._post(job, "started", None)
+            try:
+                job.check_cancelled()
+                if job.profile:
+                    from pdftools import metrics
+                    with metrics.profiling(job.title) as job.profile_paths:
+                        result = job.work(job)
+                else:
+                    result = job.work(job)
+            except JobCancelled:
+                self._post(job, "finished", (CANCELLED, None, None))
+            except Exception as e:
+                # Work that was handed cancel_event may stop with its own exception
+                self._post(job, "finished", (CANCELLED if job.cancel_event.is_set() else FAILED, None, e))
+            else:
+                self._post(job, "finished", (DONE, result, None))
+
+    def _post(self, job, kind, data):
+        self._events.put((job, kind, data))
+
+    def poll(self):
+        # Applies queued events on the calling (GUI) thread; returns the jobs that changed
+        changed = []
+        while True:
+            try:
+                job, kind, data = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                job.done, job.total, message = data
+                if message is not None:
+                    job.message = message
+            elif kind == "finished" and data is not None:
+                job.status, job.result, job.error = data
+                job.finished = time.monotonic()
+                if job.status == DONE and job.on_done is not None:
+                    job.on_done(job.result)
+                elif job.status == FAILED and job.on_error is not None:
+                    job.on_error(job.error)
+            if job not in changed:
+                changed.append(job)
+        if changed:
+            for listener in self.listeners:
+                listener(changed)
+        return changed
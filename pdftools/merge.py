@@ -0,0 +1,178 @@
+import hashlib
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from pdftools import docio, memory, metrics, pdfsyntax, split
+
+FLUSH_PAGES = 2000
+FLUSH_BYTES = 256 * 1024 * 1024
+
+# Only resources are shared: streams (images, fonts, forms), arrays such as
+# colour spaces, dictionaries of these types, and untyped dictionaries such as
+# resource dictionaries. Whatever belongs to one page (the page itself,
+# annotations, widgets, structure elements) stays distinct even when identical.
+SHAREABLE_TYPES = ("Font", "FontDescriptor", "XObject", "ExtGState", "Pattern", "Encoding", "CMap")
+# Keys of dictionaries tied to a page or tree: back-references, annotation and field keys
+PAGE_BOUND_KEYS = ("P", "Parent", "Subtype", "FT", "Rect", "S")
+
+
+class ResourceDeduplicator:
+    # Merges objects that are byte-for-byte identical to one already in the output
+    # (fonts, images, colour profiles, resource dictionaries...), so a logo or an
+    # embedded font repeated across hundreds of inputs is stored once.
+    def __init__(self):
+        self.known = {}
+        self.merged = 0
+
+    def _shareable(self, doc, xref, text):
+        if doc.xref_is_stream(xref) or not text.startswith("<<"):
+            return True
+        kind, value = doc.xref_get_key(xref, "Type")
+        if kind == "name":
+            return value[1:] in SHAREABLE_TYPES
+        return all(doc.xref_get_key(xref, key)[0] == "null" for key in PAGE_BOUND_KEYS)
+
+    def _signature(self, doc, xref, text):
+        digest = hashlib.sha1(text.encode("utf-8", "surrogateescape"))
+        if doc.xref_is_stream(xref):
+            digest.update(b"\0stream\0")
+            digest.update(doc.xref_stream_raw(xref))
+        return digest.digest()
+
+    def run(self, doc, first_xref):
+        # Objects from first_xref on were just inserted, and nothing older points at them
+        texts = {}
+        for xref in range(first_xref, doc.xref_length()):
+            text = doc.xref_object(xref, compressed=True)
+            if text and text != "null":
+                texts[xref] = text
+        original = dict(texts)
+        shareable = {xref: self._shareable(doc, xref, text) for xref, text in texts.items()}
+
+        redirect = {}
+        while True:
+            seen = {}
+            found = {}
+            for xref, text in texts.items():
+                if xref in redirect or not shareable[xref]:
+                    continue
+                signature = self._signature(doc, xref, text)
+                keep = self.known.get(signature) or seen.setdefault(signature, xref)
+                if keep != xref:
+                    found[xref] = keep
+            if not found:
+                break
+            # Rewriting references can make more objects identical, e.g. the font
+            # dictionaries once their font files have been merged
+            redirect.update(found)
+            for xref, text in texts.items():
+                if xref not in redirect:
+                    texts[xref] = pdfsyntax.REFERENCE.sub(lambda m: f"{redirect.get(int(m[1]), int(m[1]))} 0 R", text)
+
+        for xref, text in texts.items():
+            if xref in redirect:
+                if doc.xref_is_stream(xref):
+                    doc.update_stream(xref, b"", compress=0)
+                doc.update_object(xref, "null")
+            else:
+                if text != original[xref]:
+                    doc.update_object(xref, text)
+                if shareable[xref]:
+                    self.known.setdefault(self._signature(doc, xref, text), xref)
+        self.merged += len(redirect)
+
+
+def insert_pages(output, input_pdf, pages=None):
+    # Appends the given pages of input_pdf (all when None) in their order; returns how many
+    if pages is None:
+        output.insert_pdf(input_pdf)
+        return len(input_pdf)
+    for first, last in split.page_runs(pages):
+        output.insert_pdf(input_pdf, from_page=first, to_page=last)
+    return len(pages)
+
+
+def stream_combine(pdf_paths, output_path, flush_pages=FLUSH_PAGES, flush_bytes=FLUSH_BYTES, dedupe=True,
+                   select=None, progress=None):
+    # Appends inputs to output_path in batches, writing each batch with an
+    # incremental save and reopening the file, so memory is bounded by the batch
+    # rather than the whole merge. The batches go to a work file next to
+    # output_path that replaces it once the merge is complete. select(pdf_path,
+    # pdf) can return the pages to take from each input. progress(done, total) is
+    # called before each input (total is 0 when pdf_paths has no length); an
+    # exception from it stops the merge and leaves output_path as it was.
+    # Returns (failed, stats).
+    failed = []
+    deduplicator = ResourceDeduplicator() if dedupe else None
+    stats = {"inputs": 0, "pages": 0, "bytes_read": 0, "flushes": 0}
+    started = time.perf_counter()
+    peak = memory.current_rss() or 0
+
+    work_path = docio.temp_path_for(output_path)
+    output = fitz.open()
+    saved = complete = False
+    pending_pages = pending_bytes = 0
+
+    def flush():
+        nonlocal output, saved, pending_pages, pending_bytes
+        with metrics.stage("save"):
+            if saved:
+                output.saveIncr()
+            else:
+                output.save(work_path)
+                saved = True
+            output.close()
+            output = fitz.open(work_path)
+        stats["flushes"] += 1
+        pending_pages = pending_bytes = 0
+
+    total = len(pdf_paths) if hasattr(pdf_paths, "__len__") else 0
+    try:
+        for done, pdf_path in enumerate(pdf_paths):
+            if progress is not None:
+                progress(done, total)
+            try:
+                with docio.open_pdf(pdf_path) as input_pdf:
+                    pages = select(pdf_path, input_pdf) if select is not None else None
+                    first_xref = output.xref_length()
+                    with metrics.stage("insert_pdf"):
+                        inserted = insert_pages(output, input_pdf, pages)
+                    stats["pages"] += inserted
+                    pending_pages += inserted
+            except Exception as e:
+                failed.append((pdf_path, e))
+                continue
+
+            if deduplicator is not None:
+                with metrics.stage("dedupe"):
+                    deduplicator.run(output, first_xref)
+            size = docio.source_size(pdf_path)
+            stats["inputs"] += 1
+            stats["bytes_read"] += size
+            pending_bytes += size
+            peak = max(peak, memory.current_rss() or 0)
+
+            if pending_pages >= flush_pages or pending_bytes >= flush_bytes:
+                flush()
+
+        if stats["pages"] == 0:
+            raise ValueError("None of the selected files could be combined.")
+        if pending_pages or not saved:
+            flush()
+        complete = True
+    finally:
+        output.close()
+        if not complete and os.path.exists(work_path):
+            os.remove(work_path)
+    os.replace(work_path, output_path)
+
+    elapsed = time.perf_counter() - started
+    stats["bytes_written"] = os.path.getsize(output_path)
+    stats["objects_deduplicated"] = deduplicator.merged if deduplicator is not None else 0
+    stats["seconds"] = elapsed
+    stats["pages_per_second"] = stats["pages"] / elapsed if elapsed else 0.0
+    stats["mb_per_second"] = stats["bytes_read"] / 1024 / 1024 / elapsed if elapsed else 0.0
+    stats["peak_rss"] = max(peak, memory.current_rss() or 0) or memory.peak_rss()
+    return failed, stats
@@ -0,0 +1,266 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from pdftools import cache, memory
+
+METRICS_ENV = "PDFTOOLS_METRICS"
+LOG_BYTES = 8 * 1024 * 1024
+PROFILE_TOP = 40
+
+_current = contextvars.ContextVar("pdftools_operation", default=None)
+_log_lock = threading.Lock()
+_profile_lock = threading.Lock()
+
+
+class Operation:
+    # Timings and counters of one tool run: total time, time per named stage
+    # (how often and how long), counters such as pages, and bytes in and out
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.stages = {}
+        self.counters = {}
+        self.inputs = []
+        self.outputs = []
+        self.started = time.perf_counter()
+
+    def add_stage(self, name, seconds):
+        stage = self.stages.setdefault(name, [0, 0.0])
+        stage[0] += 1
+        stage[1] += seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        return {"stages": self.stages, "counters": self.counters}
+
+    def merge(self, summary):
+        for name, (calls, seconds) in summary["stages"].items():
+            stage = self.stages.setdefault(name, [0, 0.0])
+            stage[0] += calls
+            stage[1] += seconds
+        for name, amount in summary["counters"].items():
+            self.count(name, amount)
+
+    def record(self, error=None):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "operation": self.name,
+            **self.fields,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "stages": {name: {"calls": calls, "seconds": round(seconds, 4)}
+                       for name, (calls, seconds) in self.stages.items()},
+            "counters": self.counters,
+            "bytes_in": _total_size(self.inputs),
+            "bytes_out": _total_size(self.outputs),
+            "peak_rss": memory.peak_rss(),
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        }
+
+
+def _total_size(sources):
+    # Files are measured on disk and data by its length; streams count as nothing
+    total = 0
+    for source in sources:
+        if isinstance(source, (bytes, bytearray)):
+            total += len(source)
+        elif isinstance(source, memoryview):
+            total += source.nbytes
+        elif isinstance(source, (str, os.PathLike)):
+            try:
+                total += os.path.getsize(source)
+            except OSError:
+                pass
+    return total
+
+
+def log_path():
+    # PDFTOOLS_METRICS names the log file, or turns logging off when set to 0
+    path = os.environ.get(METRICS_ENV)
+    if path == "0":
+        return None
+    return path or os.path.join(cache.cache_dir(), "metrics.jsonl")
+
+
+def write_record(record):
+    path = log_path()
+    if path is None:
+        return
+    line = json.dumps(record) + "\n"
+    try:
+        with _log_lock:
+            if os.path.exists(path) and os.path.getsize(path) > LOG_BYTES:
+                # Keep one older log; what matters is recent runs
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError:
+        pass
+
+
+@contextmanager
+def operation(name, inputs=(), outputs=(), **fields):
+    # Times a tool run and logs it as one JSON line when it ends, with the stages
+    # and counters recorded inside it. An operation inside another one is only a
+    # stage of it: its stages and counters are added to the outer operation and
+    # its inputs and outputs, already counted there, are dropped.
+    outer = _current.get()
+    op = Operation(name, fields)
+    op.inputs.extend(_paths(inputs))
+    op.outputs.extend(_paths(outputs))
+    token = _current.set(op)
+    error = None
+    try:
+        yield op
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        if outer is not None:
+            outer.merge(op.summary())
+            outer.add_stage(name, time.perf_counter() - op.started)
+        else:
+            write_record(op.record(error))
+
+
+def _paths(paths):
+    # One path or source, or a list of them
+    if isinstance(paths, (str, os.PathLike, bytes, bytearray, memoryview)) or hasattr(paths, "read"):
+        return [paths]
+    return list(paths)
+
+
+def timed(name, inputs=(), outputs=(), fields=()):
+    # Decorator form of operation(). inputs, outputs and fields name parameters of
+    # the function: paths (or lists of paths) read and written, and values to log.
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            values = arguments.arguments
+            with operation(name, [path for param in inputs if values[param] for path in _paths(values[param])],
+                           [path for param in outputs if values[param] for path in _paths(values[param])],
+                           **{param: values[param] for param in fields}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def stage(name):
+    # Adds the time spent inside to the current operation's stage; costs next to
+    # nothing when no operation is being recorded
+    op = _current.get()
+    if op is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        op.add_stage(name, time.perf_counter() - started)
+
+
+@contextmanager
+def capture():
+    # Records stages and counters without logging them, so a worker process can
+    # send its op.summary() back for the parent to merge() into its operation
+    op = Operation("worker", {})
+    token = _current.set(op)
+    try:
+        yield op
+    finally:
+        _current.reset(token)
+
+
+def merge(summary):
+    op = _current.get()
+    if op is not None:
+        op.merge(summary)
+
+
+def count(name, amount=1):
+    op = _current.get()
+    if op is not None:
+        op.count(name, amount)
+
+
+def read_inputs(paths):
+    # Passes paths through, counting each one as an input of the current
+    # operation as it is taken; for generators that can only be read once
+    for path in paths:
+        op = _current.get()
+        if op is not None:
+            op.inputs.append(path)
+        yield path
+
+
+def add_outputs(paths):
+    op = _current.get()
+    if op is not None:
+        op.outputs.extend(_paths(paths))
+
+
+@contextmanager
+def profiling(label):
+    # Runs the block under cProfile and tracemalloc, then writes
+    # <label>.prof (for pstats or snakeviz) and a text summary of the slowest
+    # functions and largest allocations to the profiles cache folder. Only the
+    # calling thread is profiled, not worker processes, and one block at a time:
+    # while another runs, the block just runs unprofiled. Yields a dict that
+    # receives the two paths.
+    if not _profile_lock.acquire(blocking=False):
+        yield {}
+        return
+    try:
+        with _profiled(label) as paths:
+            yield paths
+    finally:
+        _profile_lock.release()
+
+
+@contextmanager
+def _profiled(label):
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', label)[:60]}"
+    base = os.path.join(cache.cache_dir("profiles"), name)
+    paths = {"profile": base + ".prof", "report": base + ".txt"}
+    profile = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    profile.enable()
+    try:
+        yield paths
+    finally:
+        profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        profile.dump_stats(paths["profile"])
+        text = io.StringIO()
+        text.write(f"{label}\nPython heap: {current / 1024 / 1024:.1f} MB at the end, "
+                   f"{peak / 1024 / 1024:.1f} MB peak\n\nSlowest functions (cumulative):\n")
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        text.write("Largest allocations still held:\n")
+        for statistic in snapshot.statistics("lineno")[:PROFILE_TOP // 2]:
+            text.write(f"{statistic}\n")
+        with open(paths["report"], "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
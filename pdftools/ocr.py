@@ -0,0 +1,206 @@
+import json
+import multiprocessing
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fitz  # PyMuPDF
+
+from pdftools import cache, docio, metrics, parallel
+
+OCR_DPI = 300
+LANGUAGE = "eng"
+# A page with at least this many characters of extractable text already has a text layer
+MIN_TEXT_CHARS = 10
+STORE_BYTES = 64 * 1024 * 1024
+# Bump when the OCR output format or the page key changes so old cache entries are ignored
+OCR_VERSION = 3
+
+TEXT, IMAGE, BLANK = "text", "image", "blank"
+
+_worker_options = None
+
+
+def classify_page(page):
+    # TEXT pages are used as they are; IMAGE pages (scans, or text drawn as
+    # outlines) need OCR; BLANK pages have nothing to read
+    text = page.get_text("text")
+    if sum(not char.isspace() for char in text) >= MIN_TEXT_CHARS:
+        return TEXT
+    if page.get_images() or page.get_cdrawings():
+        return IMAGE
+    return TEXT if text.strip() else BLANK
+
+
+def page_key(page, language, dpi, memo=None):
+    # Hash of what OCR would see (cache.page_hash: the page and every object it
+    # draws) and the OCR settings, so no rendering is needed to find a cached result
+    return f"{OCR_VERSION}|{language}|{dpi}|{cache.page_hash(page, memo)}"
+
+
+def ocr_store():
+    return cache.lazy_store("ocr", STORE_BYTES)
+
+
+def load_words(key):
+    store = ocr_store()
+    data = store.get(key) if store else None
+    return json.loads(zlib.decompress(data)) if data is not None else None
+
+
+def save_words(key, words):
+    store = ocr_store()
+    if store:
+        store.put(key, zlib.compress(json.dumps(words).encode("utf-8")))
+
+
+def ocr_words(page, language=LANGUAGE, dpi=OCR_DPI, tessdata=None):
+    # [[x0, y0, x1, y1, word, block, line]] in page coordinates
+    textpage = page.get_textpage_ocr(language=language, dpi=dpi, full=True, tessdata=tessdata)
+    return [list(word[:7]) for word in page.get_text("words", textpage=textpage)]
+
+
+def _open_worker_doc(pdf_path, options):
+    global _worker_options
+    parallel.open_doc(pdf_path)
+    _worker_options = options
+
+
+@parallel.worker_call
+def _ocr_in_worker(page_num):
+    return ocr_words(parallel.doc[page_num], **_worker_options)
+
+
+def recognize_pages(input_path, page_nums, language=LANGUAGE, dpi=OCR_DPI, tessdata=None, workers=None,
+                    progress=None):
+    # {page_num: words} for the given pages, OCRed across a process pool
+    options = dict(language=language, dpi=dpi, tessdata=tessdata)
+    results = {}
+    total = len(page_nums)
+    workers = parallel.worker_count(total, workers)
+    if workers == 1:
+        with fitz.open(input_path) as pdf:
+            for page_num in page_nums:
+                results[page_num] = ocr_words(pdf[page_num], **options)
+                if progress is not None:
+                    progress(len(results), total)
+        return results
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_open_worker_doc, initargs=(input_path, options)) as pool:
+        pending = {pool.submit(_ocr_in_worker, page_num): page_num for page_num in page_nums}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+                    if progress is not None:
+                        progress(len(results), total)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return results
+
+
+def add_text_layer(page, words):
+    # Invisible text over the scan, so the page can be searched and copied from
+    # while looking exactly as before. Each OCR line is written as one run of text,
+    # stretched to the width of the line, so copied text keeps its lines and spaces.
+    font = fitz.Font("helv")
+    lines = {}
+    for word in words:
+        lines.setdefault((word[5], word[6]), []).append(word)
+    for line_words in lines.values():
+        text = " ".join(word[4] for word in line_words)
+        left = min(word[0] for word in line_words)
+        right = max(word[2] for word in line_words)
+        baseline = max(word[3] for word in line_words)
+        fontsize = max(word[3] - word[1] for word in line_words) / (font.ascender - font.descender)
+        length = font.text_length(text, fontsize=fontsize)
+        if not length or right <= left:
+            continue
+        origin = fitz.Point(left, baseline + font.descender * fontsize)
+        writer = fitz.TextWriter(page.rect)
+        writer.append(origin, text, font=font, fontsize=fontsize)
+        writer.write_text(page, render_mode=3, morph=(origin, fitz.Matrix((right - left) / length, 1)))
+
+
+def ocr_lines(words):
+    # Words grouped into paragraphs (OCR blocks) of lines, in reading order
+    paragraphs = {}
+    for x0, y0, x1, y1, word, block, line in words:
+        paragraphs.setdefault(block, {}).setdefault(line, []).append(word)
+    return [[" ".join(line_words) for line_words in lines.values()] for lines in paragraphs.values()]
+
+
+def page_paragraphs(page, kind, words):
+    if kind == IMAGE:
+        return [" ".join(lines) for lines in ocr_lines(words)]
+    blocks = page.get_text("blocks", sort=True)
+    return [" ".join(block[4].split()) for block in blocks if block[6] == 0 and block[4].strip()]
+
+
+def write_docx(pdf, kinds, words, output_path):
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    document = Document()
+    paragraph = None
+    for page_num, page in enumerate(pdf):
+        if page_num and paragraph is not None:
+            paragraph.add_run().add_break(WD_BREAK.PAGE)
+        for text in page_paragraphs(page, kinds[page_num], words.get(page_num)):
+            paragraph = document.add_paragraph(text)
+    document.save(output_path)
+
+
+@metrics.timed("ocr", inputs=["input_path"], outputs=["pdf_output", "docx_output"], fields=["language", "dpi"])
+def ocr_pdf(input_path, pdf_output=None, docx_output=None, language=LANGUAGE, dpi=OCR_DPI, tessdata=None,
+            workers=None, progress=None):
+    # Only pages without a text layer are rendered and recognized; results are
+    # cached by page content hash, so a rerun OCRs nothing. Writes a searchable
+    # PDF and/or a DOCX and returns counts of text, image, blank and cached pages.
+    with fitz.open(input_path) as pdf, metrics.stage("classify"):
+        kinds = [classify_page(page) for page in pdf]
+        memo = {}
+        keys = {page_num: page_key(pdf[page_num], language, dpi, memo)
+                for page_num, kind in enumerate(kinds) if kind == IMAGE}
+
+    words = {}
+    for page_num, key in keys.items():
+        cached = load_words(key)
+        if cached is not None:
+            words[page_num] = cached
+    missing = [page_num for page_num in keys if page_num not in words]
+    if missing:
+        if tessdata is None:
+            try:
+                tessdata = fitz.get_tessdata()
+            except RuntimeError:
+                raise RuntimeError("Tesseract language data not found. Install Tesseract OCR or set "
+                                   "TESSDATA_PREFIX to its tessdata folder.") from None
+        with metrics.stage("recognize"):
+            recognized = recognize_pages(input_path, missing, language, dpi, tessdata, workers, progress)
+        metrics.count("pages_recognized", len(recognized))
+        for page_num, page_words in recognized.items():
+            save_words(keys[page_num], page_words)
+        words.update(recognized)
+
+    with fitz.open(input_path) as pdf:
+        if pdf_output:
+            with metrics.stage("text layer"):
+                for page_num in keys:
+                    add_text_layer(pdf[page_num], words[page_num])
+            with metrics.stage("save"):
+                docio.save_pdf(pdf, pdf_output, garbage=3, deflate=True)
+        if docx_output:
+            with metrics.stage("write docx"):
+                write_docx(pdf, kinds, words, docx_output)
+
+    return {
+        "pages": len(kinds),
+        "text_pages": kinds.count(TEXT),
+        "image_pages": kinds.count(IMAGE),
+        "blank_pages": kinds.count(BLANK),
+        "cached_pages": len(keys) - len(missing),
+    }
@@ -0,0 +1,141 @@
+import hashlib
+
+import fitz  # PyMuPDF
+
+from pdftools import docio, metrics
+
+# Re-encoding an image only pays off when it shrinks the stream by at least this much
+MIN_SAVING = 0.05
+# Leave images alone unless they are this much sharper than the target resolution
+DPI_TOLERANCE = 1.2
+
+SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+
+
+def settings_for_level(optimization_level):
+    level = max(0, min(100, int(optimization_level)))
+    return {
+        "quality": round(95 - level * 0.65),
+        "target_dpi": round(300 - level * 2.28),
+    }
+
+
+def _placed_dpi(doc, xref, page_numbers, width, height):
+    dpi = 0
+    for page_num in page_numbers:
+        for rect in doc[page_num].get_image_rects(xref):
+            if rect.width > 0 and rect.height > 0:
+                dpi = max(dpi, width * 72 / rect.width, height * 72 / rect.height)
+    return dpi
+
+
+def _is_recompressible(doc, xref, bpc, masks):
+    if xref in masks or bpc < 8:
+        return False
+    if doc.xref_get_key(xref, "ImageMask")[1] == "true":
+        return False
+    # Decode arrays invert or remap samples; dropping them would change the picture
+    return doc.xref_get_key(xref, "Decode")[0] == "null"
+
+
+def _encode_image(doc, xref, page_numbers, quality, target_dpi, grayscale):
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if grayscale and pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    elif pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+
+    dpi = _placed_dpi(doc, xref, page_numbers, pix.width, pix.height)
+    if dpi > target_dpi * DPI_TOLERANCE:
+        scale = target_dpi / dpi
+        pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+    return pix, pix.tobytes("jpeg", jpg_quality=quality)
+
+
+def _write_image(doc, xref, pix, data):
+    doc.update_stream(xref, data, compress=0)
+    doc.xref_set_key(xref, "Filter", "/DCTDecode")
+    doc.xref_set_key(xref, "Width", str(pix.width))
+    doc.xref_set_key(xref, "Height", str(pix.height))
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if pix.n == 1 else "/DeviceRGB")
+
+
+def recompress_images(doc, quality, target_dpi, grayscale=False, progress=None):
+    stats = {"images": 0, "images_rewritten": 0, "image_bytes_before": 0, "image_bytes_after": 0}
+    images = {}
+    placements = {}
+    masks = set()
+    for page in doc:
+        for xref, smask, width, height, bpc, *rest in page.get_images(full=True):
+            images[xref] = bpc
+            placements.setdefault(xref, []).append(page.number)
+            if smask:
+                masks.add(smask)
+
+    # Identical streams are encoded once; garbage collection later merges the copies
+    encoded = {}
+    for done, (xref, bpc) in enumerate(images.items()):
+        if progress is not None:
+            progress(done, len(images))
+        if not _is_recompressible(doc, xref, bpc, masks):
+            continue
+        raw = doc.xref_stream_raw(xref)
+        stats["images"] += 1
+        stats["image_bytes_before"] += len(raw)
+
+        digest = hashlib.sha1(raw).digest()
+        if digest not in encoded:
+            try:
+                with metrics.stage("encode"):
+                    encoded[digest] = _encode_image(doc, xref, placements[xref], quality, target_dpi, grayscale)
+            except (RuntimeError, ValueError):
+                encoded[digest] = None
+        result = encoded[digest]
+
+        if result is None or len(result[1]) > len(raw) * (1 - MIN_SAVING):
+            stats["image_bytes_after"] += len(raw)
+            continue
+        with metrics.stage("write images"):
+            _write_image(doc, xref, *result)
+        stats["images_rewritten"] += 1
+        stats["image_bytes_after"] += len(result[1])
+    metrics.count("images", stats["images"])
+    metrics.count("images_rewritten", stats["images_rewritten"])
+    return stats
+
+
+def optimize_document(doc, quality, target_dpi, grayscale=False, subset_fonts=True, progress=None):
+    stats = recompress_images(doc, quality, target_dpi, grayscale, progress)
+    stats["fonts_subset"] = False
+    if subset_fonts:
+        try:
+            with metrics.stage("subset fonts"):
+                doc.subset_fonts()
+            stats["fonts_subset"] = True
+        except Exception:
+            # Subsetting needs fontTools for some font types; the file is still valid without it
+            pass
+    return stats
+
+
+@metrics.timed("optimize", inputs=["input_path"], outputs=["output_path"],
+               fields=["optimization_level", "grayscale"])
+def optimize_pdf(input_path, output_path, optimization_level=50, grayscale=False, quality=None, target_dpi=None,
+                 progress=None):
+    # progress(done, total) is called between images; when it raises, nothing is saved
+    settings = settings_for_level(optimization_level)
+    if quality is not None:
+        settings["quality"] = quality
+    if target_dpi is not None:
+        settings["target_dpi"] = target_dpi
+
+    with docio.open_pdf(input_path) as doc:
+        stats = optimize_document(doc, grayscale=grayscale, progress=progress, **settings)
+        with metrics.stage("save"):
+            size_after = docio.save_pdf(doc, output_path, **SAVE_OPTIONS)
+    stats["size_before"] = docio.source_size(input_path)
+    stats["size_after"] = size_after
+    return stats
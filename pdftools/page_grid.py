@@ -0,0 +1,244 @@
+import queue
+import tkinter as tk
+from tkinter import Canvas, Frame, Label, Scrollbar
+
+from pdftools import thumbnails, tkimage
+
+CELL_PADDING = 10
+ROTATIONS = (0, 90, 180, 270)
+OVERSCAN_ROWS = 1
+POLL_MS = 30
+
+
+class PageCell:
+    def __init__(self, frame, title, image):
+        self.frame = frame
+        self.title = title
+        self.image = image
+        self.photo = None
+        self.window = None
+        self.slot = None
+        self.page_num = None
+
+
+class PageGrid(Frame):
+    # Only the cells of visible rows exist; they are recycled as the view scrolls.
+    # build_cell(cell) adds extra widgets to a new cell, bind_cell(cell, page_num)
+    # points them at the page the cell currently shows.
+    def __init__(self, master, pdf_path, page_count, thumb_size=thumbnails.THUMB_SIZE, title=None,
+                 build_cell=None, bind_cell=None, reorderable=False, cache=thumbnails.shared_cache, **kwargs):
+        super().__init__(master, **kwargs)
+        self.thumb_size = thumb_size
+        self.order = list(range(page_count))
+        self.rotations = [0] * page_count
+        self.title_for = title or (lambda page_num: f"Page {page_num + 1}")
+        self.build_cell = build_cell
+        self.bind_cell = bind_cell
+        self.reorderable = reorderable
+        self.cache = cache
+        self.columns = 1
+
+        self.renderer = thumbnails.ThumbnailRenderer(pdf_path)
+        self._results = queue.Queue()
+        self._pending = {}
+        self._cells = {}
+        self._spare = []
+        self._drag_slot = None
+
+        self.canvas = Canvas(self, bg='white', borderwidth=0, highlightthickness=0, yscrollincrement=20)
+        scrollbar = Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._placeholder = tk.PhotoImage(master=self, width=thumb_size, height=thumb_size)
+        cell = self._new_cell()
+        cell.frame.update_idletasks()
+        self.cell_width = max(cell.frame.winfo_reqwidth(), thumb_size) + CELL_PADDING
+        self.cell_height = cell.frame.winfo_reqheight() + CELL_PADDING
+        self._spare.append(cell)
+
+        self._bind_wheel(self.canvas)
+        self.canvas.bind("<Configure>", lambda event: self.refresh())
+        self.bind("<Destroy>", self._on_destroy)
+        self._poll_id = self.after(POLL_MS, self._poll)
+
+    def refresh(self):
+        width = max(1, self.canvas.winfo_width())
+        self.columns = max(1, width // self.cell_width)
+        rows = -(-len(self.order) // self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell_width, rows * self.cell_height))
+        for slot in list(self._cells):
+            self._release(slot)
+        self._update_visible()
+
+    def rotate(self, page_num, degrees=90):
+        self.rotations[page_num] = (self.rotations[page_num] + degrees) % 360
+        for cell in self._cells.values():
+            if cell.page_num == page_num:
+                self._show_page(cell)
+
+    def move(self, from_slot, to_slot):
+        self.order.insert(to_slot, self.order.pop(from_slot))
+        self.refresh()
+
+    def _thumb_key(self, page_num):
+        return (self.renderer.key, page_num, self.rotations[page_num], self.thumb_size)
+
+    def _new_cell(self):
+        frame = Frame(self.canvas, relief=tk.SUNKEN, borderwidth=1, pady=5, bg='gray')
+        title = Label(frame)
+        title.pack(side='top', pady=2)
+        image = Label(frame, image=self._placeholder, width=self.thumb_size, height=self.thumb_size)
+        image.pack(side='top')
+        cell = PageCell(frame, title, image)
+        if self.build_cell:
+            self.build_cell(cell)
+        self._bind_wheel(frame)
+        if self.reorderable:
+            for widget in (frame, title, image):
+                widget.bind("<ButtonPress-1>", lambda event, cell=cell: self._on_drag_start(cell))
+                widget.bind("<B1-Motion>", lambda event, cell=cell: self._on_drag_motion(event, cell))
+                widget.bind("<ButtonRelease-1>", lambda event, cell=cell: self._on_drag_end(event, cell))
+        return cell
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda event: self._scroll(-event.delta // 120))
+        widget.bind("<Button-4>", lambda event: self._scroll(-1))
+        widget.bind("<Button-5>", lambda event: self._scroll(1))
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units * 3, "units")
+        self._update_visible()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._update_visible()
+
+    def _update_visible(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // self.cell_height) - OVERSCAN_ROWS)
+        last_row = int(bottom // self.cell_height) + OVERSCAN_ROWS
+        visible = range(first_row * self.columns, min(len(self.order), (last_row + 1) * self.columns))
+
+        for slot in list(self._cells):
+            if slot not in visible:
+                self._release(slot)
+        for slot in visible:
+            if slot not in self._cells:
+                self._show(slot)
+
+    def _show(self, slot):
+        cell = self._spare.pop() if self._spare else self._new_cell()
+        row, col = divmod(slot, self.columns)
+        x, y = col * self.cell_width, row * self.cell_height
+        if cell.window is None:
+            cell.window = self.canvas.create_window(x, y, window=cell.frame, anchor='nw')
+        else:
+            self.canvas.coords(cell.window, x, y)
+            self.canvas.itemconfigure(cell.window, state='normal')
+        cell.slot = slot
+        cell.page_num = self.order[slot]
+        self._cells[slot] = cell
+        self._show_page(cell)
+        if self.bind_cell:
+            self.bind_cell(cell, cell.page_num)
+
+    def _show_page(self, cell):
+        cell.title.config(text=self.title_for(cell.page_num))
+        key = self._thumb_key(cell.page_num)
+        image = self.cache.get(key) or self._rotated(key)
+        if image is None:
+            thumbnail = self.renderer.load(cell.page_num, self.thumb_size, self.rotations[cell.page_num])
+            if thumbnail is not None:
+                image = self._remember(key, thumbnail)
+        if image is None:
+            cell.photo = None
+            cell.image.config(image=self._placeholder)
+            self._request(key)
+        else:
+            cell.photo = tkimage.photo_image(image, master=self)
+            cell.image.config(image=cell.photo)
+
+    def _rotated(self, key):
+        # Turning a page only needs its bitmap at any other angle, not a new render
+        doc_key, page_num, rotation, size = key
+        for other in ROTATIONS:
+            image = self.cache.get((doc_key, page_num, other, size)) if other != rotation else None
+            if image is not None:
+                image = tkimage.rotate_image(image, rotation - other)
+                self.cache.put(key, image, image.width * image.height * 3)
+                return image
+        return None
+
+    def _release(self, slot):
+        cell = self._cells.pop(slot)
+        self.canvas.itemconfigure(cell.window, state='hidden')
+        future = self._pending.get(self._thumb_key(cell.page_num))
+        # Don't spend workers on pages that scrolled out of view before they started
+        if future is not None and future.cancel():
+            del self._pending[self._thumb_key(cell.page_num)]
+        self._spare.append(cell)
+
+    def _request(self, key):
+        if key in self._pending:
+            return
+        doc_key, page_num, rotation, size = key
+        future = self.renderer.submit(page_num, size, rotation)
+        future.add_done_callback(lambda future, key=key: self._results.put((key, future)))
+        self._pending[key] = future
+
+    def _remember(self, key, thumbnail):
+        width, height, samples = thumbnail
+        image = tkimage.image_from_samples(width, height, samples)
+        self.cache.put(key, image, len(samples))
+        return image
+
+    def _poll(self):
+        while True:
+            try:
+                key, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            if future.cancelled() or future.exception() is not None:
+                continue
+            self._remember(key, future.result())
+            for cell in self._cells.values():
+                if self._thumb_key(cell.page_num) == key:
+                    self._show_page(cell)
+        self._poll_id = self.after(POLL_MS, self._poll)
+
+    def _on_drag_start(self, cell):
+        self._drag_slot = cell.slot
+        cell.frame.lift()
+
+    def _on_drag_motion(self, event, cell):
+        if self._drag_slot is None:
+            return
+        x = self.canvas.canvasx(event.x_root - self.canvas.winfo_rootx())
+        y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty())
+        self.canvas.coords(cell.window, x - self.cell_width // 2, y - self.cell_height // 2)
+
+    def _on_drag_end(self, event, cell):
+        if self._drag_slot is None:
+            return
+        x = self.canvas.canvasx(event.x_root - self.canvas.winfo_rootx())
+        y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty())
+        col = min(self.columns - 1, max(0, int(x // self.cell_width)))
+        row = max(0, int(y // self.cell_height))
+        to_slot = min(len(self.order) - 1, row * self.columns + col)
+        from_slot, self._drag_slot = self._drag_slot, None
+        if to_slot == from_slot:
+            self.refresh()
+        else:
+            self.move(from_slot, to_slot)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.after_cancel(self._poll_id)
+            self.renderer.close()
@@ -0,0 +1,44 @@
+import functools
+import os
+
+import fitz  # PyMuPDF
+
+# Shared by the tools that spread pages over a process pool. Pools use spawn,
+# so each worker is a fresh interpreter: what it keeps between tasks (the open
+# source document) lives in this module, set up by the pool initializer.
+
+# Below this many pages per worker, process start-up costs more than it saves
+MIN_PAGES_PER_WORKER = 4
+CHUNKS_PER_WORKER = 4
+
+doc = None
+
+
+def worker_count(page_total, workers=None):
+    workers = workers or os.cpu_count() or 1
+    return max(1, min(workers, page_total // MIN_PAGES_PER_WORKER))
+
+
+def split_ranges(pages, chunk_count):
+    # Contiguous runs keep each worker's page lookups and shared resources local
+    size = max(1, -(-len(pages) // max(1, chunk_count)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def open_doc(pdf_path):
+    # Pool initializer: each worker opens the source once and reads its pages
+    # from parallel.doc in every task
+    global doc
+    doc = fitz.open(pdf_path)
+
+
+def worker_call(func):
+    # For functions run in worker processes: MuPDF errors hold unpicklable
+    # handles, so any failure is sent back as a plain RuntimeError with its message
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            raise RuntimeError(str(e)) from None
+    return call
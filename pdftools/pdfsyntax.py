@@ -0,0 +1,16 @@
+import re
+
+# Patterns for the object syntax MuPDF returns from xref_object() and xref_get_key()
+
+# An indirect reference such as "12 0 R". The lookbehind stops "10.5 0 R" in a
+# number array from reading as a reference to object 5.
+REFERENCE = re.compile(r"(?<![\d.])(\d+) 0 R\b")
+# Links back up a tree: a page to its page-tree node, an annotation or
+# structure element to its page or parent
+BACK_REFERENCE = re.compile(r"/(?:Parent|P)\s+\d+\s+0\s+R\b")
+
+
+def strip_back_references(text):
+    # text without its back-references, so following what is left never climbs
+    # from an object to the page or tree that holds it
+    return BACK_REFERENCE.sub("", text)
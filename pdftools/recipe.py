@@ -0,0 +1,194 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pdftools import docio, engine, metrics, optimize, parallel, split
+
+# Steps, in the form they are saved in:
+#   {"op": "delete", "pages": "2,5-7"}
+#   {"op": "rotate", "pages": "1-", "degrees": 90}
+#   {"op": "reorder", "order": "3,1-2,4-"}
+#   {"op": "optimize", "level": 50, "grayscale": false}
+#   {"op": "split", "every": 10}   (or ranges/bookmarks/max_bytes, name_format, compact; last step only)
+# Page numbers are 1-based and refer to the document as it is when the step runs.
+OPERATIONS = ("delete", "rotate", "reorder", "optimize", "split")
+REQUIRED = {"delete": ("pages",), "reorder": ("order",)}
+# Options given as page-range text, and options that are whole numbers
+RANGE_OPTIONS = ("pages", "order", "ranges")
+NUMBER_OPTIONS = ("degrees", "level", "every", "bookmarks", "max_bytes")
+ALL_PAGES = "1-"
+SAVE_OPTIONS = dict(garbage=1)
+RECIPE_VERSION = 1
+
+
+def describe(step):
+    op = step["op"]
+    if op == "delete":
+        return f"Delete pages {step['pages']}"
+    if op == "rotate":
+        pages = step.get("pages", ALL_PAGES)
+        return f"Rotate {'all pages' if pages == ALL_PAGES else 'pages ' + pages} by {step.get('degrees', 90)}°"
+    if op == "reorder":
+        return f"Reorder pages to {step['order']}"
+    if op == "optimize":
+        return f"Optimize at level {step.get('level', 50)}" + (" in grayscale" if step.get("grayscale") else "")
+    for option, text in (("ranges", "at ranges {}"), ("bookmarks", "at bookmarks down to level {}"),
+                         ("max_bytes", "into files under {} bytes"), ("every", "every {} pages")):
+        if step.get(option) is not None:
+            return "Split " + text.format(step[option])
+    return "Split into single pages"
+
+
+class Recipe:
+    # Operations run one after another on a single open document, which is
+    # serialized once at the end: either saved as one PDF, or written out as
+    # the parts of a final split step
+    def __init__(self, steps=()):
+        # Every step is checked here, so a recipe that loads can also be
+        # described and run without a KeyError halfway through
+        self.steps = []
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict):
+                raise ValueError(f"Recipe step {index + 1} is not an object.")
+            self.steps.append(dict(step))
+        for index, step in enumerate(self.steps):
+            op = step.get("op")
+            if op not in OPERATIONS:
+                raise ValueError(f"Recipe step {index + 1}: unknown operation {op!r}; "
+                                 f"use one of {', '.join(OPERATIONS)}.")
+            for key in REQUIRED.get(op, ()):
+                if key not in step:
+                    raise ValueError(f"Recipe step {index + 1} ({op}) needs {key!r}.")
+            for key in RANGE_OPTIONS:
+                if step.get(key) is not None and not isinstance(step[key], str):
+                    raise ValueError(f"Recipe step {index + 1} ({op}): {key!r} must be page ranges "
+                                     "such as \"1,3-5\".")
+            for key in NUMBER_OPTIONS:
+                value = step.get(key)
+                if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                    raise ValueError(f"Recipe step {index + 1} ({op}): {key!r} must be a whole number.")
+            if op == "rotate" and step.get("degrees", 90) % 90:
+                raise ValueError(f"Recipe step {index + 1} (rotate): degrees must be a multiple of 90.")
+            if op == "split" and index != len(self.steps) - 1:
+                raise ValueError("Split can only be the last step of a recipe.")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        steps = data.get("steps", []) if isinstance(data, dict) else None
+        if not isinstance(steps, list):
+            raise ValueError(f"{path} is not a recipe: it needs a list of steps.")
+        return cls(steps)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": RECIPE_VERSION, "steps": self.steps}, f, indent=2)
+
+    @property
+    def splits(self):
+        return bool(self.steps) and self.steps[-1]["op"] == "split"
+
+    @property
+    def incremental(self):
+        # Turning and reordering pages only changes /Rotate and the page tree,
+        # which can be appended to the file as an incremental update
+        return all(step["op"] in ("rotate", "reorder") for step in self.steps)
+
+    @property
+    def save_options(self):
+        return optimize.SAVE_OPTIONS if any(step["op"] == "optimize" for step in self.steps) else SAVE_OPTIONS
+
+    def apply(self, pdf):
+        # Every step but a final split, in place on the open document.
+        # Returns the save options the result needs.
+        for step in self.steps:
+            op = step["op"]
+            with metrics.stage(op):
+                if op == "delete":
+                    deleted = set(engine.parse_page_ranges(step["pages"], len(pdf)))
+                    if len(deleted) >= len(pdf):
+                        raise ValueError("The recipe deletes every page.")
+                    engine.arrange_pages(pdf, [page_num for page_num in range(len(pdf)) if page_num not in deleted])
+                elif op == "rotate":
+                    pages = engine.parse_page_ranges(step.get("pages", ALL_PAGES), len(pdf))
+                    degrees = step.get("degrees", 90)
+                    engine.arrange_pages(pdf, range(len(pdf)), {page_num: degrees for page_num in pages})
+                elif op == "reorder":
+                    engine.arrange_pages(pdf, engine.parse_page_ranges(step["order"], len(pdf)))
+                elif op == "optimize":
+                    settings = optimize.settings_for_level(step.get("level", 50))
+                    optimize.optimize_document(pdf, grayscale=step.get("grayscale", False), **settings)
+        return self.save_options
+
+    @metrics.timed("recipe", inputs=["input_path"])
+    def run(self, input_path, output):
+        # output is the PDF to write (a path or a writable file object), or the
+        # folder for the files of a final split. Returns the paths written.
+        if not self.splits:
+            with docio.updating(input_path, output, self.incremental, **self.save_options) as pdf:
+                self.apply(pdf)
+            metrics.add_outputs(output)
+            return [output]
+
+        with docio.open_pdf(input_path) as pdf:
+            self.apply(pdf)
+            step = self.steps[-1]
+            options = {key: step.get(key) for key in ("ranges", "every", "bookmarks", "max_bytes")}
+            parts = split.plan_parts(pdf, **options)
+            name_format = step.get("name_format") or split.default_name_format(parts, options["bookmarks"])
+            jobs = split.output_jobs(output, parts, name_format, docio.source_stem(input_path))
+            split.write_parts(pdf, jobs, step.get("compact", False))
+            metrics.add_outputs(path for path, pages in jobs)
+            return [path for path, pages in jobs]
+
+
+def output_for(recipe, input_path, output_dir, suffix="_edited"):
+    if recipe.splits:
+        return output_dir
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem}{suffix}.pdf")
+
+
+@parallel.worker_call
+def _run_in_worker(steps, input_path, output):
+    return Recipe(steps).run(input_path, output)
+
+
+def run_many(recipe, input_paths, output_dir, workers=None, progress=None):
+    # Replays the recipe on every file, a file per worker process. Returns
+    # [(input_path, paths written or the exception)] in input order.
+    input_paths = list(input_paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(input_paths)))
+    results = []
+
+    def finished(input_path, result):
+        results.append((input_path, result))
+        if progress is not None:
+            progress(len(results), len(input_paths))
+
+    if workers == 1:
+        for input_path in input_paths:
+            try:
+                result = recipe.run(input_path, output_for(recipe, input_path, output_dir))
+            except Exception as e:
+                result = e
+            finished(input_path, result)
+        return results
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_in_worker, recipe.steps, input_path, output_for(recipe, input_path, output_dir))
+                   for input_path in input_paths]
+        try:
+            for input_path, future in zip(input_paths, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                finished(input_path, result)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return results
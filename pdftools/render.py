@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fitz  # PyMuPDF
+
+from pdftools import metrics, parallel
+
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _render_range(input_path, page_numbers, output_folder, name_format, dpi, report=None):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    rendered = []
+    with fitz.open(input_path) as pdf:
+        for page_num in page_numbers:
+            with metrics.stage("render"):
+                image = pdf[page_num].get_pixmap(dpi=dpi)
+            img_path = os.path.join(output_folder, name_format.format(stem=stem, page=page_num + 1))
+            with metrics.stage("encode"):
+                image.save(img_path)
+            metrics.count("pages")
+            rendered.append((page_num, img_path))
+            if report is not None:
+                report(page_num)
+    return rendered
+
+
+@parallel.worker_call
+def _render_range_in_worker(*args):
+    with metrics.capture() as op:
+        rendered = _render_range(*args, report=_progress_queue.put)
+    return rendered, op.summary()
+
+
+@metrics.timed("images", inputs=["input_path"], fields=["dpi"])
+def render_pages(input_path, output_folder, dpi=300, pages=None, workers=None, progress=None,
+                 name_format="{stem}_p{page:03}.png"):
+    # progress(done, total, page_num) is called on the calling thread for every page;
+    # the returned paths are always in page order, whatever order workers finish in.
+    if pages is None:
+        with fitz.open(input_path) as pdf:
+            pages = list(range(len(pdf)))
+    else:
+        pages = list(pages)
+
+    total = len(pages)
+    done = 0
+    rendered = []
+
+    def report(page_num):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress(done, total, page_num)
+
+    workers = parallel.worker_count(total, workers)
+    if workers == 1:
+        rendered = _render_range(input_path, pages, output_folder, name_format, dpi, report)
+        metrics.add_outputs(path for page_num, path in rendered)
+        return [path for page_num, path in rendered]
+
+    # spawn rather than fork: callers are often GUI threads, and fitz is not fork-safe
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.Queue()
+
+    def drain():
+        while True:
+            try:
+                report(progress_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(progress_queue,)) as pool:
+        pending = {
+            pool.submit(_render_range_in_worker, input_path, chunk, output_folder, name_format, dpi)
+            for chunk in parallel.split_ranges(pages, workers * parallel.CHUNKS_PER_WORKER)
+        }
+        try:
+            while pending:
+                finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                drain()
+                for future in finished:
+                    chunk_rendered, summary = future.result()
+                    rendered.extend(chunk_rendered)
+                    metrics.merge(summary)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    while done < total:
+        report(progress_queue.get())
+
+    rendered.sort()
+    metrics.add_outputs(path for page_num, path in rendered)
+    return [path for page_num, path in rendered]
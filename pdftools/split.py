@@ -0,0 +1,221 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fitz  # PyMuPDF
+
+from pdftools import docio, metrics, parallel, pdfsyntax
+
+PAGE_NAME_FORMAT = "page_{page}.pdf"
+PART_NAME_FORMAT = "{stem}_part{part}_{first}-{last}.pdf"
+BOOKMARK_NAME_FORMAT = "{stem}_{part:02}_{title}.pdf"
+# Full deduplication for many small files: shared fonts and images stored once per file
+COMPACT_SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+SAVE_OPTIONS = dict(garbage=1, deflate=True)
+MAX_TITLE_LENGTH = 60
+# Bytes every object costs in a file besides its content: "n 0 obj"/"endobj", its xref entry
+OBJECT_OVERHEAD = 40
+
+UNSAFE_NAME = re.compile(r'[\x00-\x1f<>:"/\\|?*]+')
+
+
+class Part:
+    def __init__(self, pages, title=""):
+        self.pages = pages
+        self.title = title
+
+
+def every_parts(page_count, every=1):
+    if every < 1:
+        raise ValueError("Pages per file must be at least 1.")
+    return [Part(list(range(start, min(start + every, page_count)))) for start in range(0, page_count, every)]
+
+
+def range_parts(spec, page_count):
+    # "1-3,4-10,11-": one file per comma-separated range
+    from pdftools.engine import parse_page_ranges
+
+    parts = [Part(parse_page_ranges(item, page_count)) for item in spec.split(',') if item.strip()]
+    if not parts:
+        raise ValueError("No page ranges given.")
+    return parts
+
+
+def bookmark_parts(pdf, level=1):
+    # A file per bookmark at the given outline level or above, running up to the
+    # next one; pages before the first bookmark get a file of their own
+    starts = {}
+    for entry_level, title, page in pdf.get_toc(simple=True):
+        if entry_level <= level and 1 <= page <= len(pdf):
+            starts.setdefault(page - 1, title)
+    if not starts:
+        raise ValueError("The PDF has no bookmarks to split at.")
+    if 0 not in starts:
+        starts[0] = ""
+    firsts = sorted(starts)
+    bounds = firsts[1:] + [len(pdf)]
+    return [Part(list(range(first, end)), starts[first]) for first, end in zip(firsts, bounds)]
+
+
+def _object_size(pdf, xref, sizes):
+    size = sizes.get(xref)
+    if size is None:
+        size = OBJECT_OVERHEAD + len(pdf.xref_object(xref, compressed=True))
+        if pdf.xref_is_stream(xref):
+            size += len(pdf.xref_stream_raw(xref) or b"")
+        sizes[xref] = size
+    return size
+
+
+def page_objects(pdf, page_num):
+    # Every object a page needs on its own: contents, resources, annotations...
+    # without following /Parent up the page tree or links into other pages
+    page_xref = pdf.page_xref(page_num)
+    seen = {page_xref}
+    stack = [page_xref]
+    while stack:
+        xref = stack.pop()
+        text = pdf.xref_object(xref, compressed=True)
+        if xref != page_xref and re.search(r"/Type\s*/Page\b", text):
+            continue
+        for match in pdfsyntax.REFERENCE.finditer(pdfsyntax.strip_back_references(text)):
+            ref = int(match[1])
+            if ref not in seen and 0 < ref < pdf.xref_length():
+                seen.add(ref)
+                stack.append(ref)
+    return seen
+
+
+def size_parts(pdf, max_bytes):
+    # Greedily fills each file up to about max_bytes, counting objects shared between
+    # its pages (fonts, images) only once. A page bigger than the limit on its own
+    # still gets a file.
+    sizes = {}
+    parts = []
+    current = []
+    current_objects = set()
+    current_size = 0
+    for page_num in range(len(pdf)):
+        objects = page_objects(pdf, page_num)
+        added = sum(_object_size(pdf, xref, sizes) for xref in objects - current_objects)
+        if current and current_size + added > max_bytes:
+            parts.append(Part(current))
+            current, current_objects, current_size = [], set(), 0
+            added = sum(_object_size(pdf, xref, sizes) for xref in objects)
+        current.append(page_num)
+        current_objects |= objects
+        current_size += added
+    if current:
+        parts.append(Part(current))
+    return parts
+
+
+def plan_parts(pdf, ranges=None, every=None, bookmarks=None, max_bytes=None):
+    if sum(option is not None for option in (ranges, every, bookmarks, max_bytes)) > 1:
+        raise ValueError("Choose only one way to split the PDF.")
+    if ranges is not None:
+        return range_parts(ranges, len(pdf))
+    if bookmarks is not None:
+        return bookmark_parts(pdf, bookmarks)
+    if max_bytes is not None:
+        return size_parts(pdf, max_bytes)
+    return every_parts(len(pdf), every or 1)
+
+
+def default_name_format(parts, bookmarks=None):
+    if bookmarks is not None:
+        return BOOKMARK_NAME_FORMAT
+    if all(len(part.pages) == 1 for part in parts):
+        return PAGE_NAME_FORMAT
+    return PART_NAME_FORMAT
+
+
+def file_title(title):
+    title = UNSAFE_NAME.sub("_", title).strip(" ._")
+    return title[:MAX_TITLE_LENGTH] or "untitled"
+
+
+def output_name(name_format, stem, part_number, part):
+    first, last = part.pages[0] + 1, part.pages[-1] + 1
+    return name_format.format(stem=stem, page=first, first=first, last=last, part=part_number,
+                              title=file_title(part.title))
+
+
+def page_runs(pages):
+    # Consecutive pages are copied with one insert_pdf call
+    if not pages:
+        return
+    start = prev = pages[0]
+    for page_num in pages[1:]:
+        if page_num != prev + 1:
+            yield start, prev
+            start = page_num
+        prev = page_num
+    yield start, prev
+
+
+def write_parts(reader, jobs, compact=False, progress=None):
+    options = COMPACT_SAVE_OPTIONS if compact else SAVE_OPTIONS
+    for done, (output_path, pages) in enumerate(jobs):
+        if progress is not None:
+            progress(done, len(jobs))
+        with fitz.open() as writer:
+            with metrics.stage("insert_pdf"):
+                for first, last in page_runs(pages):
+                    writer.insert_pdf(reader, from_page=first, to_page=last)
+            with metrics.stage("save"):
+                docio.save_pdf(writer, output_path, **options)
+        metrics.count("pages", len(pages))
+    return len(jobs)
+
+
+@parallel.worker_call
+def _write_parts_in_worker(jobs, compact):
+    with metrics.capture() as op:
+        write_parts(parallel.doc, jobs, compact)
+    return op.summary()
+
+
+def output_jobs(output_folder, parts, name_format, stem):
+    # [(output_path, pages)] for the parts
+    jobs = [(os.path.join(output_folder, output_name(name_format, stem, number, part)), part.pages)
+            for number, part in enumerate(parts, 1)]
+    if len({path for path, pages in jobs}) < len(jobs):
+        raise ValueError(f"The name format {name_format!r} gives several files the same name.")
+    return jobs
+
+
+def split(input_path, output_folder, parts, name_format, compact=False, workers=None, progress=None):
+    # Writes every part to its own file. Parts are handed out in contiguous
+    # batches to worker processes that each keep the source open; a source
+    # that isn't a file is split in this process. progress(done, total) is
+    # called between parts (between batches with workers); when it raises, the
+    # parts not yet written are dropped and those already written are kept.
+    stem = docio.source_stem(input_path)
+    jobs = output_jobs(output_folder, parts, name_format, stem)
+    total_pages = sum(len(pages) for path, pages in jobs)
+    workers = min(parallel.worker_count(total_pages, workers), len(jobs))
+    if workers == 1 or not docio.is_path(input_path):
+        with docio.open_pdf(input_path) as reader:
+            write_parts(reader, jobs, compact, progress)
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=parallel.open_doc, initargs=(input_path,)) as pool:
+            batches = parallel.split_ranges(jobs, workers * parallel.CHUNKS_PER_WORKER)
+            pending = {pool.submit(_write_parts_in_worker, batch, compact): len(batch) for batch in batches}
+            done = 0
+            try:
+                while pending:
+                    if progress is not None:
+                        progress(done, len(jobs))
+                    finished, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        metrics.merge(future.result())
+                        done += pending.pop(future)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    metrics.add_outputs(path for path, pages in jobs)
+    return [path for path, pages in jobs]
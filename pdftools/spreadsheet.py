@@ -0,0 +1,225 @@
+import datetime
+import time
+from functools import lru_cache
+
+FONT = "Helvetica"
+TITLE_FONT = "Helvetica-Bold"
+FONT_SIZE = 8
+MARGIN = 36
+CELL_PADDING = 3
+MIN_COLUMN_WIDTH = 20
+MAX_COLUMN_WIDTH = 200
+# Column widths are measured on the first rows, which are all that is held in memory
+SAMPLE_ROWS = 200
+MAX_COLUMNS = 256
+ELLIPSIS = "..."
+
+
+class FontMetrics:
+    # Character widths looked up once and reused for every cell, instead of asking
+    # reportlab to measure each string
+    def __init__(self, font_name, font_size):
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        self._measure = lambda text: stringWidth(text, font_name, font_size)
+        self._widths = {chr(code): self._measure(chr(code)) for code in range(32, 127)}
+        self.ellipsis_width = self.width(ELLIPSIS)
+
+    def width(self, text):
+        widths = self._widths
+        total = 0.0
+        for char in text:
+            char_width = widths.get(char)
+            if char_width is None:
+                char_width = widths[char] = self._measure(char)
+            total += char_width
+        return total
+
+    def fit(self, text, max_width):
+        # Longest prefix of text, with an ellipsis if cut, that fits in max_width
+        widths = self._widths
+        total = 0.0
+        for index, char in enumerate(text):
+            char_width = widths.get(char)
+            if char_width is None:
+                char_width = widths[char] = self._measure(char)
+            total += char_width
+            if total > max_width:
+                break
+        else:
+            return text
+        total = 0.0
+        limit = max_width - self.ellipsis_width
+        for index, char in enumerate(text):
+            total += widths[char]
+            if total > limit:
+                return text[:index] + ELLIPSIS
+        return text
+
+
+@lru_cache(maxsize=None)
+def font_metrics(font_name, font_size):
+    return FontMetrics(font_name, font_size)
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() and abs(value) < 1e15 else f"{value:.10g}"
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=" ")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return " ".join(str(value).split())
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def column_widths(rows, column_count, metrics):
+    widths = [MIN_COLUMN_WIDTH] * column_count
+    for row in rows:
+        for index, value in enumerate(row[:column_count]):
+            width = metrics.width(cell_text(value)) + 2 * CELL_PADDING
+            if width > widths[index]:
+                widths[index] = min(width, MAX_COLUMN_WIDTH)
+    return widths
+
+
+def column_bands(widths, available_width):
+    # Columns that don't fit across one page continue on following pages, like
+    # Excel's print layout
+    bands = []
+    start = 0
+    total = 0
+    for index, width in enumerate(widths):
+        if index > start and total + width > available_width:
+            bands.append(range(start, index))
+            start, total = index, 0
+        total += width
+    bands.append(range(start, len(widths)))
+    return bands
+
+
+class SheetRenderer:
+    def __init__(self, canvas, page_size, font_size=FONT_SIZE):
+        self.canvas = canvas
+        self.page_size = page_size
+        self.font_size = font_size
+        self.row_height = font_size * 1.6
+        self.metrics = font_metrics(FONT, font_size)
+        self.pages = 0
+
+    def render(self, sheet):
+        # The sample rows are the only ones kept; the rest are streamed from the
+        # workbook again for each band of columns
+        sample = []
+        for row in sheet.iter_rows(values_only=True):
+            sample.append(row)
+            if len(sample) >= SAMPLE_ROWS:
+                break
+        used = max((index + 1 for row in sample for index, value in enumerate(row) if value is not None), default=0)
+        if not used and len(sample) < SAMPLE_ROWS:
+            return 0
+        column_count = min(MAX_COLUMNS, max(used, sheet.max_column or 0))
+        if not column_count:
+            return 0
+        widths = column_widths(sample, column_count, self.metrics)
+        del sample
+
+        width, height = self.page_size
+        if sum(widths) > width - 2 * MARGIN and width < height:
+            width, height = height, width
+        bands = column_bands(widths, width - 2 * MARGIN)
+
+        rows = 0
+        for band_number, band in enumerate(bands, 1):
+            title = sheet.title if len(bands) == 1 else f"{sheet.title} (columns {band_number} of {len(bands)})"
+            rows = self._render_band(sheet, band, widths, (width, height), title)
+        return rows
+
+    def _render_band(self, sheet, band, widths, page_size, title):
+        c = self.canvas
+        xs = [MARGIN]
+        for index in band:
+            xs.append(xs[-1] + widths[index])
+        bottom = MARGIN
+        baseline = self.row_height - self.font_size * 1.15
+        metrics = self.metrics
+
+        y = None
+        ys = []
+        rows = 0
+        for row in sheet.iter_rows(values_only=True):
+            if y is None or y - self.row_height < bottom:
+                if y is not None:
+                    self._finish_page(xs, ys)
+                y = self._start_page(page_size, title)
+                ys = [y]
+            for x, index in zip(xs, band):
+                value = row[index] if index < len(row) else None
+                if value is None:
+                    continue
+                text = metrics.fit(cell_text(value), widths[index] - 2 * CELL_PADDING)
+                if _is_number(value):
+                    c.drawRightString(x + widths[index] - CELL_PADDING, y - self.row_height + baseline, text)
+                else:
+                    c.drawString(x + CELL_PADDING, y - self.row_height + baseline, text)
+            y -= self.row_height
+            ys.append(y)
+            rows += 1
+        if y is not None:
+            self._finish_page(xs, ys)
+        return rows
+
+    def _start_page(self, page_size, title):
+        c = self.canvas
+        c.setPageSize(page_size)
+        self.pages += 1
+        c.setFont(TITLE_FONT, self.font_size + 2)
+        c.drawString(MARGIN, page_size[1] - MARGIN - self.font_size, title)
+        c.setFont(FONT, self.font_size)
+        return page_size[1] - MARGIN - self.font_size * 2
+
+    def _finish_page(self, xs, ys):
+        c = self.canvas
+        c.setLineWidth(0.25)
+        c.setStrokeGray(0.6)
+        c.grid(xs, ys)
+        c.showPage()
+
+
+def render_workbook(xlsx_path, pdf_path, page_size=None, font_size=FONT_SIZE):
+    # Every worksheet as a ruled table, streamed row by row from a read-only
+    # workbook. Returns stats with the sheets, rows, pages and rows per second.
+    from openpyxl import load_workbook
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as rl_canvas
+
+    started = time.perf_counter()
+    page_size = page_size or letter
+    workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+    stats = {"sheets": 0, "rows": 0}
+    try:
+        c = rl_canvas.Canvas(pdf_path, pagesize=page_size, pageCompression=1)
+        renderer = SheetRenderer(c, page_size, font_size)
+        for sheet in workbook.worksheets:
+            rows = renderer.render(sheet)
+            if rows:
+                stats["sheets"] += 1
+                stats["rows"] += rows
+        if renderer.pages == 0:
+            c.showPage()
+        c.save()
+    finally:
+        workbook.close()
+
+    elapsed = time.perf_counter() - started
+    stats["pages"] = max(1, renderer.pages)
+    stats["seconds"] = elapsed
+    stats["rows_per_second"] = stats["rows"] / elapsed if elapsed else 0.0
+    return stats
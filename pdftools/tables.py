@@ -0,0 +1,182 @@
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdftools import metrics, parallel
+
+# Pages queued ahead of the one being written; bounds memory for any page count
+PAGES_IN_FLIGHT_PER_WORKER = 4
+# Words closer than this many times the font size belong to the same cell
+WORD_GAP = 0.8
+# Cell left edges closer than this (points) are taken as the same column
+COLUMN_TOLERANCE = 6
+# Plain numbers only; leading zeros and long digit runs are codes, not quantities
+NUMBER = re.compile(r"-?(0|[1-9]\d{0,14})(\.\d+)?")
+
+
+def table_items(page):
+    # [(top, area, rows)] for the ruled tables on the page, found from its vector lines
+    items = []
+    for table in page.find_tables().tables:
+        rows = [[cell if cell else None for cell in row] for row in table.extract()]
+        items.append((table.bbox[1], fitz.Rect(table.bbox), rows))
+    return items
+
+
+def text_rows(page, skip=()):
+    # Lays loose text out in a grid from word positions: words on the same
+    # baseline form a row, gaps wider than a space split cells, and cells that
+    # start at the same x across the page share a column
+    lines = []
+    for x0, y0, x1, y1, word, *_ in page.get_text("words", sort=True):
+        rect = fitz.Rect(x0, y0, x1, y1)
+        if any(rect.intersects(area) for area in skip):
+            continue
+        middle = (y0 + y1) / 2
+        if lines and abs(lines[-1][0] - middle) < (y1 - y0) / 2:
+            lines[-1][1].append((x0, x1, y1 - y0, word))
+        else:
+            lines.append((middle, [(x0, x1, y1 - y0, word)]))
+
+    rows = []
+    starts = []
+    for middle, words in lines:
+        words.sort()
+        cells = []
+        for x0, x1, height, word in words:
+            if cells and x0 - cells[-1][1] < height * WORD_GAP:
+                cells[-1][1] = x1
+                cells[-1][2].append(word)
+            else:
+                cells.append([x0, x1, [word]])
+        rows.append((middle, [(x0, " ".join(text)) for x0, x1, text in cells]))
+        starts.extend(x0 for x0, text in rows[-1][1])
+
+    columns = []
+    for x0 in sorted(starts):
+        if not columns or x0 - columns[-1] > COLUMN_TOLERANCE:
+            columns.append(x0)
+
+    grid = []
+    for middle, cells in rows:
+        row = []
+        for x0, text in cells:
+            column = max(index for index, start in enumerate(columns) if start <= x0 + COLUMN_TOLERANCE)
+            column = max(column, len(row))
+            row.extend([None] * (column - len(row)))
+            row.append(text)
+        grid.append((middle, row))
+    return grid
+
+
+def extract_page(page):
+    # Tables and the text around them, top to bottom: [("table" | "text", rows)]
+    tables = table_items(page)
+    placed = [(top, "table", rows) for top, area, rows in tables]
+    placed += [(middle, "text", [row]) for middle, row in text_rows(page, [area for top, area, rows in tables])]
+    placed.sort(key=lambda item: item[0])
+    items = []
+    for top, kind, rows in placed:
+        if kind == "text" and items and items[-1][0] == "text":
+            items[-1][1].extend(rows)
+        else:
+            items.append((kind, rows))
+    return items
+
+
+@parallel.worker_call
+def _extract_in_worker(page_num):
+    with metrics.capture() as op, metrics.stage("extract"):
+        items = extract_page(parallel.doc[page_num])
+    return items, op.summary()
+
+
+def extract_pages(input_path, workers=None, progress=None):
+    # Yields (page_num, items) in page order. Pages are spread over a process pool
+    # with only a few per worker queued at a time, so finished pages never pile up.
+    with fitz.open(input_path) as pdf:
+        total = len(pdf)
+        workers = parallel.worker_count(total, workers)
+        if workers == 1:
+            for page_num in range(total):
+                with metrics.stage("extract"):
+                    items = extract_page(pdf[page_num])
+                yield page_num, items
+                if progress is not None:
+                    progress(page_num + 1, total, page_num)
+            return
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=parallel.open_doc, initargs=(input_path,)) as pool:
+        queued = deque()
+        next_page = 0
+        try:
+            while queued or next_page < total:
+                while next_page < total and len(queued) < workers * PAGES_IN_FLIGHT_PER_WORKER:
+                    queued.append((next_page, pool.submit(_extract_in_worker, next_page)))
+                    next_page += 1
+                page_num, future = queued.popleft()
+                items, summary = future.result()
+                metrics.merge(summary)
+                yield page_num, items
+                if progress is not None:
+                    progress(page_num + 1, total, page_num)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def cell_value(text):
+    if text is None:
+        return None
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    text = ILLEGAL_CHARACTERS_RE.sub("", text)
+    if NUMBER.fullmatch(text):
+        return float(text) if "." in text else int(text)
+    return text
+
+
+@metrics.timed("excel", inputs=["input_path"], outputs=["output_path"], fields=["sheet_per"])
+def pdf_to_excel(input_path, output_path, sheet_per="table", workers=None, progress=None):
+    # sheet_per="table": a sheet for every table plus one "Text" sheet for
+    # everything outside tables; sheet_per="page": a sheet per page with tables
+    # and text in reading order. Rows go straight into a write-only workbook.
+    # Returns the number of rows written.
+    from openpyxl import Workbook
+
+    if sheet_per not in ("table", "page"):
+        raise ValueError(f"sheet_per must be 'table' or 'page', not {sheet_per!r}")
+
+    workbook = Workbook(write_only=True)
+    text_sheet = None
+    rows = 0
+    for page_num, items in extract_pages(input_path, workers, progress):
+        if sheet_per == "page":
+            sheet = workbook.create_sheet(f"Page {page_num + 1}")
+        table_number = 0
+        for index, (kind, item_rows) in enumerate(items):
+            if sheet_per == "page":
+                if index:
+                    sheet.append([])
+            elif kind == "table":
+                table_number += 1
+                sheet = workbook.create_sheet(f"Page {page_num + 1} Table {table_number}")
+            else:
+                if text_sheet is None:
+                    text_sheet = workbook.create_sheet("Text")
+                sheet = text_sheet
+            for row in item_rows:
+                sheet.append([cell_value(cell) for cell in row])
+                rows += 1
+
+    if not workbook.worksheets:
+        workbook.create_sheet("Text")
+    with metrics.stage("save"):
+        workbook.save(output_path)
+    metrics.count("rows", rows)
+    return rows
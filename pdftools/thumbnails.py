@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdftools import cache, parallel
+
+THUMB_SIZE = 160
+CACHE_BYTES = 64 * 1024 * 1024
+STORE_BYTES = 256 * 1024 * 1024
+MAX_WORKERS = 4
+
+_worker_fingerprint = None
+
+
+def thumbnail_matrix(page, size=THUMB_SIZE, rotation=0):
+    # Scale straight to the final size instead of rendering large and shrinking
+    scale = size / max(page.rect.width, page.rect.height)
+    return fitz.Matrix(scale, scale).prerotate(rotation)
+
+
+def render_thumbnail(page, size=THUMB_SIZE, rotation=0):
+    pix = page.get_pixmap(matrix=thumbnail_matrix(page, size, rotation), alpha=False)
+    return pix.width, pix.height, pix.samples
+
+
+def thumbnail_store():
+    # The on-disk cache is optional; without a writable cache folder we just re-render
+    return cache.lazy_store("thumbnails", STORE_BYTES)
+
+
+def _store_key(fingerprint, page_num, size, rotation):
+    return f"{fingerprint}:{page_num}:{rotation}:{size}"
+
+
+def load_thumbnail(fingerprint, page_num, size=THUMB_SIZE, rotation=0):
+    store = thumbnail_store()
+    data = store.get(_store_key(fingerprint, page_num, size, rotation)) if store else None
+    if data is None:
+        return None
+    width, height = struct.unpack_from(">HH", data)
+    return width, height, zlib.decompress(data[4:])
+
+
+def save_thumbnail(fingerprint, page_num, size, rotation, thumbnail):
+    store = thumbnail_store()
+    if store:
+        width, height, samples = thumbnail
+        data = struct.pack(">HH", width, height) + zlib.compress(samples, 1)
+        store.put(_store_key(fingerprint, page_num, size, rotation), data)
+
+
+def cached_thumbnail(doc, fingerprint, page_num, size=THUMB_SIZE, rotation=0):
+    thumbnail = load_thumbnail(fingerprint, page_num, size, rotation)
+    if thumbnail is None:
+        thumbnail = render_thumbnail(doc[page_num], size, rotation)
+        save_thumbnail(fingerprint, page_num, size, rotation, thumbnail)
+    return thumbnail
+
+
+def _open_worker_doc(pdf_path):
+    global _worker_fingerprint
+    parallel.open_doc(pdf_path)
+    _worker_fingerprint = cache.file_fingerprint(pdf_path)
+
+
+@parallel.worker_call
+def _render_in_worker(page_num, size, rotation):
+    return cached_thumbnail(parallel.doc, _worker_fingerprint, page_num, size, rotation)
+
+
+class ThumbnailCache:
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._items[key] = (value, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes and len(self._items) > 1:
+                evicted_key, (evicted, evicted_bytes) = self._items.popitem(last=False)
+                self.size -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+# One cache for every dialog, so reopening a document reuses its thumbnails
+shared_cache = ThumbnailCache()
+
+
+class ThumbnailRenderer:
+    # Built on the GUI thread, so it never reads the whole file: key (for the
+    # in-memory cache) comes from a stat, and a content fingerprint (for the disk
+    # cache) not already known is computed by a background thread and by the
+    # workers. Until it is known, load() misses and pages go to the workers.
+    def __init__(self, pdf_path, workers=None):
+        self.pdf_path = pdf_path
+        self.key = cache.file_key(pdf_path)
+        self.fingerprint = cache.known_fingerprint(pdf_path)
+        if self.fingerprint is None:
+            threading.Thread(target=self._fingerprint, daemon=True).start()
+        workers = workers or min(MAX_WORKERS, os.cpu_count() or 1)
+        # Each worker process opens its own copy of the document once; none are
+        # started until a thumbnail is missing from both caches
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_open_worker_doc, initargs=(pdf_path,))
+
+    def _fingerprint(self):
+        try:
+            self.fingerprint = cache.file_fingerprint(self.pdf_path)
+        except OSError:
+            pass
+
+    def load(self, page_num, size=THUMB_SIZE, rotation=0):
+        if self.fingerprint is None:
+            return None
+        return load_thumbnail(self.fingerprint, page_num, size, rotation)
+
+    def submit(self, page_num, size=THUMB_SIZE, rotation=0):
+        return self._pool.submit(_render_in_worker, page_num, size, rotation)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,23 @@
+from PIL import Image as PILImage, ImageTk
+
+# Clockwise page rotation -> the PIL transpose that turns an upright bitmap the same way
+_TRANSPOSE = {
+    90: PILImage.Transpose.ROTATE_270,
+    180: PILImage.Transpose.ROTATE_180,
+    270: PILImage.Transpose.ROTATE_90,
+}
+
+
+def image_from_samples(width, height, samples):
+    # Wraps a pixmap's raw RGB samples as they are: no PNG round trip, no copy
+    return PILImage.frombuffer("RGB", (width, height), samples, "raw", "RGB", 0, 1)
+
+
+def rotate_image(image, degrees):
+    # Lossless and cheap next to rendering the page again
+    degrees %= 360
+    return image if degrees == 0 else image.transpose(_TRANSPOSE[degrees])
+
+
+def photo_image(image, master=None):
+    return ImageTk.PhotoImage(image, master=master)
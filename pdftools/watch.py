@@ -0,0 +1,398 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pdftools import cache, conversion, engine, ocr, parallel
+
+POLL_SECONDS = 2
+# A new file or folder is only picked up once it has stopped changing for this long,
+# so files still being copied in are left alone
+SETTLE_SECONDS = 5
+# Further attempts for an item whose worker process crashed
+RETRIES = 1
+WORK_FOLDER = ".pdftools-work"
+
+STARTED, DONE, ARCHIVED, FAILED = "started", "done", "archived", "failed"
+
+
+def _convert_step(paths, work_dir, stem):
+    return [conversion.convert_to_pdf(path, work_dir) for path in paths]
+
+
+def _combine_step(paths, work_dir, stem):
+    output_path = os.path.join(work_dir, f"{stem}.pdf")
+    failed = engine.combine_files(paths, output_path, workers=1)
+    if failed:
+        raise RuntimeError("; ".join(f"{os.path.basename(path)}: {e}" for path, e in failed))
+    return [output_path]
+
+
+def _optimize_step(paths, work_dir, stem, level=50, grayscale=False):
+    outputs = []
+    for path in paths:
+        output_path = conversion.output_path_for(path, "pdf", work_dir)
+        engine.optimize_pdf(path, level, output_path, grayscale=grayscale)
+        outputs.append(output_path)
+    return outputs
+
+
+def _split_step(paths, work_dir, stem, name_format=None, **options):
+    if name_format is None and not options.keys() & {"ranges", "every", "bookmarks", "max_bytes"}:
+        name_format = "{stem}_page_{page}.pdf"
+    outputs = []
+    for path in paths:
+        outputs += engine.split_pdf(path, work_dir, name_format, workers=1, **options)
+    return outputs
+
+
+def _ocr_step(paths, work_dir, stem, language=ocr.LANGUAGE, docx=False):
+    outputs = []
+    for path in paths:
+        pdf_output = conversion.output_path_for(path, "pdf", work_dir, "_ocr")
+        docx_output = conversion.output_path_for(path, "docx", work_dir, "_ocr") if docx else None
+        engine.ocr_pdf(path, pdf_output, docx_output, language=language, workers=1)
+        outputs += [pdf_output] + ([docx_output] if docx else [])
+    return outputs
+
+
+# Each step takes the current list of files and returns the next; options come from the config
+STEPS = {
+    "convert": _convert_step,
+    "combine": _combine_step,
+    "optimize": _optimize_step,
+    "split": _split_step,
+    "ocr": _ocr_step,
+}
+
+
+def item_files(source):
+    # A dropped folder is one item: its supported files, in name order
+    if not os.path.isdir(source):
+        return [source]
+    return sorted(entry.path for entry in os.scandir(source)
+                  if entry.is_file() and conversion.file_extension(entry.name) in conversion.SUPPORTED_EXTENSIONS)
+
+
+def process_item(source, pipeline, work_dir):
+    # Runs the pipeline with every intermediate and final file inside work_dir;
+    # returns the final files. Nothing outside work_dir is touched.
+    stem = os.path.splitext(os.path.basename(source))[0]
+    paths = item_files(source)
+    if not paths:
+        raise ValueError("No supported files to process.")
+    for index, step in enumerate(pipeline):
+        options = {key: value for key, value in step.items() if key != "step"}
+        step_dir = os.path.join(work_dir, f"{index + 1}-{step['step']}")
+        os.makedirs(step_dir, exist_ok=True)
+        paths = STEPS[step["step"]](paths, step_dir, stem, **options)
+    outputs = []
+    for path in paths:
+        # Files the pipeline left as they were (a PDF with nothing to convert) are copied
+        if not os.path.abspath(path).startswith(os.path.abspath(work_dir) + os.sep):
+            copy = os.path.join(work_dir, os.path.basename(path))
+            shutil.copy2(path, copy)
+            path = copy
+        outputs.append(path)
+    return outputs
+
+
+@parallel.worker_call
+def _process_in_worker(source, pipeline, work_dir):
+    return process_item(source, pipeline, work_dir)
+
+
+class WatchFolder:
+    def __init__(self, input_dir, output_dir, pipeline, done_dir=None, failed_dir=None):
+        self.input_dir = os.path.abspath(input_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.done_dir = os.path.abspath(done_dir or os.path.join(output_dir, "originals"))
+        self.failed_dir = os.path.abspath(failed_dir or os.path.join(output_dir, "failed"))
+        self.work_dir = os.path.join(self.output_dir, WORK_FOLDER)
+        self.pipeline = pipeline
+        for step in pipeline:
+            if step.get("step") not in STEPS:
+                raise ValueError(f"Unknown pipeline step {step.get('step')!r}; use one of {', '.join(STEPS)}.")
+        for folder in (self.output_dir, self.done_dir, self.failed_dir):
+            if folder == self.input_dir or folder.startswith(self.input_dir + os.sep):
+                raise ValueError(f"{folder} is inside the watched folder {self.input_dir}.")
+
+    def candidates(self):
+        # {path: signature} for the files and folders waiting in the input folder
+        found = {}
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith((".", "~$")):
+                    continue
+                try:
+                    if entry.is_dir():
+                        found[entry.path] = tuple((path, os.path.getsize(path), os.stat(path).st_mtime_ns)
+                                                  for path in item_files(entry.path))
+                    elif conversion.file_extension(entry.name) in conversion.SUPPORTED_EXTENSIONS:
+                        stat = entry.stat()
+                        found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    # Removed while we looked
+                    continue
+        return found
+
+
+def item_key(folder, source):
+    # Same name and same content: the same item, however often it is seen
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{folder.input_dir}|{os.path.basename(source)}".encode())
+    for path in item_files(source):
+        digest.update(f"|{os.path.basename(path)}:{cache.file_fingerprint(path)}".encode())
+    return digest.hexdigest()
+
+
+class Journal:
+    # What happened to every item, in SQLite with synchronous writes, so a crash
+    # at any point leaves a state a restart can act on:
+    #   started  - being processed; redone from scratch
+    #   done     - results complete in the work folder; only the moves are redone
+    #   archived - results delivered and the source moved away
+    #   failed   - the source was moved to the failed folder
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, source TEXT NOT NULL, "
+                           "state TEXT NOT NULL, outputs TEXT, error TEXT, updated REAL NOT NULL)")
+
+    def state(self, key):
+        row = self._conn.execute("SELECT state FROM items WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, source, state, outputs=None, error=None):
+        self._conn.execute("INSERT OR REPLACE INTO items (key, source, state, outputs, error, updated) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, source, state, json.dumps(outputs) if outputs is not None else None, error,
+                            time.time()))
+
+    def outputs(self, key):
+        row = self._conn.execute("SELECT outputs FROM items WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def unfinished(self):
+        rows = self._conn.execute("SELECT key, source, outputs FROM items WHERE state = ?", (DONE,))
+        return [(key, source, json.loads(outputs)) for key, source, outputs in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+def _free_path(folder, name):
+    # folder/name, or with a timestamp (and a number if need be) added to the
+    # name when something there already has it
+    target = os.path.join(folder, name)
+    if os.path.exists(target):
+        stem, ext = os.path.splitext(name)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        target = os.path.join(folder, f"{stem}_{stamp}{ext}")
+        number = 2
+        while os.path.exists(target):
+            target = os.path.join(folder, f"{stem}_{stamp}_{number}{ext}")
+            number += 1
+    return target
+
+
+def _move(path, folder):
+    # Into folder, keeping the name unless something there already has it
+    os.makedirs(folder, exist_ok=True)
+    target = _free_path(folder, os.path.basename(path))
+    shutil.move(path, target)
+    return target
+
+
+def _log(message):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+def load_config(config_path):
+    # {"folders": [{"input": ..., "output": ..., "done": ..., "failed": ...,
+    #               "pipeline": [{"step": "optimize", "level": 60}, ...]}],
+    #  "journal": ..., "workers": ..., "poll_seconds": ..., "settle_seconds": ...}
+    # Relative paths are relative to the config file.
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(config_path))
+
+    def resolve(path):
+        return os.path.join(base, os.path.expanduser(path)) if path else None
+
+    folders = []
+    for entry in config.get("folders", []):
+        if "input" not in entry or "output" not in entry:
+            raise ValueError("Every watched folder needs an input and an output.")
+        folders.append(WatchFolder(resolve(entry["input"]), resolve(entry["output"]), entry.get("pipeline", []),
+                                   resolve(entry.get("done")), resolve(entry.get("failed"))))
+    if not folders:
+        raise ValueError("The config lists no folders to watch.")
+    journal = resolve(config.get("journal")) or os.path.join(cache.cache_dir(), "watch-journal.sqlite3")
+    return dict(folders=folders, journal=journal, workers=config.get("workers"),
+                poll_seconds=config.get("poll_seconds", POLL_SECONDS),
+                settle_seconds=config.get("settle_seconds", SETTLE_SECONDS))
+
+
+class Watcher:
+    # Polls the input folders, runs each settled item's pipeline in a process
+    # pool and delivers the results. Polling rather than OS notifications keeps
+    # it working the same on network shares and on every platform.
+    def __init__(self, folders, journal, workers=None, poll_seconds=POLL_SECONDS, settle_seconds=SETTLE_SECONDS,
+                 log=_log):
+        self.folders = folders
+        self.journal = Journal(journal)
+        self.workers = workers or os.cpu_count() or 1
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.log = log
+        self._seen = {}
+        self._running = {}
+        self._crashes = Counter()
+        self._pool = None
+
+    def recover(self):
+        # Deliver whatever a previous run finished but did not get to move
+        by_source = {}
+        for folder in self.folders:
+            by_source[folder.input_dir] = folder
+        for key, source, outputs in self.journal.unfinished():
+            folder = by_source.get(os.path.dirname(source))
+            if folder is not None:
+                self.log(f"{source}: delivering results from an interrupted run")
+                self.deliver(folder, key, source, outputs)
+
+    def settled(self, folder):
+        # Items unchanged for settle_seconds, not already running or finished
+        now = time.monotonic()
+        ready = []
+        found = folder.candidates()
+        for source in [source for source in self._seen if os.path.dirname(source) == folder.input_dir]:
+            if source not in found:
+                del self._seen[source]
+        for source, signature in found.items():
+            if source in self._running:
+                continue
+            previous = self._seen.get(source)
+            if previous is None or previous[0] != signature:
+                self._seen[source] = (signature, now)
+            elif now - previous[1] >= self.settle_seconds:
+                ready.append(source)
+        return ready
+
+    def deliver(self, folder, key, source, outputs):
+        # outputs are the files in the work folder, or [path, target] pairs once
+        # the targets were chosen. Results never replace a file already in the
+        # output folder; they get a free name instead. The targets are journaled
+        # before anything moves, so a restart after a partial delivery moves the
+        # rest to the same names rather than choosing new ones.
+        if self.journal.state(key) == ARCHIVED:
+            return self.journal.outputs(key)
+        moves = [output if isinstance(output, list) else [output, None] for output in outputs]
+        if any(target is None for path, target in moves):
+            for move in moves:
+                path, target = move
+                if target is None:
+                    name = os.path.basename(path)
+                    if os.path.exists(path):
+                        target = _free_path(folder.output_dir, name)
+                    else:
+                        # Already moved, under its own name, by an older run
+                        target = os.path.join(folder.output_dir, name)
+                    if os.path.basename(target) != name:
+                        self.log(f"{source}: {name} is already in {folder.output_dir}; "
+                                 f"written as {os.path.basename(target)}")
+                    move[1] = target
+            self.journal.set(key, source, DONE, moves)
+        delivered = []
+        for path, target in moves:
+            if os.path.exists(path):
+                os.replace(path, target)
+            delivered.append(target)
+        if os.path.exists(source):
+            _move(source, folder.done_dir)
+        shutil.rmtree(os.path.join(folder.work_dir, key), ignore_errors=True)
+        self.journal.set(key, source, ARCHIVED, delivered)
+        return delivered
+
+    def fail(self, folder, key, source, error):
+        self.journal.set(key, source, FAILED, error=str(error))
+        if os.path.exists(source):
+            _move(source, folder.failed_dir)
+        shutil.rmtree(os.path.join(folder.work_dir, key), ignore_errors=True)
+
+    def submit(self, folder, source):
+        try:
+            key = item_key(folder, source)
+        except OSError:
+            return
+        if self.journal.state(key) == ARCHIVED:
+            # Already delivered; only the source is still here
+            self._seen.pop(source, None)
+            self.log(f"{source}: already processed")
+            _move(source, folder.done_dir)
+            return
+        work_dir = os.path.join(folder.work_dir, key)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        self.journal.set(key, source, STARTED)
+        self.log(f"{source}: started")
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._running[source] = (folder, key, self._pool.submit(_process_in_worker, source, folder.pipeline, work_dir))
+
+    def collect(self):
+        for source, (folder, key, future) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[source]
+            self._seen.pop(source, None)
+            try:
+                outputs = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (or took the pool down with it): try the item again
+                # in a new pool, unless it keeps crashing
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                    self._pool = None
+                self._crashes[key] += 1
+                if self._crashes[key] <= RETRIES:
+                    self.log(f"{source}: worker crashed, retrying")
+                    continue
+                self.fail(folder, key, source, e)
+                self.log(f"{source}: failed: worker crashed")
+                continue
+            except Exception as e:
+                self.fail(folder, key, source, e)
+                self.log(f"{source}: failed: {e}")
+                continue
+            self.journal.set(key, source, DONE, outputs)
+            delivered = self.deliver(folder, key, source, outputs)
+            self.log(f"{source}: {len(delivered)} files written to {folder.output_dir}")
+
+    def run(self, once=False):
+        # once=True processes what is in the folders now and returns
+        for folder in self.folders:
+            os.makedirs(folder.output_dir, exist_ok=True)
+        self.recover()
+        try:
+            while True:
+                for folder in self.folders:
+                    for source in self.settled(folder):
+                        self.submit(folder, source)
+                self.collect()
+                if once and not self._running and not self._seen:
+                    return
+                time.sleep(self.poll_seconds)
+        finally:
+            # Items cut short stay "started" in the journal and are redone next time
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+            self.journal.close()
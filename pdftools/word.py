@@ -0,0 +1,145 @@
+import multiprocessing
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+
+from pdftools import metrics, parallel
+
+CHUNK_PAGES = 10
+# Further attempts for a chunk whose worker failed or crashed
+RETRIES = 1
+POLL_SECONDS = 0.1
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def _parse_chunk(input_path, start, stop):
+    # Layout analysis is the slow part of pdf2docx; a worker parses its pages and
+    # sends back the parsed layout, not a finished document
+    from pdf2docx import Converter
+
+    converter = Converter(input_path)
+    try:
+        converter.parse(start, stop, **converter.default_settings)
+        return converter.store()
+    finally:
+        converter.close()
+
+
+@parallel.worker_call
+def _parse_chunk_in_worker(input_path, start, stop):
+    return _parse_chunk(input_path, start, stop)
+
+
+def _terminate(pool):
+    # Running chunks can take minutes; don't wait for them after a cancel
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_chunks(input_path, chunks, workers, progress=None, cancel=None, retries=RETRIES):
+    results = {}
+    attempts = Counter()
+    pages_done = 0
+    page_total = sum(len(chunk) for chunk in chunks)
+
+    def finished(index, result):
+        nonlocal pages_done
+        results[index] = result
+        pages_done += len(chunks[index])
+        if progress is not None:
+            progress(pages_done, page_total)
+
+    def failed(index, error):
+        attempts[index] += 1
+        if attempts[index] > retries:
+            chunk = chunks[index]
+            raise RuntimeError(f"Pages {chunk.start + 1}-{chunk.stop} could not be converted: {error}")
+
+    if workers == 1:
+        for index, chunk in enumerate(chunks):
+            while index not in results:
+                if cancel is not None and cancel.is_set():
+                    raise ConversionCancelled()
+                try:
+                    finished(index, _parse_chunk(input_path, chunk.start, chunk.stop))
+                except Exception as e:
+                    failed(index, e)
+        return [results[index] for index in range(len(chunks))]
+
+    context = multiprocessing.get_context("spawn")
+    pool = None
+    futures = {}
+    try:
+        while len(results) < len(chunks):
+            if pool is None:
+                # First run, or the previous pool lost a worker: resubmit what's left
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                futures = {pool.submit(_parse_chunk_in_worker, input_path, chunk.start, chunk.stop): index
+                           for index, chunk in enumerate(chunks) if index not in results}
+            done, _ = wait(futures, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                raise ConversionCancelled()
+            retry = []
+            broken = False
+            for future in done:
+                index = futures.pop(future)
+                try:
+                    finished(index, future.result())
+                except BrokenProcessPool as e:
+                    failed(index, e)
+                    broken = True
+                except Exception as e:
+                    failed(index, e)
+                    retry.append(index)
+            if broken:
+                _terminate(pool)
+                pool = None
+                continue
+            for index in retry:
+                chunk = chunks[index]
+                futures[pool.submit(_parse_chunk_in_worker, input_path, chunk.start, chunk.stop)] = index
+    finally:
+        if pool is not None:
+            _terminate(pool)
+    return [results[index] for index in range(len(chunks))]
+
+
+@metrics.timed("word", inputs=["input_path"], outputs=["output_path"])
+def pdf_to_word(input_path, output_path, chunk_pages=CHUNK_PAGES, workers=None, progress=None, cancel=None,
+                retries=RETRIES):
+    # Parses chunks of chunk_pages pages in parallel, then builds a single DOCX
+    # from all of them. progress(pages_done, page_total) is called as each chunk
+    # finishes; setting the cancel event stops the workers and raises
+    # ConversionCancelled.
+    from pdf2docx import Converter
+
+    with fitz.open(input_path) as pdf:
+        page_total = len(pdf)
+    if page_total == 0:
+        raise ValueError("The PDF has no pages.")
+    chunks = [range(start, min(start + chunk_pages, page_total)) for start in range(0, page_total, chunk_pages)]
+    workers = min(parallel.worker_count(page_total, workers), len(chunks))
+    with metrics.stage("parse"):
+        parsed = parse_chunks(input_path, chunks, workers, progress, cancel, retries)
+    metrics.count("pages", page_total)
+
+    if cancel is not None and cancel.is_set():
+        raise ConversionCancelled()
+    converter = Converter(input_path)
+    try:
+        converter.load_pages()
+        for page in converter.pages:
+            page.skip_parsing = True
+        for data in parsed:
+            converter.restore(data)
+        with metrics.stage("make docx"):
+            converter.make_docx(output_path, **converter.default_settings)
+    finally:
+        converter.close()
+    return output_path
@@ -0,0 +1,36 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_cache(tmp_path_factory):
+    # Caches and the metrics log go to a throwaway folder, never the user's
+    os.environ["PDFTOOLS_CACHE_DIR"] = str(tmp_path_factory.mktemp("cache"))
+    os.environ["PDFTOOLS_METRICS"] = "0"
+
+
+def write_pdf(path, texts, size=(300, 400)):
+    # One page per text, each with its text drawn in the top left corner
+    with fitz.open() as pdf:
+        for text in texts:
+            page = pdf.new_page(width=size[0], height=size[1])
+            page.insert_text((40, 60), text, fontsize=14)
+        pdf.save(path)
+    return str(path)
+
+
+def page_texts(pdf_path):
+    with fitz.open(pdf_path) as pdf:
+        return [page.get_text().strip() for page in pdf]
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    # make_pdf("a.pdf", 3) -> path of a PDF whose pages read "a.pdf 1".."a.pdf 3";
+    # pass texts=[...] for other page texts
+    def make(name, pages=3, texts=None):
+        texts = texts if texts is not None else [f"{name} {number}" for number in range(1, pages + 1)]
+        return write_pdf(tmp_path / name, texts)
+    return make
@@ -0,0 +1,75 @@
+import io
+
+import fitz  # PyMuPDF
+
+from pdftools import docio
+from tests.conftest import page_texts
+
+
+def rotate_first_page(pdf):
+    pdf[0].set_rotation(90)
+
+
+def test_updating_appends_to_a_copy_when_every_page_stays(make_pdf, tmp_path):
+    source = make_pdf("a.pdf", 3)
+    original = open(source, "rb").read()
+    output = tmp_path / "out.pdf"
+    with docio.updating(source, str(output)) as pdf:
+        rotate_first_page(pdf)
+    saved = output.read_bytes()
+    # An incremental save keeps the original bytes and adds an update after them
+    assert saved.startswith(original) and len(saved) > len(original)
+    assert open(source, "rb").read() == original
+    with fitz.open(str(output)) as pdf:
+        assert pdf[0].rotation == 90
+
+
+def test_updating_in_place(make_pdf):
+    source = make_pdf("a.pdf", 3)
+    original = open(source, "rb").read()
+    with docio.updating(source, source) as pdf:
+        rotate_first_page(pdf)
+    assert open(source, "rb").read().startswith(original)
+    with fitz.open(source) as pdf:
+        assert pdf[0].rotation == 90
+
+
+def test_updating_saves_in_full_when_pages_are_dropped(make_pdf, tmp_path):
+    source = make_pdf("a.pdf", 3)
+    original = open(source, "rb").read()
+    output = tmp_path / "out.pdf"
+    with docio.updating(source, str(output)) as pdf:
+        pdf.select([0, 2])
+    assert not output.read_bytes().startswith(original)
+    assert page_texts(str(output)) == ["a.pdf 1", "a.pdf 3"]
+
+
+def test_updating_without_incremental(make_pdf, tmp_path):
+    source = make_pdf("a.pdf", 3)
+    output = tmp_path / "out.pdf"
+    with docio.updating(source, str(output), incremental=False) as pdf:
+        rotate_first_page(pdf)
+    assert not output.read_bytes().startswith(open(source, "rb").read())
+
+
+def test_updating_from_data_to_a_stream(make_pdf):
+    data = open(make_pdf("a.pdf", 2), "rb").read()
+    target = io.BytesIO()
+    with docio.updating(data, target) as pdf:
+        rotate_first_page(pdf)
+    with fitz.open("pdf", target.getvalue()) as pdf:
+        assert [page.rotation for page in pdf] == [90, 0]
+
+
+def test_failed_update_leaves_target_alone(make_pdf, tmp_path):
+    source = make_pdf("a.pdf", 2)
+    output = tmp_path / "out.pdf"
+    output.write_bytes(b"previous")
+    try:
+        with docio.updating(source, str(output)) as pdf:
+            rotate_first_page(pdf)
+            raise KeyError("stop")
+    except KeyError:
+        pass
+    assert output.read_bytes() == b"previous"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.pdf", "out.pdf"]
@@ -0,0 +1,84 @@
+import fitz  # PyMuPDF
+
+from pdftools import duplicates, engine, ocr
+from tests.conftest import page_texts
+
+
+def test_exact_copies_within_a_document(make_pdf):
+    source = make_pdf("a.pdf", texts=["one", "two", "one", "three", "two"])
+    assert duplicates.duplicate_pages(source, workers=1) == {2: (0, True), 4: (1, True)}
+
+
+def test_blank_pages_are_not_duplicates(make_pdf):
+    assert duplicates.duplicate_pages(make_pdf("a.pdf", texts=["", "", "text"]), workers=1) == {}
+
+
+def test_duplicates_across_documents(make_pdf):
+    first = make_pdf("a.pdf", texts=["one", "two"])
+    second = make_pdf("b.pdf", texts=["three", "one"])
+    assert duplicates.find_duplicates([first, second], workers=1) == {(second, 1): ((first, 0), True)}
+
+
+def test_index_tells_exact_from_near():
+    index = duplicates.DuplicateIndex(max_distance=4)
+
+    def fingerprint(content, phash, blank=False):
+        return duplicates.PageFingerprint(content, "words", (300, 400), phash, blank)
+
+    assert index.add("a", fingerprint("x", 0b1111)) is None
+    assert index.add("b", fingerprint("x", 0b1111)) == ("a", True)
+    assert index.add("c", fingerprint("y", 0b0111)) == ("a", False)
+    assert index.add("d", fingerprint("z", 0xFFFF0000)) is None
+    assert index.add("e", fingerprint("x", 0b1111, blank=True)) is None
+
+
+def test_pages_drawn_through_forms_are_told_apart(tmp_path):
+    # Pages that only call a Form XObject share their content stream
+    sources = []
+    for text in ("first", "second"):
+        with fitz.open() as pdf:
+            pdf.new_page(width=300, height=400).insert_text((40, 60), text)
+            sources.append(pdf.tobytes())
+    path = str(tmp_path / "forms.pdf")
+    with fitz.open() as pdf:
+        for data in sources:
+            with fitz.open("pdf", data) as source:
+                pdf.new_page(width=300, height=400).show_pdf_page(fitz.Rect(0, 0, 300, 400), source, 0)
+        pdf.save(path)
+    assert duplicates.duplicate_pages(path, workers=1) == {}
+
+
+def test_combine_drops_exact_duplicates(make_pdf, tmp_path):
+    first = make_pdf("a.pdf", texts=["one", "two"])
+    second = make_pdf("b.pdf", texts=["two", "three"])
+    output = str(tmp_path / "out.pdf")
+    stats = {}
+    engine.combine_pdfs([first, second], output, streaming=False, stats=stats, drop_duplicates="exact")
+    assert page_texts(output) == ["one", "two", "three"]
+
+
+def stamped_copy(tmp_path):
+    # Two identical pages, the second carrying an "APPROVED" stamp
+    path = str(tmp_path / "stamped.pdf")
+    with fitz.open() as pdf:
+        for stamped in (False, True):
+            page = pdf.new_page(width=300, height=400)
+            page.insert_text((40, 60), "invoice 1234")
+            if stamped:
+                page.add_freetext_annot(fitz.Rect(100, 200, 250, 240), "APPROVED", fontsize=16)
+        pdf.save(path)
+    return path
+
+
+def test_pages_that_differ_by_an_annotation_are_not_copies(tmp_path):
+    path = stamped_copy(tmp_path)
+    assert all(exact is False for original, exact in duplicates.duplicate_pages(path, workers=1).values())
+    with fitz.open(path) as pdf:
+        assert ocr.page_key(pdf[0], "eng", 300) != ocr.page_key(pdf[1], "eng", 300)
+
+
+def test_combine_keeps_an_annotated_copy(tmp_path):
+    output = str(tmp_path / "out.pdf")
+    engine.combine_pdfs([stamped_copy(tmp_path)], output, streaming=False, drop_duplicates="exact")
+    with fitz.open(output) as pdf:
+        assert len(pdf) == 2 and [annot.info["content"] for annot in pdf[1].annots()] == ["APPROVED"]
@@ -0,0 +1,79 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from pdftools import engine
+from tests.conftest import page_texts
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1", [0]),
+    ("1,3-5", [0, 2, 3, 4]),
+    ("8-", [7, 8, 9]),
+    ("-2", [0, 1]),
+    (" 2 , 1 ", [1, 0]),
+    ("1,,2", [0, 1]),
+])
+def test_parse_page_ranges(spec, expected):
+    assert engine.parse_page_ranges(spec, 10) == expected
+
+
+@pytest.mark.parametrize("spec", ["0", "11", "5-3", "a", "1-b"])
+def test_parse_page_ranges_rejects(spec):
+    with pytest.raises(ValueError):
+        engine.parse_page_ranges(spec, 10)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_combine_keeps_every_page_in_order(make_pdf, tmp_path, streaming):
+    first, second = make_pdf("a.pdf", 2), make_pdf("b.pdf", 3)
+    output = str(tmp_path / "out.pdf")
+    assert engine.combine_pdfs([first, second], output, streaming=streaming) == []
+    assert page_texts(output) == ["a.pdf 1", "a.pdf 2", "b.pdf 1", "b.pdf 2", "b.pdf 3"]
+
+
+def test_combine_reports_unreadable_inputs(make_pdf, tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    output = str(tmp_path / "out.pdf")
+    failed = engine.combine_pdfs([make_pdf("a.pdf", 2), str(broken)], output, streaming=False)
+    assert [path for path, error in failed] == [str(broken)]
+    assert engine.page_count(output) == 2
+
+
+def test_split_one_file_per_page(make_pdf, tmp_path):
+    paths = engine.split_pdf(make_pdf("a.pdf", 4), str(tmp_path), workers=1)
+    assert len(paths) == 4
+    assert [page_texts(path) for path in paths] == [["a.pdf 1"], ["a.pdf 2"], ["a.pdf 3"], ["a.pdf 4"]]
+
+
+def test_split_ranges_and_every(make_pdf, tmp_path):
+    source = make_pdf("a.pdf", 5)
+    for folder in ("ranges", "every"):
+        os.makedirs(tmp_path / folder)
+    ranges = engine.split_pdf(source, str(tmp_path / "ranges"), ranges="1-2,5", workers=1)
+    assert [page_texts(path) for path in ranges] == [["a.pdf 1", "a.pdf 2"], ["a.pdf 5"]]
+    every = engine.split_pdf(source, str(tmp_path / "every"), every=2, workers=1)
+    assert [engine.page_count(path) for path in every] == [2, 2, 1]
+
+
+def test_delete_pages(make_pdf, tmp_path):
+    output = str(tmp_path / "out.pdf")
+    assert engine.delete_pages(make_pdf("a.pdf", 4), [1, 3], output) == 2
+    assert page_texts(output) == ["a.pdf 1", "a.pdf 3"]
+
+
+def test_delete_every_page_is_refused(make_pdf, tmp_path):
+    output = tmp_path / "out.pdf"
+    with pytest.raises(ValueError):
+        engine.delete_pages(make_pdf("a.pdf", 2), [0, 1], str(output))
+    assert not output.exists()
+
+
+def test_rotate_and_reorder_pages(make_pdf, tmp_path):
+    output = str(tmp_path / "out.pdf")
+    assert engine.rotate_pages(make_pdf("a.pdf", 3), [2, 0, 1], {0: 90, 2: 270}, output) == 3
+    assert page_texts(output) == ["a.pdf 3", "a.pdf 1", "a.pdf 2"]
+    with fitz.open(output) as pdf:
+        assert [page.rotation for page in pdf] == [270, 90, 0]
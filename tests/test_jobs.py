@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from pdftools import jobs
+
+
+def wait_for(scheduler, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the scheduler")
+        scheduler.poll()
+        time.sleep(0.005)
+    scheduler.poll()
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = jobs.Scheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def blocker(scheduler):
+    # A running job that holds the only worker until released
+    release = threading.Event()
+    job = scheduler.submit("blocker", lambda job: release.wait(5))
+    wait_for(scheduler, lambda: job.status == jobs.RUNNING)
+    return job, release
+
+
+def test_higher_priority_runs_first(scheduler):
+    first, release = blocker(scheduler)
+    order = []
+    submitted = [scheduler.submit(name, lambda job, name=name: order.append(name), priority)
+                 for name, priority in [("low", jobs.LOW), ("normal", jobs.NORMAL), ("high", jobs.HIGH),
+                                        ("normal 2", jobs.NORMAL)]]
+    release.set()
+    wait_for(scheduler, lambda: all(job.finished_status for job in submitted))
+    assert order == ["high", "normal", "normal 2", "low"]
+    assert all(job.status == jobs.DONE for job in submitted + [first])
+
+
+def test_results_and_errors_reach_callbacks(scheduler):
+    results, errors = [], []
+    scheduler.submit("ok", lambda job: 42, on_done=results.append)
+    failing = scheduler.submit("fails", lambda job: 1 / 0, on_error=errors.append)
+    wait_for(scheduler, lambda: failing.finished_status)
+    assert results == [42]
+    assert failing.status == jobs.FAILED and isinstance(errors[0], ZeroDivisionError)
+
+
+def test_cancelled_queued_job_never_runs(scheduler):
+    first, release = blocker(scheduler)
+    ran = []
+    queued = scheduler.submit("queued", lambda job: ran.append(True), on_done=ran.append)
+    queued.cancel()
+    assert queued.status == jobs.CANCELLED
+    release.set()
+    wait_for(scheduler, lambda: first.finished_status)
+    time.sleep(0.05)
+    scheduler.poll()
+    assert ran == [] and queued.status == jobs.CANCELLED
+
+
+def test_running_job_stops_at_its_next_progress_report(scheduler):
+    started, cancelled = threading.Event(), threading.Event()
+    steps = []
+
+    def work(job):
+        started.set()
+        cancelled.wait(5)
+        for step in range(3):
+            job.progress(step, 3)
+            steps.append(step)
+
+    job = scheduler.submit("cancellable", work, on_done=steps.append)
+    started.wait(5)
+    job.cancel()
+    cancelled.set()
+    wait_for(scheduler, lambda: job.finished_status)
+    assert job.status == jobs.CANCELLED and steps == []
+
+
+def test_job_finished_before_cancel_counts_as_done(scheduler):
+    started, cancelled = threading.Event(), threading.Event()
+
+    def work(job):
+        started.set()
+        cancelled.wait(5)
+        return "written"
+
+    job = scheduler.submit("uninterrupted", work)
+    started.wait(5)
+    job.cancel()
+    cancelled.set()
+    wait_for(scheduler, lambda: job.finished_status)
+    assert job.status == jobs.DONE and job.result == "written"
+
+
+def test_progress_reaches_the_job(scheduler):
+    job = scheduler.submit("reports", lambda job: job.progress(3, 4, message="almost"))
+    wait_for(scheduler, lambda: job.finished_status)
+    assert (job.done, job.total, job.message) == (3, 4, "almost")
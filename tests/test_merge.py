@@ -0,0 +1,42 @@
+import fitz  # PyMuPDF
+
+from pdftools import engine, merge
+from tests.conftest import page_texts
+
+
+def test_stream_combine_matches_in_memory_combine(make_pdf, tmp_path):
+    inputs = [make_pdf("a.pdf", 3), make_pdf("b.pdf", 2), make_pdf("c.pdf", 4)]
+    streamed = str(tmp_path / "streamed.pdf")
+    in_memory = str(tmp_path / "in_memory.pdf")
+    # Flushing every two pages exercises the incremental saves between batches
+    failed, stats = merge.stream_combine(inputs, streamed, flush_pages=2)
+    assert failed == []
+    assert stats["inputs"] == 3 and stats["pages"] == 9 and stats["flushes"] > 1
+    assert engine.combine_pdfs(inputs, in_memory, streaming=False) == []
+
+    assert page_texts(streamed) == page_texts(in_memory)
+    with fitz.open(streamed) as a, fitz.open(in_memory) as b:
+        assert [page.rect for page in a] == [page.rect for page in b]
+
+
+def test_stream_combine_shares_identical_fonts(make_pdf, tmp_path):
+    inputs = [make_pdf(f"{name}.pdf", 2) for name in "abcd"]
+    output = str(tmp_path / "out.pdf")
+    merge.stream_combine(inputs, output, flush_pages=2)
+    with fitz.open(output) as pdf:
+        fonts = {font[0] for page in pdf for font in page.get_fonts()}
+    assert len(fonts) == 1
+
+
+def test_stream_combine_stopped_early_leaves_no_output(make_pdf, tmp_path):
+    inputs = [make_pdf("a.pdf", 2), make_pdf("b.pdf", 2)]
+
+    def progress(done, total):
+        if done == 1:
+            raise KeyError("stop")
+
+    try:
+        merge.stream_combine(inputs, str(tmp_path / "out.pdf"), progress=progress)
+    except KeyError:
+        pass
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.pdf", "b.pdf"]
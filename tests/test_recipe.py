@@ -0,0 +1,42 @@
+import json
+import re
+
+import pytest
+
+from pdftools import recipe
+from tests.conftest import page_texts
+
+
+def write_recipe(tmp_path, data):
+    path = tmp_path / "recipe.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_recipe_runs_its_steps_in_order(make_pdf, tmp_path):
+    steps = [{"op": "delete", "pages": "2"}, {"op": "reorder", "order": "3,1-2"}]
+    loaded = recipe.Recipe.load(write_recipe(tmp_path, {"steps": steps}))
+    assert [recipe.describe(step) for step in loaded.steps] == ["Delete pages 2", "Reorder pages to 3,1-2"]
+    output = str(tmp_path / "out.pdf")
+    loaded.run(make_pdf("a.pdf", 4), output)
+    assert page_texts(output) == ["a.pdf 4", "a.pdf 1", "a.pdf 3"]
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([{"op": "delete"}], "step 1 (delete) needs 'pages'"),
+    ([{"op": "rotate"}, {"op": "reorder"}], "step 2 (reorder) needs 'order'"),
+    ([{"op": "shred"}], "step 1: unknown operation 'shred'"),
+    ([{"op": "delete", "pages": 3}], "step 1 (delete): 'pages' must be page ranges"),
+    ([{"op": "optimize", "level": "high"}], "step 1 (optimize): 'level' must be a whole number"),
+    ([{"op": "rotate", "degrees": 45}], "degrees must be a multiple of 90"),
+    (["delete"], "step 1 is not an object"),
+    ([{"op": "split"}, {"op": "rotate"}], "Split can only be the last step"),
+])
+def test_load_rejects_invalid_steps(tmp_path, steps, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        recipe.Recipe.load(write_recipe(tmp_path, {"steps": steps}))
+
+
+def test_load_rejects_files_without_steps(tmp_path):
+    with pytest.raises(ValueError):
+        recipe.Recipe.load(write_recipe(tmp_path, [{"op": "delete", "pages": "1"}]))
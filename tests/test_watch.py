@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from pdftools import watch
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    folder = watch.WatchFolder(tmp_path / "in", tmp_path / "out", [])
+    for path in (folder.input_dir, folder.output_dir):
+        os.makedirs(path)
+    watcher = watch.Watcher([folder], str(tmp_path / "journal.sqlite3"), log=lambda message: None)
+    yield watcher, folder
+    watcher.journal.close()
+
+
+def finished_item(folder, key, names):
+    # An item whose pipeline left its results in the work folder
+    source = os.path.join(folder.input_dir, "scan.pdf")
+    with open(source, "wb") as f:
+        f.write(b"source")
+    work_dir = os.path.join(folder.work_dir, key)
+    os.makedirs(work_dir)
+    outputs = []
+    for name in names:
+        outputs.append(os.path.join(work_dir, name))
+        with open(outputs[-1], "w") as f:
+            f.write(key)
+    return source, outputs
+
+
+def test_delivery_never_replaces_an_earlier_result(watcher):
+    watcher, folder = watcher
+    earlier = os.path.join(folder.output_dir, "scan.pdf")
+    with open(earlier, "w") as f:
+        f.write("earlier")
+    source, outputs = finished_item(folder, "key", ["scan.pdf"])
+    delivered = watcher.deliver(folder, "key", source, outputs)
+
+    assert open(earlier).read() == "earlier"
+    assert len(delivered) == 1 and delivered[0] != earlier
+    assert os.path.dirname(delivered[0]) == folder.output_dir and open(delivered[0]).read() == "key"
+    assert watcher.journal.state("key") == watch.ARCHIVED
+    assert watcher.journal.outputs("key") == delivered
+
+
+def test_recovery_finishes_a_partial_delivery_under_the_journaled_names(watcher):
+    watcher, folder = watcher
+    source, outputs = finished_item(folder, "key", ["a.pdf", "b.pdf"])
+    planned = [[path, os.path.join(folder.output_dir, f"planned_{os.path.basename(path)}")] for path in outputs]
+    watcher.journal.set("key", source, watch.DONE, planned)
+    # The first file was moved before the previous run stopped
+    os.replace(*planned[0])
+
+    watcher.recover()
+    assert watcher.journal.state("key") == watch.ARCHIVED
+    assert sorted(os.listdir(folder.output_dir)) == [".pdftools-work", "originals", "planned_a.pdf", "planned_b.pdf"]
+
+    # Delivering an archived item again changes nothing
+    assert watcher.deliver(folder, "key", source, outputs) == [target for path, target in planned]
+    assert sorted(os.listdir(folder.output_dir)) == [".pdftools-work", "originals", "planned_a.pdf", "planned_b.pdf"]